@@ -3,9 +3,26 @@
 #endif
 
 #include <avr/io.h>
+#include <avr/interrupt.h>
 #include <util/delay.h>
 #include <stdint.h>
 
+/* ------------- RAW ADC STREAMING (optional) -------------
+ * Build with RAW_ADC_STREAM=1 to stream 8-bit sound samples instead of the
+ * thresholded 'S' character. Detection then runs on the host
+ * (Interface/sound_detector.py) where thresholds can be tuned at runtime.
+ * Frame layout: 0xA5 0x5A <type> <seq> <len> <payload[len]> <checksum>
+ *   type 'A': block of STREAM_BLOCK ADC samples
+ *   type 'E': event character (payload 'I' on IR beam break)
+ * checksum = low byte of the sum of type, seq, len and payload.
+ */
+#ifndef RAW_ADC_STREAM
+#define RAW_ADC_STREAM 0
+#endif
+#define STREAM_BAUDRATE    250000UL   /* exact at 16 MHz (UBRR = 3) */
+#define STREAM_SAMPLE_RATE 8000UL
+#define STREAM_BLOCK       64
+
 /* ---------------- SOUND SENSOR SECTION ---------------- */
 #define SOUND_ADC_CHANNEL 2
 #define RED_LED PB3
@@ -26,6 +43,15 @@ uint16_t ADC_Read(uint8_t channel);
 void UART_init(unsigned int ubrr);
 void UART_TxChar(unsigned char ch);
 
+/* --------------- HEARTBEAT ----------------- */
+/* A bare 'H' every HEARTBEAT_MS tells the host this board is alive; the host
+ * marks its sensors Offline after 15 s without one (Interface/liveness.py). */
+#define HEARTBEAT_MS 5000UL
+
+#if RAW_ADC_STREAM
+void Stream_Loop(void);
+#endif
+
 void UART_init(unsigned int ubrr)
 {
 	UBRR0H = (unsigned char)(ubrr >> 8);
@@ -47,12 +73,18 @@ int main(void)
     PORTD |= (1 << IR_RX_PIN);
     PORTB |= (1 << IR_TX_PIN);
 
+#if RAW_ADC_STREAM
+    DDRB |= (1 << RED_LED);
+	Stream_Loop();
+#endif
+
     ADC_Init();
 	UART_init((unsigned int)BAUD_PRESCALE);
 
     DDRB |= (1 << RED_LED);
 
     uint16_t soundValue;
+    uint16_t heartbeat_ms = 0;   /* time since the last heartbeat, counted from the loop's delays */
 
     while (1)
     {
@@ -63,6 +95,7 @@ int main(void)
 				PORTB ^= (1 << RED_LED); 
 				_delay_ms(100);
 			}
+			heartbeat_ms += 500;
 			UART_TxChar('I');
 		} else {
 			PORTB &= ~(1 << YELLOW_LED);
@@ -75,6 +108,7 @@ int main(void)
 				PORTB ^= (1 << YELLOW_LED);
 				_delay_ms(100);
 			}
+			heartbeat_ms += 500;
 			UART_TxChar('S');
 		} else {
 			PORTB &= ~(1 << RED_LED);
@@ -94,10 +128,16 @@ int main(void)
             }
 
             PORTB &= ~((1 << RED_LED) | (1 << YELLOW_LED));
+            heartbeat_ms += 5000;
 			UART_TxChar('B');
         }
 
         _delay_ms(10);
+        heartbeat_ms += 10;
+        if (heartbeat_ms >= HEARTBEAT_MS) {
+            heartbeat_ms = 0;
+            UART_TxChar('H');
+        }
     }
 
     return 0;
@@ -119,3 +159,94 @@ uint16_t ADC_Read(uint8_t channel)
     while (ADCSRA & (1 << ADSC));
     return ADC;
 }
+
+/* ---------------- RAW ADC STREAMING FUNCTIONS ---------------- */
+#if RAW_ADC_STREAM
+static volatile uint8_t sample_buf[2][STREAM_BLOCK];
+static volatile uint8_t fill_buf = 0;      /* buffer the ADC ISR is filling */
+static volatile uint8_t fill_pos = 0;
+static volatile uint8_t ready_buf = 0xFF;  /* buffer waiting to be sent, 0xFF = none */
+static volatile uint8_t overruns = 0;
+
+ISR(ADC_vect)
+{
+	sample_buf[fill_buf][fill_pos++] = ADCH;   /* left adjusted: top 8 bits */
+	if (fill_pos == STREAM_BLOCK) {
+		fill_pos = 0;
+		if (ready_buf == 0xFF) {
+			ready_buf = fill_buf;
+			fill_buf ^= 1;
+		} else {
+			overruns++;                        /* link too slow: drop this block */
+		}
+	}
+	TIFR1 = (1 << OCF1B);                      /* re-arm the Timer1 compare B auto trigger */
+}
+
+static void Stream_SendFrame(uint8_t type, uint8_t seq, const volatile uint8_t *payload, uint8_t len)
+{
+	uint8_t sum = type + seq + len;
+	UART_TxChar(0xA5);
+	UART_TxChar(0x5A);
+	UART_TxChar(type);
+	UART_TxChar(seq);
+	UART_TxChar(len);
+	for (uint8_t i = 0; i < len; i++) {
+		sum += payload[i];
+		UART_TxChar(payload[i]);
+	}
+	UART_TxChar(sum);
+}
+
+void Stream_Loop(void)
+{
+	uint8_t seq = 0;
+	uint8_t ir_was_blocked = 0;
+	uint16_t blocks = 0;
+	static const uint8_t ir_event = 'I';
+	static const uint8_t heartbeat_event = 'H';
+
+	UART_init((unsigned int)((F_CPU / 16UL) / STREAM_BAUDRATE - 1UL));
+
+	/* ADC: AVcc reference, left adjusted, auto triggered by Timer1 compare B, clk/64 */
+	ADMUX = (1 << REFS0) | (1 << ADLAR) | (SOUND_ADC_CHANNEL & 0x0F);
+	ADCSRB = (1 << ADTS2) | (1 << ADTS0);
+	ADCSRA = (1 << ADEN) | (1 << ADATE) | (1 << ADIE) | (1 << ADPS2) | (1 << ADPS1);
+
+	/* Timer1: CTC at STREAM_SAMPLE_RATE, prescaler 8 */
+	TCCR1A = 0;
+	TCCR1B = (1 << WGM12) | (1 << CS11);
+	OCR1A = (uint16_t)(F_CPU / 8UL / STREAM_SAMPLE_RATE - 1UL);
+	OCR1B = OCR1A;
+
+	sei();
+
+	while (1)
+	{
+		if (ready_buf != 0xFF) {
+			Stream_SendFrame('A', seq++, sample_buf[ready_buf], STREAM_BLOCK);
+			ready_buf = 0xFF;
+			/* Sample blocks keep time: heartbeat every HEARTBEAT_MS */
+			if (++blocks >= HEARTBEAT_MS * STREAM_SAMPLE_RATE / STREAM_BLOCK / 1000UL) {
+				blocks = 0;
+				Stream_SendFrame('E', seq++, &heartbeat_event, 1);
+			}
+		}
+
+		/* IR: report only the edge into "blocked", without the blocking LED blink */
+		uint8_t beam_blocked = (PIND & (1 << IR_RX_PIN)) ? 1 : 0;
+		if (beam_blocked && !ir_was_blocked) {
+			PORTB |= (1 << RED_LED);
+			Stream_SendFrame('E', seq++, &ir_event, 1);
+		} else if (!beam_blocked) {
+			PORTB &= ~(1 << RED_LED);
+		}
+		ir_was_blocked = beam_blocked;
+
+		/* Sound LED shows link overruns */
+		if (overruns) {
+			PORTB |= (1 << YELLOW_LED);
+		}
+	}
+}
+#endif
@@ -0,0 +1,197 @@
+"""
+Fleet aggregation server for uplinked units (see uplink.py for the wire format).
+
+One asyncio process accepts a long-lived TCP connection per site. Each BATCH
+frame is handed to a process pool, which decompresses, parses and evaluates it
+(event counts, alarm starts, latest status, fleet alerts) and returns a small
+summary; the event loop merges that into the fleet table, appends fleet alerts
+to a log and only then sends the ACK. Duplicates from resends (at-least-once
+delivery) are recognised by the per-site sequence number and acknowledged
+without being processed again.
+
+    python aggregator.py --port 9200 --workers 4 --metrics-port 9201
+    python uplink.py --fake-sites 1000 --events 100 --port 9200     # local load test
+
+GET http://127.0.0.1:<metrics-port>/metrics.json shows the fleet table alongside
+the aggregator's own ingest latency histograms.
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import datetime as dt
+import os
+import time
+
+from metrics import Metrics, start_metrics_server
+from uplink import ACK, BATCH, HEADER, HELLO, MAGIC, MAX_FRAME, SEQ, VERSION, decode_batch, encode_frame
+
+ALERT_LOG = "fleet_alerts.log"
+
+
+def evaluate_batch(site, body, alarm_before=False):
+    """Worker-process side: decode and evaluate one batch; returns (seq, summary)."""
+    seq, records = decode_batch(body)
+    kinds = collections.Counter()
+    alerts = []
+    status = None
+    alarm = alarm_before
+    last_time = 0.0
+    for timestamp, kind, data in records:
+        kinds[kind] += 1
+        last_time = max(last_time, timestamp)
+        if kind == "status":
+            if data.get("alarm") and not alarm:
+                alerts.append((timestamp, f"ALARM at {site} (zones: {', '.join(data.get('armed_zones', [])) or 'none'})"))
+            status = data
+            alarm = bool(data.get("alarm"))
+        elif kind == "rule":
+            alerts.append((timestamp, f"Rule '{data.get('rule')}' matched at {site}: {', '.join(data.get('sensors', []))}"))
+    return seq, {"events": len(records), "kinds": dict(kinds), "alerts": alerts, "status": status, "last_time": last_time}
+
+
+class SiteState:
+    """What the aggregator knows about one site."""
+
+    __slots__ = ("site", "last_seq", "events", "kinds", "status", "last_event", "last_seen", "connected")
+
+    def __init__(self, site):
+        self.site = site
+        self.last_seq = 0
+        self.events = 0
+        self.kinds = collections.Counter()
+        self.status = None
+        self.last_event = None
+        self.last_seen = None
+        self.connected = False
+
+    def as_dict(self):
+        return {"events": self.events, "kinds": dict(self.kinds), "status": self.status, "last_seq": self.last_seq,
+                "last_event": self.last_event, "last_seen": self.last_seen, "connected": self.connected}
+
+
+class Aggregator:
+    def __init__(self, host="127.0.0.1", port=9200, workers=None, alert_log=ALERT_LOG, metrics=None):
+        self.host = host
+        self.port = port
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self.alert_log = alert_log
+        self.metrics = metrics or Metrics()
+        self.sites = {}
+        self.server = None
+
+    def site(self, name):
+        state = self.sites.get(name)
+        if state is None:
+            state = self.sites[name] = SiteState(name)
+        return state
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_FRAME)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _read_frame(self, reader):
+        magic, version, kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+        if magic != MAGIC or version != VERSION or length > MAX_FRAME:
+            raise ValueError("Malformed uplink frame.")
+        return kind, await reader.readexactly(length)
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        state = None
+        try:
+            kind, body = await self._read_frame(reader)
+            if kind != HELLO:
+                raise ValueError("Expected HELLO.")
+            state = self.site(body.decode())
+            state.connected = True
+            self.metrics.incr("connections")
+            while True:
+                kind, body = await self._read_frame(reader)
+                if kind != BATCH:
+                    continue
+                received = time.perf_counter()
+                seq = SEQ.unpack_from(body)[0]
+                if seq > state.last_seq:
+                    seq, summary = await loop.run_in_executor(self.pool, evaluate_batch, state.site, body,
+                                                             bool(state.status and state.status.get("alarm")))
+                    self._merge(state, seq, summary)
+                else:
+                    self.metrics.incr("duplicate_batches")
+                writer.write(encode_frame(ACK, SEQ.pack(seq)))
+                await writer.drain()
+                self.metrics.observe("batch_ingest", time.perf_counter() - received)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            # Malformed frame or undecodable batch: unacknowledged batches will be resent on reconnect
+            print(f"Dropping connection from {state.site if state else 'unknown site'}: {e}")
+        finally:
+            if state is not None:
+                state.connected = False
+            writer.close()
+
+    def _merge(self, state, seq, summary):
+        state.last_seq = seq
+        state.events += summary["events"]
+        state.kinds.update(summary["kinds"])
+        if summary["status"] is not None:
+            state.status = summary["status"]
+        state.last_event = summary["last_time"] or state.last_event
+        state.last_seen = time.time()
+        self.metrics.incr("batches")
+        self.metrics.incr("events", summary["events"])
+        if summary["alerts"]:
+            self.metrics.incr("fleet_alerts", len(summary["alerts"]))
+            with open(self.alert_log, "a") as f:
+                for timestamp, message in summary["alerts"]:
+                    stamp = dt.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+                    f.write(f"[{stamp}] - {message}\n")
+
+    def fleet(self):
+        sites = list(self.sites.values())
+        return {
+            "sites": len(sites),
+            "connected": sum(1 for s in sites if s.connected),
+            "alarming": sorted(s.site for s in sites if s.status and s.status.get("alarm")),
+            "site_table": {s.site: s.as_dict() for s in sites},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--alert-log", default=ALERT_LOG)
+    parser.add_argument("--metrics-port", type=int, help="serve /metrics and /metrics.json (with the fleet table)")
+    args = parser.parse_args()
+
+    async def run():
+        aggregator = await Aggregator(args.host, args.port, args.workers, args.alert_log).start()
+        if args.metrics_port:
+            start_metrics_server(aggregator.metrics, args.metrics_port, extra_json=aggregator.fleet)
+        print(f"Aggregator listening on {args.host}:{aggregator.port} with {args.workers} workers.")
+        try:
+            await aggregator.serve_forever()
+        finally:
+            aggregator.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Local push API: REST for state and commands, Server-Sent Events for live deltas.
+
+Runs an asyncio HTTP server on its own daemon thread (standard library only):
+
+    GET  /api/status              armed zones, alarm, suppression, next schedule transition
+    GET  /api/sensors             sensor_data
+    GET  /api/schedule            weekly rules, holidays, schedule zones
+    GET  /api/events?limit=N      most recent counted events (event history)
+    GET  /api/workers             health of the supervised ingestion workers
+    GET  /api/sources             per-source throughput and error counters (SENSOR_SOURCES)
+    POST /api/arm      {"zones": "Perimeter,Interior"}   (omit zones = all)
+    POST /api/disarm   {"zones": ...}
+    POST /api/stop_alarm
+    POST /api/suppress {"seconds": 600, "zones": "Interior"} or {"seconds": 600, "sensors": ["IR_Hallway"]}
+    GET  /api/stream              text/event-stream: snapshot, then intrusion/status/sensor/rule/schedule deltas
+
+Every delta is serialised once and the same bytes are queued to every connected
+stream, so N dashboards cost one encode and N queue appends per event instead of
+N polls per second. A client that falls too far behind is disconnected rather
+than buffering without bound. Commands run on the Tk thread via the app's event queue;
+reads take a copy from the API thread and never wait for the GUI.
+"""
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+MAX_BODY = 64 * 1024
+CLIENT_QUEUE = 256          # pending deltas per stream before the client is dropped
+KEEPALIVE_S = 15.0          # SSE comment line so proxies keep idle streams open
+COMMAND_TIMEOUT_S = 5.0     # how long a command waits for the Tk thread
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _copy(func, attempts=5):
+    """Runs a snapshot function, retrying if the Tk thread resized a dict under it."""
+    for _ in range(attempts - 1):
+        try:
+            return func()
+        except RuntimeError:
+            time.sleep(0)
+    return func()
+
+
+def status_snapshot(app):
+    """Armed state, alarm, suppression and next schedule transition as plain JSON types."""
+    transition = app.next_schedule_transition
+    return {
+        "active": app.is_active,
+        "armed_zones": app.zones.names_for(app.armed_zones),
+        "zones": list(app.zones.names),
+        "alarm": app.is_alarm_sounding,
+        "triggered": sorted(app.triggered_sensor_names),
+        "suppressed_zones": app.zones.names_for(app.suppressed_zones),
+        "suppressed_sensors": sorted(app.suppressed_sensors),
+        "next_transition": {"at": transition[0].isoformat(), "active_after": transition[1]} if transition else None,
+        "sensors": len(app.sensor_data),
+        "noisy_sensors": sorted(app.baselines.flagged),
+        "offline": sorted(app.offline_sensors),
+    }
+
+
+class ApiServer:
+    """Owns the event loop thread, the HTTP listener and the SSE subscribers."""
+
+    def __init__(self, app, host="127.0.0.1", port=8765, token=None, metrics=None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.token = token
+        self.metrics = metrics
+        self.loop = None
+        self._server = None
+        self._clients = {}          # subscriber queue -> its stream task
+        self._keepalive_task = None  # runs only while there are subscribers
+        self._ids = itertools.count(1)
+        self._ready = threading.Event()
+        self._error = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the server thread; raises OSError if the port cannot be bound."""
+        threading.Thread(target=self._run, daemon=True, name="api-server").start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._shutdown)
+
+    def _shutdown(self):
+        self._server.close()
+        for task in list(self._clients.values()):
+            task.cancel()
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+        self.loop.call_soon(self.loop.stop)
+
+    # --- Publishing (called from any thread) ---
+
+    def publish(self, kind, data):
+        """Queues a delta for every stream. Cheap on the caller's thread: no encoding, no I/O."""
+        if self.loop is not None and self._clients:
+            self.loop.call_soon_threadsafe(self._fanout, kind, data)
+
+    def _fanout(self, kind, data):
+        payload = self._encode(kind, data)
+        for queue, task in list(self._clients.items()):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Too slow to keep up: disconnect instead of buffering forever
+                del self._clients[queue]
+                task.cancel()
+
+    def _encode(self, kind, data):
+        return f"id: {next(self._ids)}\nevent: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+    async def _keepalive(self):
+        """Keeps idle streams open through proxies; ends with the last subscriber, so no clients cost no wakeups."""
+        try:
+            while self._clients:
+                await asyncio.sleep(KEEPALIVE_S)
+                if self.metrics:
+                    self.metrics.wakeup("api_keepalive")
+                for queue in list(self._clients):
+                    if not queue.full():
+                        queue.put_nowait(b": keepalive\n\n")
+        finally:
+            self._keepalive_task = None
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, query, headers, body = await self._read_request(reader)
+            if path == "/api/stream" and method == "GET":
+                self._authorize(headers, query)
+                await self._stream(writer)
+                return
+            status, result = 200, await self._route(method, path, query, headers, body)
+        except HTTPError as e:
+            status, result = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            status, result = 400, {"error": str(e)}
+        try:
+            body = json.dumps(result, default=str).encode()
+        except (TypeError, ValueError) as e:
+            # A response that cannot be encoded is our bug, not the client's; answer instead of hanging up
+            status, body = 500, json.dumps({"error": f"Could not encode response: {e}"}).encode()
+        writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                     "Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     "Access-Control-Allow-Origin: *\r\n"
+                     "Connection: close\r\n\r\n".encode() + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return method, url.path, parse_qs(url.query), headers, body
+
+    def _authorize(self, headers, query):
+        if self.token is None:
+            return
+        supplied = headers.get("authorization", "").removeprefix("Bearer ").strip() or query.get("token", [""])[0]
+        if supplied != self.token:
+            raise HTTPError(401, "Missing or invalid token.")
+
+    async def _route(self, method, path, query, headers, body):
+        self._authorize(headers, query)
+        if method == "GET":
+            if path == "/api/status":
+                return _copy(self.status)
+            if path == "/api/sensors":
+                return _copy(lambda: {name: dict(data) for name, data in self.app.sensor_data.items()})
+            if path == "/api/schedule":
+                return _copy(self.schedule)
+            if path == "/api/events":
+                limit = max(1, min(int(query.get("limit", ["100"])[0]), 10000))
+                return [event.as_dict() for event in self.app.event_history.last(limit)]
+            if path == "/api/workers":
+                return self.app.supervisor.health()
+            if path == "/api/sources":
+                return self.app.sources.stats() if self.app.sources else {}
+            raise HTTPError(404, f"No such resource: {path}")
+        if method == "POST":
+            args = json.loads(body) if body.strip() else {}
+            if path in ("/api/arm", "/api/disarm"):
+                zones = args.get("zones")
+                mask = self.app.zones.all_mask if zones in (None, "") else self.app.zones.mask_for(zones)
+                action = self.app.activate_system if path == "/api/arm" else self.app.deactivate_system
+                await self._on_tk_thread(action, mask)
+                return _copy(self.status)
+            if path == "/api/stop_alarm":
+                await self._on_tk_thread(self.app._stop_alarm)
+                return _copy(self.status)
+            if path == "/api/suppress":
+                try:
+                    seconds = float(args["seconds"])
+                except (KeyError, TypeError, ValueError):
+                    raise HTTPError(400, "'seconds' must be a number.")
+                # Validate the whole request first so a bad entry never leaves a partial suppression behind
+                try:
+                    mask = self.app.zones.mask_for(args["zones"]) if args.get("zones") else 0
+                except (TypeError, ValueError) as e:
+                    raise HTTPError(400, str(e))
+                sensors = args.get("sensors", [])
+                if not isinstance(sensors, list):
+                    raise HTTPError(400, "'sensors' must be a list of sensor names.")
+                for name in sensors:
+                    if name not in self.app.sensor_data:
+                        raise HTTPError(400, f"Unknown sensor: {name}")
+                if mask:
+                    await self._on_tk_thread(self.app.suppress_zones, mask, seconds)
+                for name in sensors:
+                    await self._on_tk_thread(self.app.suppress_sensor, name, seconds)
+                return _copy(self.status)
+            raise HTTPError(404, f"No such command: {path}")
+        raise HTTPError(405, f"{method} not allowed.")
+
+    async def _on_tk_thread(self, func, *args):
+        """Runs func on the Tk thread and waits for it (503 if the GUI does not respond)."""
+        future = concurrent.futures.Future()
+
+        def call():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.app.events.call(call)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), COMMAND_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            raise HTTPError(503, "The GUI thread did not respond in time.")
+
+    async def _stream(self, writer):
+        queue = asyncio.Queue(CLIENT_QUEUE)
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n"
+                     b"Connection: keep-alive\r\n\r\n")
+        writer.write(self._encode("snapshot", {"status": _copy(self.status),
+                                               "sensors": _copy(lambda: {n: d["status"] for n, d in self.app.sensor_data.items()})}))
+        self._clients[queue] = asyncio.current_task()
+        if self._keepalive_task is None:
+            self._keepalive_task = self.loop.create_task(self._keepalive())
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.pop(queue, None)
+            writer.close()
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    # --- Snapshots ---
+
+    def status(self):
+        return status_snapshot(self.app)
+
+    def schedule(self):
+        app = self.app
+        schedule = app.schedule.to_dict()
+        # JSON object keys must be strings: date exceptions are keyed by ISO date
+        schedule["exceptions"] = {day.isoformat(): windows for day, windows in schedule["exceptions"].items()}
+        return {
+            "rules": app.schedule.rules_text(),
+            "holidays": app.schedule.holidays_text(),
+            "zones": app.zones.names_for(app.schedule_zones),
+            "schedule": schedule,
+        }
@@ -0,0 +1,199 @@
+"""
+Adaptive per-sensor trigger baselines: spots sensors firing far above their normal rate.
+
+Each sensor that has ever fired gets a fixed-size SensorStats record:
+
+    rate       EWMA event rate (events/s, time constant `tau`), updated per event in O(1)
+    slots      learned events per hour for each of the 168 hours of the week
+    mean       learned events per hour over all hours (used for slots not seen yet)
+
+Hour counts are folded into the hour-of-week slots lazily, when a sensor's next
+event lands in a later hour (silent hours are folded in as zeros), so quiet
+sensors cost nothing and memory per sensor never grows.
+
+A sensor is anomalous when its current rate (per hour) exceeds
+`factor` * expected + `min_excess`, where expected is the learned rate for the
+current hour of the week. A sensor that stays anomalous for `sustain_s` is flagged
+for `flag_s`; a short burst (an intruder walking past) never is. A flag is
+re-evaluated on the first event after it runs out. Events of a flagged sensor
+still move its current rate but are not learned into the slots, so the baseline
+does not drift up to the noise.
+
+With `quarantine` on, the caller still records a flagged sensor's events but does
+not alarm, notify or redraw for them, and only once the sensor has `min_history_h`
+hours of learned history: until then its "normal" is a guess, and a flag only
+marks it as noisy. rearm() drops the current rate and flag of sensors whose zone
+is being armed, so activity while disarmed (cooking in the kitchen) is not held
+against them afterwards.
+"""
+import math
+import time
+from array import array
+
+HOURS_PER_WEEK = 168
+
+
+def week_slot(hour):
+    """Hour-of-week slot (0 = Monday 00:00, local time) of an absolute epoch hour."""
+    t = time.localtime(hour * 3600)
+    return t.tm_wday * 24 + t.tm_hour
+
+
+class SensorStats:
+    """Streaming trigger statistics for one sensor, constant size."""
+
+    __slots__ = ("rate", "last", "hour", "count", "slots", "seen", "mean", "hours", "flagged_until", "over_since")
+
+    def __init__(self, t):
+        self.rate = 0.0
+        self.last = t
+        self.hour = int(t // 3600)                   # absolute hour `count` belongs to
+        self.count = 0                               # events so far in that hour
+        self.slots = array("f", bytes(4 * HOURS_PER_WEEK))
+        self.seen = bytearray(HOURS_PER_WEEK)        # 1 once a slot has a learned value
+        self.mean = 0.0
+        self.hours = 0                               # hours folded in so far
+        self.flagged_until = None
+        self.over_since = None                       # when the rate went (and stayed) over the threshold
+
+
+class SensorBaselines:
+    """
+    Per-sensor baselines for the whole site. observe() is called for every trigger
+    (armed or not, so the baselines learn normal household activity) and returns
+    the flag expiry when the sensor has just been flagged.
+    """
+
+    def __init__(self, tau=300.0, alpha=0.25, mean_alpha=1 / 24, factor=4.0, min_excess=120.0,
+                 flag_s=1800.0, quarantine=True, sustain_s=600.0, min_history_h=HOURS_PER_WEEK):
+        self.tau = tau                   # EWMA time constant of the current rate (s)
+        self.alpha = alpha               # learning rate of an hour-of-week slot (once per week)
+        self.mean_alpha = mean_alpha     # learning rate of the all-hours mean (once per hour)
+        self.factor = factor
+        self.min_excess = min_excess     # events/hour above the scaled baseline before flagging
+        self.flag_s = flag_s
+        self.quarantine = quarantine     # False: flag only, never suppress
+        self.sustain_s = sustain_s       # how long a sensor must stay anomalous before it is flagged
+        self.min_history_h = min_history_h  # learned hours before a flag may quarantine
+        self.stats = {}
+        self.flagged = set()
+        self._slot_hour = None
+        self._slot = 0
+
+    def _fold(self, s, hour):
+        """Moves s forward to absolute `hour`, folding finished hours into the slots."""
+        count = s.count
+        # Beyond a week of silence every slot would only see zeros again; fold one week's worth
+        for h in range(max(s.hour, hour - HOURS_PER_WEEK), hour):
+            slot = week_slot(h)
+            if s.seen[slot]:
+                s.slots[slot] += self.alpha * (count - s.slots[slot])
+            else:
+                s.slots[slot] = count
+                s.seen[slot] = 1
+            s.mean += self.mean_alpha * (count - s.mean)
+            s.hours += 1
+            count = 0
+        s.hour = hour
+        s.count = 0
+
+    def expected(self, s, hour):
+        """Learned events per hour for `hour` (the slot if seen, else the all-hours mean)."""
+        if hour != self._slot_hour:
+            self._slot_hour, self._slot = hour, week_slot(hour)
+        return s.slots[self._slot] if s.seen[self._slot] else s.mean
+
+    def observe(self, name, t):
+        """Records one trigger of `name` at epoch time t; returns the flag expiry if it is flagged now."""
+        s = self.stats.get(name)
+        if s is None:
+            s = self.stats[name] = SensorStats(t)
+        hour = int(t // 3600)
+        if hour > s.hour:
+            self._fold(s, hour)
+        s.rate = s.rate * math.exp(-max(t - s.last, 0.0) / self.tau) + 1.0 / self.tau
+        s.last = t
+
+        if s.flagged_until is not None:
+            if t < s.flagged_until:
+                return None  # noise: not learned
+            s.flagged_until = None
+            self.flagged.discard(name)
+        s.count += 1
+        if s.rate * 3600 <= self.factor * self.expected(s, hour) + self.min_excess:
+            s.over_since = None
+            return None
+        if s.over_since is None:
+            s.over_since = t
+        if t - s.over_since < self.sustain_s:
+            return None
+        # over_since stays: still this noisy when the flag runs out, the sensor is flagged again at once
+        s.flagged_until = t + self.flag_s
+        self.flagged.add(name)
+        return s.flagged_until
+
+    def is_quarantined(self, name):
+        """True if events of `name` should not raise alarms right now."""
+        return self.quarantine and name in self.flagged and self.stats[name].hours >= self.min_history_h
+
+    def rearm(self, names):
+        """The zones of `names` are being armed: forget their current rate and flags; returns the released names."""
+        released = []
+        for name in names:
+            s = self.stats.get(name)
+            if s is not None:
+                s.rate = 0.0
+                s.over_since = None
+                if name in self.flagged:
+                    self.release(name)
+                    released.append(name)
+        return released
+
+    def expire(self, t):
+        """Ends flags that have run out by time t; returns the released names."""
+        released = [n for n in self.flagged if self.stats[n].flagged_until <= t]
+        for name in released:
+            self.release(name)
+        return released
+
+    def release(self, name):
+        """Clears a flag early (the sensor keeps its learned baseline)."""
+        s = self.stats.get(name)
+        if s is not None:
+            s.flagged_until = None
+        self.flagged.discard(name)
+
+    def describe(self, name):
+        """'<rate>/h against a baseline of <expected>/h' as of the sensor's last event."""
+        s = self.stats[name]
+        return f"{s.rate * 3600:.0f}/h against a baseline of {self.expected(s, s.hour):.1f}/h"
+
+    # --- Sensor table changes ---
+
+    def rename(self, old, new):
+        if old in self.stats:
+            self.stats[new] = self.stats.pop(old)
+        if old in self.flagged:
+            self.flagged.discard(old)
+            self.flagged.add(new)
+
+    def retain(self, names):
+        """Drops statistics of sensors that no longer exist."""
+        for name in [n for n in self.stats if n not in names]:
+            del self.stats[name]
+            self.flagged.discard(name)
+
+    # --- Persistence (learned baselines survive restarts) ---
+
+    def to_state(self):
+        return {name: (s.rate, s.last, s.hour, s.count, s.slots, s.seen, s.mean, s.hours, s.flagged_until)
+                for name, s in self.stats.items()}
+
+    def load_state(self, state):
+        self.stats = {}
+        self.flagged = set()
+        for name, values in (state or {}).items():
+            s = self.stats[name] = SensorStats(values[1])
+            (s.rate, s.last, s.hour, s.count, s.slots, s.seen, s.mean, s.hours, s.flagged_until) = values
+            if s.flagged_until is not None:
+                self.flagged.add(name)
@@ -0,0 +1,639 @@
+"""
+Reproducible micro- and macro-benchmarks for the hot paths of interface.py.
+
+Runs headless (stubbed Tk canvas by default, or a real Tk under Xvfb with --real-tk)
+and writes machine-readable JSON. With --baseline, every metric is compared with a
+previous run and the process exits with status 1 if any regressed beyond --tolerance.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --tolerance 0.25
+    python benchmarks/run_benchmarks.py --quick --only sensor_lookup,hit_test
+
+Metric naming decides the comparison direction: *_per_s is higher-is-better,
+*_s / *_us / *_bytes are lower-is-better, anything else is informational.
+
+The idle benchmark also checks absolute budgets (IDLE_*_BUDGET): a quiet, armed
+system must not poll, so going over fails the run even without a baseline. The
+baselines benchmark likewise fails the run if a burst from a quiet sensor does
+not alarm or a chattering one is never quarantined.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import headless  # noqa: E402
+
+FULL_SIZES = [10, 100, 1000, 10000, 100000]
+QUICK_SIZES = [10, 100, 1000]
+IDLE_WAKEUPS_PER_MIN_BUDGET = 1     # everything left is event-driven; the schedule monitor sleeps up to an hour
+IDLE_CPU_BUDGET = 0.001             # fraction of one core
+
+
+def _timeit(func, min_time=0.2, max_runs=100000):
+    """Runs func repeatedly for at least min_time; returns seconds per call (best of 3 batches)."""
+    best = None
+    for _ in range(3):
+        runs = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / 3 or runs >= max_runs:
+                break
+        per_call = elapsed / runs
+        best = per_call if best is None else min(best, per_call)
+    return best
+
+
+def _populate(app, count, seed=1, triggered_fraction=0.0):
+    """Replaces the sensor map with `count` sensors spread over the floor plan."""
+    rng = random.Random(seed)
+    sensors = {}
+    for i in range(count):
+        sensor_type = "IR" if i % 2 else "Sound"
+        sensors[f"{sensor_type}_{i}"] = {
+            "x": rng.randint(20, 380), "y": rng.randint(30, 230),
+            "type": sensor_type,
+            "status": "Triggered" if rng.random() < triggered_fraction else "Normal",
+            "zones": app.zones.all_mask,
+        }
+    app.sensor_data = sensors
+
+
+class _Pointer:
+    """The fields of a Tk mouse event the map handlers read."""
+
+    def __init__(self, x, y, state=0):
+        self.x, self.y, self.state = x, y, state
+
+
+class Suite:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.sizes = QUICK_SIZES if args.quick else FULL_SIZES
+        self.app, self.master = headless.build_app(workdir, real_tk=args.real_tk)
+        self.app.activate_system()
+        self.master.run_pending()
+        self.budget_failures = []
+
+    # --- Benchmarks ---
+
+    def serial_trigger(self):
+        app, master = self.app, self.master
+        _populate(app, 100)
+        n = 2000 if self.args.quick else 20000
+        keys = "IS" * (n // 2)
+        app._stop_alarm()
+        master.run_pending()
+        batches = app.metrics.counter("event_batches")
+        dispatch = handled = 0.0
+        # Bursts below the event queue capacity, each drained by the Tk-side poller
+        chunk = 1000
+        for i in range(0, n, chunk):
+            start = time.perf_counter()
+            for key in keys[i:i + chunk]:
+                app._handle_serial_trigger(key)
+            dispatch += time.perf_counter() - start
+            start = time.perf_counter()
+            master.run_pending()
+            handled += time.perf_counter() - start
+        return {
+            "dispatch_per_s": round(n / dispatch),
+            "dispatch_us": dispatch / n * 1e6,
+            "end_to_end_per_s": round(n / (dispatch + handled)),
+            "events_per_batch": n / max(1, app.metrics.counter("event_batches") - batches),
+            "events_overflow": app.metrics.counter("events_overflow"),
+        }
+
+    def sensor_lookup(self):
+        results = {}
+        for size in self.sizes:
+            # Worst case: every sensor is already triggered, so the lookup scans the whole map
+            _populate(self.app, size, triggered_fraction=1.0)
+            results[f"get_sensor_by_type_{size}_us"] = _timeit(lambda: self.app.get_sensor_by_type("IR")) * 1e6
+        return results
+
+    def map_rendering(self):
+        app = self.app
+        results = {}
+        sizes = [s for s in self.sizes if s <= 10000]
+        was_sounding, app.is_alarm_sounding = app.is_alarm_sounding, True
+        for size in sizes:
+            _populate(app, size, triggered_fraction=0.01)
+            app.triggered_sensor_names = {n for n, d in app.sensor_data.items() if d["status"] == "Triggered"}
+            results[f"draw_sensor_map_{size}_us"] = _timeit(app._draw_sensor_map) * 1e6
+            results[f"flicker_ui_{size}_us"] = _timeit(self._flicker_once) * 1e6
+        app.is_alarm_sounding = was_sounding
+        app.triggered_sensor_names = set()
+
+        # A large building: cost should follow what is on screen, not the sensor count
+        size = self.sizes[-1]
+        rng = random.Random(2)
+        app.sensor_data = {f"IR_{i}": {"x": rng.randint(0, 20000), "y": rng.randint(0, 20000), "type": "IR",
+                                       "status": "Normal", "zones": app.zones.all_mask} for i in range(size)}
+        app._draw_sensor_map()
+        steps = iter([(40, 0), (-40, 0)] * 1000000)
+
+        def pan():
+            app.map_view.viewport.pan(*next(steps))
+            app._draw_sensor_map()
+
+        results[f"pan_building_{size}_us"] = _timeit(pan) * 1e6
+        app.map_view.viewport.fit(20000, 20000)
+        results[f"draw_zoomed_out_building_{size}_us"] = _timeit(app._draw_sensor_map) * 1e6
+        app.map_view.viewport.scale, app.map_view.viewport.x0, app.map_view.viewport.y0 = 1.0, 0.0, 0.0
+        return results
+
+    def _flicker_once(self):
+        self.app._flicker_ui()
+        if self.app.flicker_id is not None:
+            self.app.timers.cancel(self.app.flicker_id)
+            self.app.flicker_id = None
+
+    def hit_test(self):
+        app = self.app
+        results = {}
+        for size in [s for s in self.sizes if s <= 10000]:
+            _populate(app, size)
+            app._draw_sensor_map()
+            points = [(d["x"], d["y"]) for d in list(app.sensor_data.values())[:50]]
+            points += [(5, 5)] * 10  # misses
+            it = iter(points * 100000)
+            results[f"find_sensor_at_{size}_us"] = _timeit(lambda: app._find_sensor_at(*next(it)), max_runs=len(points) * 100) * 1e6
+        return results
+
+    def bulk_edit(self):
+        """Dragging and retyping a selection: one save and one redraw per edit, whatever its size."""
+        app, master = self.app, self.master
+        counter = app.metrics.counter
+        results = {}
+        for size in [s for s in self.sizes if s <= 10000]:
+            _populate(app, size)
+            app._draw_sensor_map()
+            app._set_selection(list(app.sensor_data)[:100])
+            picked = len(app.selected_sensors)
+            before = counter("sensor_edits"), counter("saves"), counter("redraws")
+            steps = iter([10, -10] * 1000000)
+
+            def drag():
+                data = app.sensor_data[next(iter(app.selected_sensors))]
+                x, y = app.map_view.viewport.to_screen(data["x"], data["y"])
+                dx = next(steps)
+                app._start_drag(_Pointer(x, y))
+                for i in range(1, 11):
+                    app._do_drag(_Pointer(x + dx * i / 10, y))
+                app._stop_drag(_Pointer(x + dx, y))
+                master.run_pending()
+
+            results[f"group_move_{picked}_of_{size}_s"] = _timeit(drag, max_runs=50)
+            types = iter(["IR", "Sound"] * 1000000)
+
+            def retype():
+                app.retype_sensors(app.selected_sensors, next(types))
+                master.run_pending()
+
+            results[f"group_retype_{picked}_of_{size}_s"] = _timeit(retype, max_runs=50)
+            edits = max(1, counter("sensor_edits") - before[0])
+            results[f"saves_per_edit_{size}"] = (counter("saves") - before[1]) / edits
+            results[f"redraws_per_edit_{size}"] = (counter("redraws") - before[2]) / edits
+        app._set_selection(())
+        return results
+
+    def persistence(self):
+        import interface
+        app = self.app
+        results = {}
+        for size in self.sizes:
+            _populate(app, size)
+            results[f"save_state_{size}_s"] = _timeit(app._save_state, max_runs=20)
+            results[f"state_file_{size}_bytes"] = os.path.getsize(interface.STATE_FILE)
+            results[f"load_state_{size}_s"] = _timeit(app._load_state, max_runs=20)
+        return results
+
+    def logging(self):
+        import interface
+        app = self.app
+        if os.path.exists(interface.LOG_FILE):
+            os.remove(interface.LOG_FILE)
+        n = 500 if self.args.quick else 5000
+        start = time.perf_counter()
+        for i in range(n):
+            app._log_alert("IR_1", "IR", f"Intrusion detected by IR_1 (IR)! #{i}")
+        elapsed = time.perf_counter() - start
+        self.master.run_pending()
+        results = {"log_alert_per_s": round(n / elapsed), "log_alert_us": elapsed / n * 1e6}
+
+        lines = 10000 if self.args.quick else 200000
+        stamp = dt.datetime(2025, 1, 1)
+        with open(interface.LOG_FILE, "w") as f:
+            for i in range(lines):
+                when = (stamp + dt.timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")
+                f.write(f"[{when}] - IR_{i % 50} | IR | Intrusion detected by IR_{i % 50} (IR)!\n")
+        results[f"load_log_{lines}_lines_s"] = _timeit(self._reload_log, max_runs=5)
+        results["log_file_bytes"] = os.path.getsize(interface.LOG_FILE)
+        return results
+
+    def _reload_log(self):
+        self.app.log_text.delete("1.0", "end")
+        self.app._load_log()
+
+    def timers(self):
+        from timer_wheel import TimerWheel
+        n = 20000 if self.args.quick else 200000
+        rng = random.Random(3)
+        # Mix of flicker-like, suppression-like and long delays
+        delays = [rng.choice((rng.random(), rng.random() * 300, rng.random() * 86400)) for _ in range(n)]
+        wheel = TimerWheel(0.0)
+        start = time.perf_counter()
+        handles = [wheel.schedule(0.0, d, int) for d in delays]
+        scheduled = time.perf_counter() - start
+        start = time.perf_counter()
+        for handle in handles[::2]:
+            wheel.cancel(handle)
+        cancelled = time.perf_counter() - start
+        start = time.perf_counter()
+        wakeups = 0
+        while len(wheel):
+            wheel.advance(wheel.next_deadline())
+            wakeups += 1
+        drained = time.perf_counter() - start
+        return {"timer_schedule_us": scheduled / n * 1e6, "timer_cancel_us": cancelled / (n // 2) * 1e6,
+                "timer_fire_us": drained / (n - n // 2) * 1e6, "timer_wakeups": wakeups}
+
+    def sources(self):
+        """SourceHub throughput with TCP, Unix socket and UDP sources all sending at once."""
+        import socket
+        import threading
+        from sources import SourceHub, TcpSource, UdpSource, UnixSource
+
+        per_client = 2000 if self.args.quick else 20000
+        tcp_clients, udp_clients = 8, 2
+        expected = (tcp_clients + 1 + udp_clients) * per_client
+        count = [0]
+
+        def sink(name, event, arrived):
+            count[0] += 1
+
+        hub = SourceHub(sink, {"I": "I", "S": "S"})
+        tcp = hub.add(TcpSource("tcp", "127.0.0.1", 0))
+        udp = hub.add(UdpSource("udp", "127.0.0.1", 0))
+        unix = hub.add(UnixSource("unix", os.path.join(self.workdir, "sources.sock")))
+        threading.Thread(target=hub.run, daemon=True).start()
+        time.sleep(0.2)
+
+        lines = b"".join(b"IR_%d\n" % (i % 50) for i in range(per_client))
+
+        def stream(family, address):
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.connect(address)
+                sock.sendall(lines)
+
+        def datagrams():
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                batch = b"I\n" * 50
+                for _ in range(per_client // 50):
+                    sock.sendto(batch, ("127.0.0.1", udp.port))
+                    time.sleep(0.0005)  # UDP has no flow control; stay below what the loop can take
+
+        senders = [threading.Thread(target=stream, args=(socket.AF_INET, ("127.0.0.1", tcp.port))) for _ in range(tcp_clients)]
+        senders.append(threading.Thread(target=stream, args=(socket.AF_UNIX, unix.path)))
+        senders += [threading.Thread(target=datagrams) for _ in range(udp_clients)]
+        start = time.perf_counter()
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+        deadline = time.monotonic() + 30
+        while count[0] + udp.stats.dropped < expected and time.monotonic() < deadline:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        hub.stop()
+        return {"sources_events_per_s": round(count[0] / elapsed), "sources_events": count[0],
+                "sources_udp_dropped": udp.stats.dropped}
+
+    def baselines(self):
+        """
+        Noisy-sensor quarantine on a simulated clock, after a week of quiet history
+        (one trigger a day per sensor) and in the armed night window:
+        a burst of 11 triggers in 20 s must alarm and stay unquarantined, a sensor
+        chattering at 2 Hz must be quarantined, and chatter while disarmed must not
+        carry over once the zone is armed again.
+        """
+        import interface
+        from simulator import Simulator
+
+        saved = {name: getattr(interface, name) for name in ("LOG_FILE", "STATE_FILE", "STALL_LOG", "RULES_FILE")}
+        os.makedirs(os.path.join(self.workdir, "baselines"), exist_ok=True)
+        sim = Simulator(workdir=os.path.join(self.workdir, "baselines"))
+        app = sim.app
+        quarantined = lambda: app.metrics.counter("events_quarantined")
+        probes = {}
+
+        def probe(key, func):
+            return lambda: probes.__setitem__(key, func())
+
+        try:
+            day = 86400
+            start = sim.clock.time()
+            for d in range(8):
+                for i, name in enumerate(app.sensor_data):
+                    sim.at(start + d * day + 12 * 3600 + i * 60, sim.trigger, name)
+            night = start + 8 * day
+            # Burst: an intruder in front of a quiet sensor
+            sim.at(night + 1790, probe("burst_before", quarantined))
+            for i in range(11):
+                sim.at(night + 1800 + i * 2, sim.trigger, "IR_LivingRoom")
+            sim.at(night + 1825, probe("burst_alarm", lambda: app.is_alarm_sounding))
+            sim.at(night + 1830, probe("burst_after", quarantined))
+            # Chatter: a faulty sensor at 2 Hz for an hour
+            for i in range(7200):
+                sim.at(night + 3600 + i / 2, sim.trigger, "IR_Hallway")
+            sim.at(night + 3599, probe("chatter_before", quarantined))
+            sim.at(night + 7200, probe("chatter_after", quarantined))
+            # Cooking while disarmed, then armed again
+            sim.at(night + 3 * 3600, app._set_armed_zones, 0)
+            for i in range(3600):
+                sim.at(night + 3 * 3600 + 60 + i / 2, sim.trigger, "Sound_Kitchen")
+            sim.at(night + 3 * 3600 + 1900, probe("disarmed_flagged", lambda: "Sound_Kitchen" in app.baselines.flagged))
+            sim.at(night + 3 * 3600 + 2400, app._set_armed_zones, app.zones.all_mask)
+            sim.at(night + 3 * 3600 + 2700, sim.trigger, "Sound_Kitchen")
+            sim.at(night + 3 * 3600 + 2705, probe("rearmed_alarm", lambda: app.is_alarm_sounding))
+            started = time.perf_counter()
+            sim.run(night + 4 * 3600 - start)
+            elapsed = time.perf_counter() - started
+        finally:
+            sim.close()
+            app.timers.cancel(app._silence_timer)
+            for name, value in saved.items():
+                setattr(interface, name, value)
+
+        results = {
+            "baseline_burst_quarantined": probes["burst_after"] - probes["burst_before"],
+            "baseline_burst_alarm": int(probes["burst_alarm"]),
+            "baseline_chatter_quarantined": probes["chatter_after"] - probes["chatter_before"],
+            "baseline_disarmed_flagged": int(probes["disarmed_flagged"]),
+            "baseline_rearmed_alarm": int(probes["rearmed_alarm"]),
+            "baseline_scenario_s": elapsed,
+        }
+        if results["baseline_burst_quarantined"] or not results["baseline_burst_alarm"]:
+            self.budget_failures.append("a burst from a quiet sensor was quarantined or did not alarm")
+        if not results["baseline_chatter_quarantined"]:
+            self.budget_failures.append("a chattering sensor was never quarantined")
+        if not results["baseline_rearmed_alarm"]:
+            self.budget_failures.append("chatter while disarmed kept the sensor from alarming once armed")
+        return results
+
+    def idle(self):
+        """Wakeups and CPU time of an armed, quiet system with the serial worker on a silent port and the API up."""
+        import serial
+        import interface
+
+        # A fresh app: the other benchmarks leave alarms (and their flicker timers) behind.
+        # Silence the suite's app too, its alarm keeps the audio device (and SDL's mixing thread) busy.
+        self.app._stop_alarm()
+        saved = {name: getattr(interface, name) for name in ("LOG_FILE", "STATE_FILE", "STALL_LOG", "RULES_FILE", "API_PORT")}
+        app, master = headless.build_app(os.path.join(self.workdir, "idle"), real_tk=self.args.real_tk)
+        try:
+            interface.API_PORT = 0  # any free port; build_app leaves the API off
+            app._start_api_server()
+            app.activate_system()
+            rescans_per_min = self._idle_rescans(app, 3.0 if self.args.quick else 30.0)
+            app.serial_port = serial.serial_for_url("loop://", timeout=interface.SERIAL_READ_TIMEOUT_S)
+            app.supervisor.add("serial", app._serial_worker, interrupt=app._interrupt_serial)
+            self._idle_loop(master, 0.5)  # let startup work settle
+            window = 3.0 if self.args.quick else 30.0
+            wakeups = app.metrics.counter("wakeups")
+            cpu = time.process_time()
+            callbacks = self._idle_loop(master, window, nap=None)
+            cpu = time.process_time() - cpu
+            wakeups = app.metrics.counter("wakeups") - wakeups
+            # The loopback port still delivers: the worker was blocked, not gone
+            app.serial_port.write(b"I\n")
+            self._idle_loop(master, 0.2)
+            delivered = app.metrics.counter("wakeups_serial")
+        finally:
+            app.supervisor.stop()
+            app.timers.cancel(app._silence_timer)
+            if app.api:
+                app.api.stop()
+            for name, value in saved.items():
+                setattr(interface, name, value)
+
+        results = {"idle_wakeups_per_min": wakeups / window * 60, "idle_tk_callbacks": callbacks,
+                   "idle_cpu_fraction": cpu / window, "idle_serial_lines": delivered,
+                   "idle_rescans_per_min": rescans_per_min}
+        if results["idle_wakeups_per_min"] > IDLE_WAKEUPS_PER_MIN_BUDGET:
+            self.budget_failures.append(f"idle wakeups {results['idle_wakeups_per_min']:.1f}/min > {IDLE_WAKEUPS_PER_MIN_BUDGET}/min")
+        if results["idle_cpu_fraction"] > IDLE_CPU_BUDGET:
+            self.budget_failures.append(f"idle CPU {results['idle_cpu_fraction']:.2%} > {IDLE_CPU_BUDGET:.2%}")
+        if delivered != 1:
+            self.budget_failures.append(f"serial worker delivered {delivered} lines after idling (expected 1)")
+        if rescans_per_min > IDLE_WAKEUPS_PER_MIN_BUDGET:
+            self.budget_failures.append(f"serial rescans without an Arduino {rescans_per_min:.1f}/min > {IDLE_WAKEUPS_PER_MIN_BUDGET}/min")
+        return results
+
+    @staticmethod
+    def _idle_rescans(app, seconds, speedup=1000):
+        """
+        Serial worker with no Arduino plugged in, its rescan waits shortened `speedup` times so that
+        `seconds` cover the backoff; returns rescan wakeups per (unscaled) minute.
+        """
+        import interface
+
+        saved = interface.SERIAL_RESCAN_S, interface.SERIAL_RESCAN_MAX_S
+        interface.SERIAL_RESCAN_S, interface.SERIAL_RESCAN_MAX_S = (s / speedup for s in saved)
+        app._serial_rescan_s = interface.SERIAL_RESCAN_S
+        app._open_serial_port = lambda: None
+        worker = types.SimpleNamespace(stopping=threading.Event(), beat=lambda: None)
+        thread = threading.Thread(target=app._serial_worker, args=(worker,), daemon=True)
+        rescans = app.metrics.counter("wakeups_serial_rescan")
+        try:
+            thread.start()
+            time.sleep(seconds)
+        finally:
+            worker.stopping.set()
+            thread.join()
+            interface.SERIAL_RESCAN_S, interface.SERIAL_RESCAN_MAX_S = saved
+            app._serial_rescan_s = interface.SERIAL_RESCAN_S
+            del app._open_serial_port
+        return (app.metrics.counter("wakeups_serial_rescan") - rescans) / (seconds * speedup) * 60
+
+    @staticmethod
+    def _idle_loop(master, seconds, nap=0.05):
+        """
+        Stands in for Tk's main loop: sleeps until the next after() callback is due. Work queued
+        by other threads is picked up after at most `nap` (None: only at the end, so the loop itself
+        costs no wakeups while measuring). Returns callbacks run.
+        """
+        end = time.monotonic() + seconds
+        ran = 0
+        while True:
+            due = master.next_due()
+            wait = (end if due is None else min(due, end)) - time.monotonic()
+            if wait > 0:
+                time.sleep(wait if nap is None else min(wait, nap))
+            if time.monotonic() >= end:
+                return ran
+            ran += master.run_pending()
+
+    def liveness(self):
+        """Tens of thousands of sensors beating every 5 s; 1% die halfway. Core load and detection latency."""
+        from liveness import LivenessTracker
+        n = 10000 if self.args.quick else 50000
+        period, timeout, duration = 5.0, 15.0, 60.0
+        rng = random.Random(4)
+        tracker = LivenessTracker(timeout)
+        names = [f"S_{i}" for i in range(n)]
+        dead = set(rng.sample(range(n), n // 100))
+        # Heartbeats in time order: (time, index), sensors out of phase with each other
+        beats = sorted((phase + k * period, i) for i, phase in enumerate(rng.random() * period for _ in range(n))
+                       for k in range(int(duration / period)) if not (i in dead and phase + k * period > duration / 2))
+        last = {}
+        detected = {}
+        beat_time = check_time = 0.0
+        checks = 0
+        start = time.perf_counter()
+        for t, i in beats:
+            due = tracker.next_deadline()
+            if due is not None and due <= t:
+                c = time.perf_counter()
+                for name in tracker.check(t):
+                    detected[name] = t
+                check_time += time.perf_counter() - c
+                checks += 1
+            b = time.perf_counter()
+            tracker.beat(names[i], t)
+            beat_time += time.perf_counter() - b
+            last[i] = t
+        while tracker.next_deadline() is not None and tracker.next_deadline() <= duration:
+            now = tracker.next_deadline()
+            for name in tracker.check(now):
+                detected[name] = now
+            checks += 1
+        elapsed = time.perf_counter() - start
+        found = {int(name[2:]) for name in detected}
+        latency = max(detected[names[i]] - last[i] for i in dead) if found >= dead else None
+        return {"liveness_beat_us": beat_time / len(beats) * 1e6, "liveness_heartbeats_per_s": round(len(beats) / elapsed),
+                "liveness_core_fraction": round(beat_time / duration + check_time / duration, 4),
+                "liveness_checks": checks, "liveness_missed": len(dead - found), "liveness_false_offline": len(found - dead),
+                "liveness_detect_latency_max": latency}
+
+    def rules(self):
+        import bench_rules
+        args = argparse.Namespace(sensors=1000, zones=16, rules=1000, events=20000 if self.args.quick else 100000,
+                                  rate=1000.0, seed=1)
+        result = bench_rules.run(args)
+        return {"rules_events_per_s": result["events_per_s"], "rules_us_per_event": result["us_per_event"]}
+
+
+BENCHMARKS = ["serial_trigger", "sensor_lookup", "map_rendering", "hit_test", "bulk_edit", "persistence", "logging", "timers", "liveness", "rules", "baselines", "sources", "idle"]
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regression descriptions (empty if none)."""
+    regressions = []
+    for bench, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(bench, {}).get(name)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            if name.endswith("_per_s"):
+                change = (old - value) / old
+            elif name.endswith(("_s", "_us", "_bytes")):
+                change = (value - old) / old
+            else:
+                continue
+            if change > tolerance:
+                regressions.append(f"{bench}.{name}: {old:.6g} -> {value:.6g} ({change:+.0%} worse)")
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--only", help="comma separated subset of: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for CI smoke runs")
+    parser.add_argument("--real-tk", action="store_true", help="use a real Tk root (needs a display, e.g. Xvfb)")
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    workdir = tempfile.mkdtemp(prefix="ids-bench-")
+    results = {}
+    budget_failures = []
+    try:
+        # The app prints on every save/alert; keep the benchmark output readable
+        real_stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            suite = Suite(args, workdir)
+            for name in selected:
+                results[name] = getattr(suite, name)()
+            budget_failures = suite.budget_failures
+        finally:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "quick": args.quick,
+            "real_tk": args.real_tk,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        report["regressions"] = regressions
+    if budget_failures:
+        report["budget_failures"] = budget_failures
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    for line in budget_failures:
+        print(f"OVER BUDGET {line}", file=sys.stderr)
+    sys.exit(1 if regressions or budget_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Clock abstraction for the detection pipeline.
+
+Everything in interface.py that reads the time (suppression windows, schedule
+transitions, log timestamps, event history, rule windows, latency stamps) goes
+through a clock object instead of calling datetime/time directly:
+
+    clock.now()        local naive datetime (like dt.datetime.now())
+    clock.time()       epoch seconds (like time.time())
+    clock.monotonic()  seconds for measuring intervals (like time.monotonic())
+    clock.sleep(s)     block the calling thread for s seconds
+
+SystemClock is the real thing. SimulatedClock only moves when its driver calls
+advance_to(), which is how simulator.py runs weeks of traffic in seconds.
+"""
+import datetime as dt
+import time
+
+
+class SystemClock:
+    """Wall-clock time; what the app uses when it is actually running."""
+
+    realtime = True
+
+    def now(self):
+        return dt.datetime.now()
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Virtual time that only advances when told to. Starts at `start` (datetime or epoch seconds)."""
+
+    realtime = False
+
+    def __init__(self, start=None):
+        if start is None:
+            start = dt.datetime(2026, 1, 5)  # a Monday, so default runs line up with weekly schedules
+        if isinstance(start, dt.datetime):
+            start = start.timestamp()
+        self._t = float(start)
+
+    def now(self):
+        return dt.datetime.fromtimestamp(self._t)
+
+    def time(self):
+        return self._t
+
+    # Monotonic and wall time are the same line in a simulation (no NTP steps)
+    monotonic = time
+
+    def advance_to(self, t):
+        """Moves the clock forward to epoch time t (never backwards)."""
+        if t > self._t:
+            self._t = t
+
+    def advance(self, seconds):
+        self.advance_to(self._t + seconds)
+
+    def sleep(self, seconds):
+        # Only meaningful for single-threaded drivers: sleeping is just advancing
+        self.advance(seconds)
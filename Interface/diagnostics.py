@@ -0,0 +1,230 @@
+"""
+Main-loop diagnostics: Tk event-loop lag monitor and an on-demand sampling profiler.
+
+LoopLagMonitor schedules a tick with master.after() and measures how late each
+tick runs. A watchdog thread notices when ticks stop arriving and captures the
+main thread's stack while the stall is still happening, so the slow callback
+(a full redraw, a synchronous save, a modal dialog...) is named in the record.
+Without an interval it probes on demand instead: expect() when work is handed
+to the Tk thread, arrived() when the Tk thread picks it up. That measures the
+same lag with no wakeups at all while nothing is happening.
+
+SamplingProfiler periodically samples thread stacks from a background thread and
+writes them in the folded format used by flamegraph.pl / speedscope / inferno:
+    frame;frame;frame <count>
+"""
+import collections
+import datetime as dt
+import os
+import sys
+import threading
+import time
+import traceback
+
+
+def _main_thread_id():
+    return threading.main_thread().ident
+
+
+class StallRecord:
+    """One main-loop stall: when, how long, and the main-thread stack seen during it."""
+
+    __slots__ = ("started", "duration", "stack")
+
+    def __init__(self, started, duration, stack):
+        self.started = started
+        self.duration = duration
+        self.stack = stack
+
+    def format(self):
+        when = dt.datetime.fromtimestamp(self.started).strftime("%Y-%m-%d %H:%M:%S")
+        return f"[{when}] Tk main loop stalled for {self.duration * 1000:.0f} ms in:\n{self.stack}"
+
+
+class LoopLagMonitor:
+    """Measures Tk scheduling lag and records stalls above a threshold with their culprit."""
+
+    def __init__(self, master, metrics=None, interval_ms=250, stall_threshold_ms=200, log_file=None, keep=100):
+        self.master = master
+        self.metrics = metrics
+        self.interval = interval_ms / 1000.0 if interval_ms else None  # None: on-demand probes only
+        self.threshold = stall_threshold_ms / 1000.0
+        self.log_file = log_file
+        self.stalls = collections.deque(maxlen=keep)
+        self.max_lag = 0.0
+        self._expected = None
+        self._beat = threading.Event()
+        self._stop = threading.Event()
+        self._pending_stack = None
+        self._after_id = None
+        self._waiting = threading.Event()  # on-demand mode: a probe is outstanding
+        self._running = False
+
+    def start(self):
+        self._running = True
+        if self.interval is None:
+            threading.Thread(target=self._on_demand_watchdog, daemon=True, name="tk-lag-watchdog").start()
+            return
+        self._expected = time.monotonic() + self.interval
+        self._after_id = self.master.after(int(self.interval * 1000), self._tick)
+        threading.Thread(target=self._watchdog, daemon=True, name="tk-lag-watchdog").start()
+
+    def expect(self):
+        """On-demand mode, any thread: the Tk thread has just been handed work and should run it now."""
+        if self.interval is None and self._running and not self._waiting.is_set():
+            self._expected = time.monotonic()
+            self._beat.clear()
+            self._waiting.set()
+
+    def arrived(self):
+        """On-demand mode, Tk thread: the work handed over by expect() is being run."""
+        if not self._running or not self._waiting.is_set():
+            return
+        lag = time.monotonic() - self._expected
+        self._waiting.clear()
+        self._beat.set()
+        self._observe(lag)
+
+    def stop(self):
+        self._running = False
+        self._stop.set()
+        self._beat.set()
+        self._waiting.set()
+        if self._after_id is not None:
+            try:
+                self.master.after_cancel(self._after_id)
+            except Exception:
+                pass
+
+    def _tick(self):
+        now = time.monotonic()
+        if self.metrics:
+            self.metrics.wakeup("lag_probe")
+        self._observe(now - self._expected)
+        self._beat.set()
+        self._expected = now + self.interval
+        self._after_id = self.master.after(int(self.interval * 1000), self._tick)
+
+    def _observe(self, lag):
+        lag = max(0.0, lag)
+        self.max_lag = max(self.max_lag, lag)
+        if self.metrics:
+            self.metrics.observe("tk_loop_lag", lag)
+        if lag >= self.threshold:
+            self._record_stall(lag)
+
+    def _on_demand_watchdog(self):
+        """Sleeps until a probe is outstanding; captures the main-thread stack if it is not picked up in time."""
+        main_id = _main_thread_id()
+        while True:
+            self._waiting.wait()
+            if self._stop.is_set():
+                return
+            if not self._beat.wait(self.threshold):
+                frame = sys._current_frames().get(main_id)
+                if frame is not None and self._pending_stack is None:
+                    self._pending_stack = "".join(traceback.format_stack(frame))
+                self._beat.wait()
+
+    def _watchdog(self):
+        """Captures the main-thread stack once per stall, while the stall is in progress."""
+        main_id = _main_thread_id()
+        while not self._stop.is_set():
+            self._beat.clear()
+            if self._beat.wait(self.interval + self.threshold):
+                continue
+            frame = sys._current_frames().get(main_id)
+            if frame is not None and self._pending_stack is None:
+                self._pending_stack = "".join(traceback.format_stack(frame))
+            # wait for the loop to come back before looking again
+            self._beat.wait()
+
+    def _record_stall(self, lag):
+        stack = self._pending_stack or "  (stack not captured: stall shorter than the watchdog period)\n"
+        self._pending_stack = None
+        record = StallRecord(time.time() - lag, lag, stack)
+        self.stalls.append(record)
+        if self.metrics:
+            self.metrics.incr("loop_stalls")
+        text = record.format()
+        print(text.splitlines()[0])
+        if self.log_file:
+            try:
+                with open(self.log_file, "a") as f:
+                    f.write(text + "\n")
+            except OSError as e:
+                print(f"Could not write stall log: {e}")
+
+
+class SamplingProfiler:
+    """Low-overhead stack sampler producing flamegraph-compatible folded output."""
+
+    def __init__(self, rate_hz=100, all_threads=False, output_dir="."):
+        self.interval = 1.0 / rate_hz
+        self.all_threads = all_threads
+        self.output_dir = output_dir
+        self._counts = collections.Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self.samples = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=None):
+        """Starts sampling; stops by itself after `duration` seconds if given."""
+        if self.running:
+            return
+        self._counts.clear()
+        self.samples = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True, name="sampling-profiler")
+        self._thread.start()
+        print(f"Profiler started ({1 / self.interval:.0f} Hz).")
+
+    def stop(self):
+        """Stops sampling and writes the folded stacks. Returns the output path."""
+        if not self.running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        return self.write()
+
+    def toggle(self):
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+    def _run(self, duration):
+        own_id = threading.get_ident()
+        main_id = _main_thread_id()
+        names = {}
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (not self.all_threads and thread_id != main_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if self.all_threads:
+                    if thread_id not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    stack.append(names.get(thread_id, str(thread_id)))
+                self._counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                threading.Thread(target=self.write, daemon=True).start()
+                break
+
+    def write(self):
+        path = os.path.join(self.output_dir, dt.datetime.now().strftime("profile-%Y%m%d-%H%M%S.folded"))
+        with open(path, "w") as f:
+            for stack, count in self._counts.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Profiler stopped: {self.samples} samples written to {path}")
+        return path
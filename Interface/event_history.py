@@ -0,0 +1,152 @@
+"""
+Fixed-capacity in-memory history of recent intrusion events.
+
+Events live in preallocated parallel arrays used as a ring buffer, so recording
+never grows memory. Sensor names, trigger types and sources are interned to small
+integer codes. Each slot also links to the previous slot of the same sensor, which
+makes "last K events of sensor X" a walk of K steps instead of a scan.
+"""
+from array import array
+from bisect import bisect_left
+
+
+class HistoryEvent:
+    """Read-only view of one recorded event."""
+
+    __slots__ = ("seq", "timestamp", "sensor", "type", "source", "latency")
+
+    def __init__(self, seq, timestamp, sensor, type, source, latency):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.sensor = sensor
+        self.type = type
+        self.source = source
+        self.latency = latency
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"HistoryEvent({self.seq}, {self.timestamp:.3f}, {self.sensor!r}, {self.type!r}, {self.source!r})"
+
+
+class _Interner:
+    """Maps strings to stable small integers and back."""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class EventHistory:
+    """Ring buffer of the last `capacity` events (timestamp, sensor, type, source, latency)."""
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._latencies = array("d", bytes(8 * capacity))
+        self._prev_same = array("q", [-1]) * capacity # previous sequence number of the same sensor
+        self._sensors = array("l", bytes(array("l").itemsize * capacity))
+        self._types = array("H", bytes(2 * capacity))
+        self._sources = array("H", bytes(2 * capacity))
+        self._sensor_names = _Interner()
+        self._type_names = _Interner()
+        self._source_names = _Interner()
+        self._last_for_sensor = array("q")             # sensor code -> last sequence number
+        self.count = 0                                 # total events ever recorded (next sequence number)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def record(self, timestamp, sensor, type, source="serial", latency=0.0):
+        """Appends an event, overwriting the oldest when full. Timestamps should be non-decreasing."""
+        sensor_code = self._sensor_names.code(sensor)
+        if sensor_code == len(self._last_for_sensor):
+            self._last_for_sensor.append(-1)
+        seq = self.count
+        slot = seq % self.capacity
+        self._timestamps[slot] = timestamp
+        self._latencies[slot] = latency
+        self._prev_same[slot] = self._last_for_sensor[sensor_code]
+        self._sensors[slot] = sensor_code
+        self._types[slot] = self._type_names.code(type)
+        self._sources[slot] = self._source_names.code(source)
+        self._last_for_sensor[sensor_code] = seq
+        self.count = seq + 1
+        return seq
+
+    def _event(self, seq):
+        slot = seq % self.capacity
+        return HistoryEvent(
+            seq,
+            self._timestamps[slot],
+            self._sensor_names.names[self._sensors[slot]],
+            self._type_names.names[self._types[slot]],
+            self._source_names.names[self._sources[slot]],
+            self._latencies[slot],
+        )
+
+    def _oldest_seq(self):
+        return max(0, self.count - self.capacity)
+
+    def first_time(self):
+        """Timestamp of the oldest event still held, or None when empty."""
+        if not self.count:
+            return None
+        return self._timestamps[self._oldest_seq() % self.capacity]
+
+    def last(self, k):
+        """The last k events, newest first."""
+        start = max(self._oldest_seq(), self.count - k)
+        return [self._event(seq) for seq in range(self.count - 1, start - 1, -1)]
+
+    def last_for_sensor(self, sensor, k):
+        """The last k events of one sensor, newest first (follows the per-sensor chain)."""
+        code = self._sensor_names.codes.get(sensor)
+        if code is None:
+            return []
+        oldest = self._oldest_seq()
+        seq = self._last_for_sensor[code]
+        events = []
+        while seq >= oldest and len(events) < k:
+            events.append(self._event(seq))
+            seq = self._prev_same[seq % self.capacity]
+        return events
+
+    def last_seen(self, sensor):
+        """Timestamp of the sensor's most recent event still in the buffer, or None."""
+        events = self.last_for_sensor(sensor, 1)
+        return events[0].timestamp if events else None
+
+    def window(self, start_time, end_time=None):
+        """Events with start_time <= timestamp < end_time (oldest first), found by binary search."""
+        oldest = self._oldest_seq()
+        seqs = _SeqTimestamps(self, oldest)
+        lo = oldest + bisect_left(seqs, start_time)
+        hi = self.count if end_time is None else oldest + bisect_left(seqs, end_time)
+        return [self._event(seq) for seq in range(lo, hi)]
+
+    def sensor_names(self):
+        return list(self._sensor_names.names)
+
+
+class _SeqTimestamps:
+    """Sequence-ordered timestamp view of the ring buffer, for bisect."""
+
+    def __init__(self, history, oldest):
+        self._history = history
+        self._oldest = oldest
+
+    def __len__(self):
+        return self._history.count - self._oldest
+
+    def __getitem__(self, i):
+        history = self._history
+        return history._timestamps[(self._oldest + i) % history.capacity]
@@ -0,0 +1,159 @@
+"""
+Bounded event queue between producer threads and the Tk thread.
+
+Serial readers, the simulation and the schedule thread push small tuples
+(event records) instead of calling master.after() once per event. The first
+record after the queue went idle arms a single wakeup; the Tk-side poller then
+drains everything that has accumulated in one batch and repaints once. Under
+load the per-event cost is a deque append.
+
+collections.deque append/popleft are atomic in CPython, so producers take no
+lock. Events beyond `capacity` are handled by the overflow policy:
+
+    "drop_newest"  reject the new event (the earliest evidence is kept; default)
+    "drop_oldest"  discard the oldest queued event to make room
+
+Control calls (call()) go through a separate, unbounded lane and are never
+dropped; they are meant for rare state changes such as schedule transitions.
+
+Producers never touch Tk, not even for the wakeup: WakePipe writes one byte to
+a pipe that Tk's event loop watches, and Tk runs the drain on its own thread
+when the byte arrives.
+"""
+import collections
+import os
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+READABLE = 2  # tkinter.READABLE
+
+
+class EventQueue:
+    def __init__(self, wake, capacity=8192, overflow=DROP_NEWEST):
+        if overflow not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._wake = wake                  # schedules one drain on the consumer thread
+        self.capacity = capacity
+        self.overflow = overflow
+        self._events = collections.deque()
+        self._calls = collections.deque()
+        self._armed = False                # a drain is already scheduled
+        self.dropped = 0                   # approximate under concurrent overflow
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    # --- Producer side (any thread) ---
+
+    def put(self, record):
+        """Queues an event record; returns False if the overflow policy dropped one."""
+        events = self._events
+        accepted = True
+        if len(events) >= self.capacity:
+            self.dropped += 1
+            accepted = False
+            if self.overflow == DROP_NEWEST:
+                self._notify()
+                return False
+            try:
+                events.popleft()
+            except IndexError:
+                pass
+        events.append(record)
+        if len(events) > self.high_water:
+            self.high_water = len(events)
+        self._notify()
+        return accepted
+
+    def call(self, func, *args):
+        """Runs func(*args) on the consumer thread at the next drain."""
+        self._calls.append((func, args))
+        self._notify()
+
+    def wake(self):
+        """Schedules a drain even if nothing is queued (e.g. to flush pending UI work)."""
+        self._notify()
+
+    def _notify(self):
+        if not self._armed:
+            self._armed = True
+            self._wake()
+
+    # --- Consumer side (one thread) ---
+
+    def drain(self, limit):
+        """Returns (calls, events) with at most `limit` events; re-arms itself if more remain."""
+        # Disarm first: anything pushed from here on schedules the next drain itself
+        self._armed = False
+        calls = []
+        while self._calls:
+            calls.append(self._calls.popleft())
+        pop = self._events.popleft
+        events = [pop() for _ in range(min(limit, len(self._events)))]
+        if self._events:
+            self._notify()
+        return calls, events
+
+
+class WakePipe:
+    """
+    Runs `callback` on the Tk thread after wake() was called from any thread, without
+    touching Tk off that thread: wake() only writes a byte to a pipe registered with
+    master.tk.createfilehandler(). Where Tk cannot watch file descriptors (Windows),
+    the Tk thread instead checks a flag every `poll_s`, which costs idle wakeups.
+    """
+
+    def __init__(self, master, callback, poll_s=0.02):
+        self.master = master
+        self.callback = callback
+        self.poll_ms = max(1, int(poll_s * 1000))
+        self._flag = False
+        self._after_id = None
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        try:
+            master.tk.createfilehandler(self._read_fd, READABLE, self._readable)
+        except (AttributeError, RuntimeError):
+            os.close(self._read_fd)
+            os.close(self._write_fd)
+            self._read_fd = self._write_fd = None
+            self._poll()
+
+    def wake(self):
+        """Any thread: have the callback run on the Tk thread soon."""
+        if self._write_fd is None:
+            self._flag = True
+            return
+        try:
+            os.write(self._write_fd, b"\0")
+        except BlockingIOError:
+            pass  # the pipe is full, so a wakeup is pending anyway
+        except BrokenPipeError:
+            pass  # closed while shutting down
+
+    def _readable(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
+        self.callback()
+
+    def _poll(self):
+        if self._flag:
+            self._flag = False
+            self.callback()
+        self._after_id = self.master.after(self.poll_ms, self._poll)
+
+    def close(self):
+        """Tk thread: stops watching; later wake() calls do nothing."""
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+        if self._read_fd is not None:
+            # Only the read end: a producer still running gets EPIPE rather than
+            # writing into a descriptor number that has been reused
+            self.master.tk.deletefilehandler(self._read_fd)
+            os.close(self._read_fd)
+            self._read_fd = None
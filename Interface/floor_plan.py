@@ -0,0 +1,377 @@
+"""
+Floors, a grid index over sensor positions and a culling viewport for the sensor map.
+
+Sensor "x"/"y" are floor coordinates (the original 400x250 plan is one unit per
+pixel at zoom 1) and "floor" names the floor a sensor is on. MapView keeps canvas
+items only for the sensors inside the viewport and reconciles them on every
+render: sensors that left the view are deleted, new ones are created, the rest are
+moved or restyled only if their position or look changed. The set of candidates
+comes from a uniform grid, so a render costs O(visible sensors), not O(building).
+Labels are dropped when zoomed out or when too many sensors are on screen, and
+scaled floor background images are cached per (floor, zoom level).
+"""
+import collections
+import fractions
+
+DEFAULT_FLOOR = {"name": "Ground Floor", "width": 400, "height": 250, "image": None}
+ZOOM_LEVELS = (0.125, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)
+FLOOR_MARGIN = 10         # the floor outline is inset by this much, as on the original plan
+GRID_CELL = 50            # floor units per index cell
+ICON_RADIUS = 10          # pixels at zoom >= 1
+LABEL_MIN_ZOOM = 0.75     # no labels below this zoom ...
+LABEL_MAX_VISIBLE = 400   # ... or with more sensors than this on screen
+LABEL_HALF_WIDTH = 40     # label hit box, pixels either side of the icon
+IMAGE_CACHE_SIZE = 6      # scaled background images kept
+IMAGE_MAX_PIXELS = 16_000_000  # larger scaled backgrounds are skipped rather than allocated
+
+
+class GridIndex:
+    """Uniform grid over sensor positions; queries only visit the cells a rectangle covers."""
+
+    def __init__(self, cell=GRID_CELL):
+        self.cell = cell
+        self.cells = collections.defaultdict(set)  # (cx, cy) -> names
+        self.where = {}                            # name -> ((cx, cy), x, y)
+
+    def __len__(self):
+        return len(self.where)
+
+    def _key(self, x, y):
+        return int(x // self.cell), int(y // self.cell)
+
+    def insert(self, name, x, y):
+        self.remove(name)
+        key = self._key(x, y)
+        self.cells[key].add(name)
+        self.where[name] = (key, x, y)
+
+    def remove(self, name):
+        entry = self.where.pop(name, None)
+        if entry is not None:
+            bucket = self.cells[entry[0]]
+            bucket.discard(name)
+            if not bucket:
+                del self.cells[entry[0]]
+
+    def query(self, x1, y1, x2, y2):
+        """Names positioned inside the rectangle."""
+        (cx1, cy1), (cx2, cy2) = self._key(x1, y1), self._key(x2, y2)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            # Zoomed far out: walking the occupied cells is cheaper than the covered ones
+            keys = [key for key in self.cells if cx1 <= key[0] <= cx2 and cy1 <= key[1] <= cy2]
+        else:
+            keys = [(cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1)]
+        found = []
+        where = self.where
+        for key in keys:
+            bucket = self.cells.get(key)
+            if not bucket:
+                continue
+            if cx1 < key[0] < cx2 and cy1 < key[1] < cy2:
+                found.extend(bucket)  # interior cell: everything in it is inside
+                continue
+            for name in bucket:
+                _, x, y = where[name]
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    found.append(name)
+        return found
+
+    def nearest(self, x, y, radius):
+        """Closest name within radius of (x, y), or None."""
+        best, best_d = None, radius * radius
+        for name in self.query(x - radius, y - radius, x + radius, y + radius):
+            _, sx, sy = self.where[name]
+            d = (sx - x) ** 2 + (sy - y) ** 2
+            if d <= best_d:
+                best, best_d = name, d
+        return best
+
+
+class Viewport:
+    """Floor <-> canvas mapping: screen = (floor - origin) * scale."""
+
+    def __init__(self, width=400, height=250):
+        self.width = width
+        self.height = height
+        self.scale = 1.0
+        self.x0 = 0.0
+        self.y0 = 0.0
+
+    def to_screen(self, x, y):
+        return (x - self.x0) * self.scale, (y - self.y0) * self.scale
+
+    def to_world(self, sx, sy):
+        return sx / self.scale + self.x0, sy / self.scale + self.y0
+
+    def world_rect(self, margin_px=0):
+        m = margin_px / self.scale
+        return (self.x0 - m, self.y0 - m,
+                self.x0 + self.width / self.scale + m, self.y0 + self.height / self.scale + m)
+
+    def zoom_to(self, scale, sx, sy):
+        """Changes the zoom keeping the floor point under (sx, sy) in place."""
+        wx, wy = self.to_world(sx, sy)
+        self.scale = scale
+        self.x0 = wx - sx / scale
+        self.y0 = wy - sy / scale
+
+    def step(self, steps, sx, sy):
+        """Zooms by whole steps along ZOOM_LEVELS around (sx, sy)."""
+        current = min(range(len(ZOOM_LEVELS)), key=lambda i: abs(ZOOM_LEVELS[i] - self.scale))
+        index = max(0, min(len(ZOOM_LEVELS) - 1, current + steps))
+        self.zoom_to(ZOOM_LEVELS[index], sx, sy)
+
+    def pan(self, dx, dy):
+        """Moves the view by (dx, dy) pixels."""
+        self.x0 -= dx / self.scale
+        self.y0 -= dy / self.scale
+
+    def fit(self, width, height):
+        """Largest zoom level at which a width x height floor fits, anchored at its corner."""
+        fitting = [z for z in ZOOM_LEVELS if width * z <= self.width and height * z <= self.height]
+        self.scale = fitting[-1] if fitting else ZOOM_LEVELS[0]
+        self.x0 = self.y0 = 0.0
+
+
+class MapView:
+    """Owns the sensor map canvas items; see the module docstring."""
+
+    def __init__(self, style, ink="#1F2937", title_font=("Inter", 10, "bold")):
+        self.style = style              # (name, data) -> (fill, outline, dash, label text)
+        self.ink = ink
+        self.title_font = title_font
+        self.canvas = None
+        self.photo_image = None         # path -> image (tk.PhotoImage) for floor backgrounds
+        self.viewport = Viewport()
+        self.floors = [dict(DEFAULT_FLOOR)]
+        self.floor = DEFAULT_FLOOR["name"]
+        self.items = {}                 # name -> [icon id, label id or None, style, (sx, sy, radius)]
+        self.labels = True
+        self.created = 0                # canvas items created, for the benchmarks
+        self._indexes = {}              # floor name -> GridIndex
+        self._source = None
+        self._count = -1
+        self._dirty = True
+        self._view_key = None
+        self._images = collections.OrderedDict()  # (floor, scale) -> image
+        self._bad_images = set()
+
+    def attach(self, canvas, photo_image=None):
+        self.canvas = canvas
+        self.photo_image = photo_image
+        self.items = {}
+        self._view_key = None
+
+    # --- Floors ---
+
+    def set_floors(self, floors, current=None):
+        self.floors = [dict(DEFAULT_FLOOR, **f) for f in floors] if floors else [dict(DEFAULT_FLOOR)]
+        names = self.floor_names()
+        self.floor = current if current in names else names[0]
+        self._images.clear()
+        self._bad_images.clear()
+        self.invalidate()
+
+    def floor_names(self):
+        return [f["name"] for f in self.floors]
+
+    def current(self):
+        return next(f for f in self.floors if f["name"] == self.floor)
+
+    def add_floor(self, name, width=400, height=250, image=None):
+        self.floors.append({"name": name, "width": width, "height": height, "image": image})
+        self.invalidate()
+        return name
+
+    def floor_of(self, data):
+        floor = data.get("floor")
+        return floor if floor in self._indexes else self.floors[0]["name"]
+
+    # --- Index ---
+
+    def invalidate(self):
+        """Sensors were added, removed, renamed or moved: rebuild the index on the next render."""
+        self._dirty = True
+
+    def _sync_index(self, sensor_data):
+        if not self._dirty and sensor_data is self._source and len(sensor_data) == self._count:
+            return
+        self._indexes = {name: GridIndex() for name in self.floor_names()}
+        for name, data in sensor_data.items():
+            self._indexes[self.floor_of(data)].insert(name, data["x"], data["y"])
+        self._source = sensor_data
+        self._count = len(sensor_data)
+        self._dirty = False
+
+    def moved(self, name, data):
+        """Keeps the index current after one sensor changed position."""
+        for index in self._indexes.values():
+            index.remove(name)
+        if self._indexes:
+            self._indexes[self.floor_of(data)].insert(name, data["x"], data["y"])
+
+    def renamed(self, old, new, data):
+        """Keeps the index (and the canvas item, if shown) current after a rename."""
+        if old in self.items:
+            self._forget(old)
+        for index in self._indexes.values():
+            index.remove(old)
+        self.moved(new, data)
+
+    def removed(self, names, sensor_data):
+        """Keeps the index current after sensors were deleted from sensor_data."""
+        for name in names:
+            if name in self.items:
+                self._forget(name)
+            for index in self._indexes.values():
+                index.remove(name)
+        if sensor_data is self._source:
+            self._count = len(sensor_data)
+
+    # --- Rendering ---
+
+    def icon_radius(self):
+        return ICON_RADIUS if self.viewport.scale >= 1 else max(3, round(ICON_RADIUS * self.viewport.scale))
+
+    def render(self, sensor_data):
+        """Reconciles the canvas with the visible part of the current floor."""
+        self._sync_index(sensor_data)
+        vp = self.viewport
+        view_key = (self.floor, vp.scale, vp.x0, vp.y0, vp.width, vp.height)
+        if view_key != self._view_key:
+            self._view_key = view_key
+            self._draw_floor()
+        radius = self.icon_radius()
+        visible = self._indexes[self.floor].query(*vp.world_rect(radius + LABEL_HALF_WIDTH))
+        self.labels = vp.scale >= LABEL_MIN_ZOOM and len(visible) <= LABEL_MAX_VISIBLE
+        keep = set(visible)
+        for name in [n for n in self.items if n not in keep]:
+            self._forget(name)
+        for name in visible:
+            self._place(name, sensor_data[name], radius)
+
+    def restyle(self, names, sensor_data):
+        """Updates only the look of the given sensors (those not on screen are skipped)."""
+        for name in names:
+            entry = self.items.get(name)
+            if entry is not None and name in sensor_data:
+                self._apply_style(entry, self.style(name, sensor_data[name]))
+
+    def _place(self, name, data, radius):
+        canvas = self.canvas
+        sx, sy = self.viewport.to_screen(data["x"], data["y"])
+        style = self.style(name, data)
+        entry = self.items.get(name)
+        if entry is None:
+            fill, outline, dash, _ = style
+            icon = canvas.create_oval(sx - radius, sy - radius, sx + radius, sy + radius,
+                                      fill=fill, outline=outline, width=2, dash=dash, tags=(name, name + "_icon"))
+            self.created += 1
+            entry = self.items[name] = [icon, None, style, (sx, sy, radius)]
+        else:
+            if entry[3] != (sx, sy, radius):
+                entry[3] = (sx, sy, radius)
+                canvas.coords(entry[0], sx - radius, sy - radius, sx + radius, sy + radius)
+                if entry[1] is not None:
+                    canvas.coords(entry[1], sx, sy + radius + 10)
+            self._apply_style(entry, style)
+        if self.labels and entry[1] is None:
+            entry[1] = canvas.create_text(sx, sy + radius + 10, text=style[3], font=("Inter", 8), fill=self.ink,
+                                          tags=(name, name + "_label"))
+            self.created += 1
+        elif not self.labels and entry[1] is not None:
+            canvas.delete(entry[1])
+            entry[1] = None
+
+    def _apply_style(self, entry, style):
+        if entry[2] == style:
+            return
+        old = entry[2]
+        entry[2] = style
+        fill, outline, dash, label = style
+        if old[:3] != style[:3]:
+            self.canvas.itemconfig(entry[0], fill=fill, outline=outline, dash=dash)
+        if entry[1] is not None and old[3] != label:
+            self.canvas.itemconfig(entry[1], text=label)
+
+    def _forget(self, name):
+        entry = self.items.pop(name)
+        self.canvas.delete(entry[0])
+        if entry[1] is not None:
+            self.canvas.delete(entry[1])
+
+    def _draw_floor(self):
+        canvas, vp, floor = self.canvas, self.viewport, self.current()
+        canvas.delete("floorplan")
+        image = self._floor_image(floor)
+        if image is not None:
+            sx, sy = vp.to_screen(0, 0)
+            canvas.create_image(sx, sy, image=image, anchor="nw", tags="floorplan")
+        x1, y1 = vp.to_screen(FLOOR_MARGIN, FLOOR_MARGIN)
+        x2, y2 = vp.to_screen(floor["width"] - FLOOR_MARGIN, floor["height"] - FLOOR_MARGIN)
+        canvas.create_rectangle(x1, y1, x2, y2, outline=self.ink, width=2, tags="floorplan")
+        canvas.create_text(vp.width / 2, 20, text=f"{floor['name']} (Drag/Double-Click to Edit)", fill=self.ink,
+                           font=self.title_font, tags=("floorplan", "floorplan_text"))
+        canvas.tag_lower("floorplan")
+
+    def _floor_image(self, floor):
+        path = floor.get("image")
+        if not path or self.photo_image is None or path in self._bad_images:
+            return None
+        scale = self.viewport.scale
+        key = (floor["name"], scale)
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            return image
+        try:
+            base = self._images.get((floor["name"], 1.0)) or self.photo_image(path)
+            self._remember((floor["name"], 1.0), base)
+            ratio = fractions.Fraction(scale).limit_denominator(8)
+            if (base.width() or 0) * (base.height() or 0) * ratio * ratio > IMAGE_MAX_PIXELS:
+                return None
+            image = base
+            if ratio.numerator != 1:
+                image = image.zoom(ratio.numerator)
+            if ratio.denominator != 1:
+                image = image.subsample(ratio.denominator)
+        except Exception as e:
+            print(f"Floor image '{path}' unavailable: {e}")
+            self._bad_images.add(path)
+            return None
+        self._remember(key, image)
+        return image
+
+    def _remember(self, key, image):
+        self._images[key] = image
+        self._images.move_to_end(key)
+        while len(self._images) > IMAGE_CACHE_SIZE:
+            self._images.popitem(last=False)
+
+    # --- Hit testing ---
+
+    def sensor_at(self, sx, sy):
+        """Sensor whose icon (or label, when labels are shown) is at canvas point (sx, sy), or None."""
+        index = self._indexes.get(self.floor)
+        if not index:
+            return None
+        vp = self.viewport
+        radius = self.icon_radius()
+        wx, wy = vp.to_world(sx, sy)
+        name = index.nearest(wx, wy, (radius + 2) / vp.scale)
+        if name is None and self.labels:
+            # Labels sit under the icon: look for a sensor a label's height above the point
+            for candidate in index.query(wx - LABEL_HALF_WIDTH / vp.scale, wy - (radius + 22) / vp.scale,
+                                         wx + LABEL_HALF_WIDTH / vp.scale, wy - radius / vp.scale):
+                if candidate in self.items:
+                    return candidate
+        return name
+
+    def sensors_in(self, sx1, sy1, sx2, sy2):
+        """Sensors of the current floor inside a canvas rectangle (corners in any order)."""
+        index = self._indexes.get(self.floor)
+        if not index:
+            return []
+        x1, y1 = self.viewport.to_world(min(sx1, sx2), min(sy1, sy2))
+        x2, y2 = self.viewport.to_world(max(sx1, sx2), max(sy1, sy2))
+        return index.query(x1, y1, x2, y2)
@@ -0,0 +1,364 @@
+"""
+Headless harness for IntrusionDetectionSystem.
+
+Builds the real application object without a display: the Tk widgets used by
+interface.py are replaced by light stand-ins, the canvas keeps its items in
+memory (so hit-testing and redraw costs are still exercised), and master.after()
+callbacks go to a queue that the caller drains explicitly. Used by the benchmark
+suite and the simulator; pass real_tk=True to use a real (withdrawn) Tk root
+instead, e.g. under Xvfb.
+"""
+import heapq
+import itertools
+import os
+import select
+import threading
+import time
+import types
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # the alarm's pygame.mixer.init() needs a device
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+class HeadlessWidget:
+    """Accepts any widget call (layout, config, bindings) and remembers Entry/Text contents."""
+
+    def __init__(self, *args, **kwargs):
+        self._chunks = []  # appended, not concatenated: long simulations insert millions of log lines
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _noop
+
+    def __getitem__(self, key):
+        return HeadlessWidget()
+
+    def get(self, *args):
+        return "".join(self._chunks)
+
+    def insert(self, index, text):
+        self._chunks.append(str(text))
+
+    def delete(self, *args):
+        self._chunks = []
+
+
+class HeadlessVar:
+    """Stand-in for tk.StringVar / BooleanVar."""
+
+    def __init__(self, master=None, value=None, name=None):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+    def trace_add(self, *args):
+        return None
+
+
+class HeadlessCanvas(HeadlessWidget):
+    """In-memory canvas: items with coords, tags and options, in stacking order."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._items = {}  # id -> [kind, coords, tags, options]
+        self._ids = itertools.count(1)
+        self.created = 0
+
+    def _create(self, kind, args, kwargs):
+        coords = []
+        for a in args:
+            if isinstance(a, (tuple, list)):
+                coords.extend(a)
+            else:
+                coords.append(a)
+        tags = kwargs.pop("tags", ())
+        if isinstance(tags, str):
+            tags = (tags,)
+        item = next(self._ids)
+        self._items[item] = [kind, [float(c) for c in coords], tuple(tags), kwargs]
+        self.created += 1
+        return item
+
+    def create_oval(self, *args, **kwargs):
+        return self._create("oval", args, kwargs)
+
+    def create_rectangle(self, *args, **kwargs):
+        return self._create("rectangle", args, kwargs)
+
+    def create_line(self, *args, **kwargs):
+        return self._create("line", args, kwargs)
+
+    def create_text(self, *args, **kwargs):
+        return self._create("text", args, kwargs)
+
+    def create_window(self, *args, **kwargs):
+        return self._create("window", args, kwargs)
+
+    def create_image(self, *args, **kwargs):
+        return self._create("image", args, kwargs)
+
+    def _match(self, tag_or_id):
+        if tag_or_id == "all":
+            return list(self._items)
+        if isinstance(tag_or_id, int) or (isinstance(tag_or_id, str) and tag_or_id.isdigit()):
+            item = int(tag_or_id)
+            return [item] if item in self._items else []
+        return [item for item, entry in self._items.items() if tag_or_id in entry[2]]
+
+    def delete(self, *tags_or_ids):
+        for tag in tags_or_ids:
+            if tag == "all":
+                self._items.clear()
+                continue
+            for item in self._match(tag):
+                del self._items[item]
+
+    def find_withtag(self, tag_or_id):
+        return tuple(self._match(tag_or_id))
+
+    def find_all(self):
+        return tuple(self._items)
+
+    def gettags(self, tag_or_id):
+        items = self._match(tag_or_id)
+        return self._items[items[0]][2] if items else ()
+
+    def type(self, tag_or_id):
+        items = self._match(tag_or_id)
+        return self._items[items[0]][0] if items else None
+
+    def coords(self, tag_or_id, *new):
+        items = self._match(tag_or_id)
+        if not items:
+            return []
+        if new:
+            flat = new[0] if len(new) == 1 and isinstance(new[0], (list, tuple)) else new
+            self._items[items[0]][1] = [float(c) for c in flat]
+        return list(self._items[items[0]][1])
+
+    def move(self, tag_or_id, dx, dy):
+        for item in self._match(tag_or_id):
+            c = self._items[item][1]
+            for i in range(0, len(c) - 1, 2):
+                c[i] += dx
+                c[i + 1] += dy
+
+    def addtag_withtag(self, new_tag, tag_or_id):
+        for item in self._match(tag_or_id):
+            entry = self._items[item]
+            if new_tag not in entry[2]:
+                entry[2] += (new_tag,)
+
+    def dtag(self, tag_or_id, tag_to_delete=None):
+        tag_to_delete = tag_or_id if tag_to_delete is None else tag_to_delete
+        for item in self._match(tag_or_id):
+            entry = self._items[item]
+            entry[2] = tuple(t for t in entry[2] if t != tag_to_delete)
+
+    def itemconfig(self, tag_or_id, **options):
+        for item in self._match(tag_or_id):
+            self._items[item][3].update(options)
+
+    itemconfigure = itemconfig
+
+    def itemcget(self, tag_or_id, option):
+        items = self._match(tag_or_id)
+        return self._items[items[0]][3].get(option) if items else None
+
+    def tag_raise(self, *args):
+        return None
+
+    tag_lower = tag_raise
+
+    def find_overlapping(self, x1, y1, x2, y2):
+        found = []
+        for item, (kind, c, tags, options) in self._items.items():
+            xs, ys = c[0::2], c[1::2]
+            if not xs:
+                continue
+            if min(xs) <= x2 and max(xs) >= x1 and min(ys) <= y2 and max(ys) >= y1:
+                found.append(item)
+        return tuple(found)
+
+    def find_enclosed(self, x1, y1, x2, y2):
+        found = []
+        for item, (kind, c, tags, options) in self._items.items():
+            xs, ys = c[0::2], c[1::2]
+            if xs and min(xs) >= x1 and max(xs) <= x2 and min(ys) >= y1 and max(ys) <= y2:
+                found.append(item)
+        return tuple(found)
+
+    def canvasx(self, x):
+        return x
+
+    canvasy = canvasx
+
+    def winfo_width(self):
+        return 400
+
+    def winfo_height(self):
+        return 250
+
+
+class HeadlessMaster(HeadlessWidget):
+    """Stand-in Tk root: after() callbacks and readable file handlers are run by run_pending()."""
+
+    def __init__(self, clock=time.monotonic):
+        super().__init__()
+        self.clock = clock
+        self.tk = self               # the tkapp's createfilehandler() lives here too
+        self._queue = []             # heap of (due, seq, after_id)
+        self._callbacks = {}         # after_id -> (func, args)
+        self._files = {}             # fd -> handler(fd, mask)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.destroyed = False
+        self.callbacks_run = 0
+
+    def after(self, ms, func=None, *args):
+        if func is None:
+            time.sleep(ms / 1000.0)
+            return None
+        seq = next(self._seq)
+        after_id = f"after#{seq}"
+        with self._lock:
+            self._callbacks[after_id] = (func, args)
+            heapq.heappush(self._queue, (self.clock() + ms / 1000.0, seq, after_id))
+        return after_id
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, after_id):
+        with self._lock:
+            self._callbacks.pop(after_id, None)
+
+    def createfilehandler(self, fd, mask, func):
+        self._files[fd] = func
+
+    def deletefilehandler(self, fd):
+        self._files.pop(fd, None)
+
+    def _readable(self):
+        if not self._files:
+            return []
+        return select.select(list(self._files), [], [], 0)[0]
+
+    def next_due(self):
+        """Due time of the earliest pending callback (now if a watched file is readable), or None."""
+        if self._readable():
+            return self.clock()
+        with self._lock:
+            while self._queue and self._queue[0][2] not in self._callbacks:
+                heapq.heappop(self._queue)
+            return self._queue[0][0] if self._queue else None
+
+    def pending(self):
+        with self._lock:
+            return len(self._callbacks)
+
+    def run_pending(self, limit=None):
+        """
+        Runs every callback that is due now (including ones they schedule for now), then the
+        handlers of readable files, until neither is left. Returns the count.
+        """
+        ran = 0
+        while limit is None or ran < limit:
+            with self._lock:
+                due = bool(self._queue) and self._queue[0][0] <= self.clock()
+                entry = self._callbacks.pop(heapq.heappop(self._queue)[2], None) if due else None
+            if due:
+                if entry is not None:
+                    func, args = entry
+                    func(*args)
+                    ran += 1
+                continue
+            readable = self._readable()
+            if not readable:
+                break
+            for fd in readable:
+                handler = self._files.get(fd)
+                if handler is not None:
+                    handler(fd, 2)  # tkinter.READABLE
+                    ran += 1
+        self.callbacks_run += ran
+        return ran
+
+    def update(self):
+        self.run_pending()
+
+    update_idletasks = update
+
+    def destroy(self):
+        self.destroyed = True
+
+
+def _messagebox(log):
+    def show(title, message, **kwargs):
+        log.append((title, message))
+        return None
+
+    def ask(title, message, **kwargs):
+        log.append((title, message))
+        return True
+
+    return types.SimpleNamespace(showerror=show, showinfo=show, showwarning=show, askyesno=ask)
+
+
+def headless_tk():
+    """A namespace with the tk names interface.py uses, backed by the headless stand-ins."""
+    import tkinter as tk
+
+    ns = types.SimpleNamespace()
+    for name in ("END", "WORD", "LEFT", "RIGHT", "BOTH", "X", "Y", "NORMAL", "DISABLED", "HORIZONTAL"):
+        setattr(ns, name, getattr(tk, name))
+    for name in ("Frame", "LabelFrame", "Label", "Button", "Entry", "OptionMenu", "Checkbutton",
+                 "Scale", "Spinbox", "Toplevel", "Scrollbar", "Listbox", "Menu", "PhotoImage"):
+        setattr(ns, name, HeadlessWidget)
+    ns.Canvas = HeadlessCanvas
+    ns.StringVar = ns.BooleanVar = ns.IntVar = ns.DoubleVar = HeadlessVar
+    ns.TclError = tk.TclError
+    return ns
+
+
+def build_app(workdir, real_tk=False, clock=None, messages=None):
+    """
+    Creates an IntrusionDetectionSystem whose state/log files live in `workdir`, with
+    serial autoconnect and the metrics endpoint disabled. Returns (app, master).
+    `clock` is a clock.py clock; a SimulatedClock also drives the after() queue.
+    """
+    import interface
+    from clock import SystemClock
+
+    clock = clock or SystemClock()
+
+    interface.LOG_FILE = os.path.join(workdir, "alerts.log")
+    interface.STATE_FILE = os.path.join(workdir, "system_state.pkl")
+    interface.STALL_LOG = os.path.join(workdir, "stalls.log")
+    interface.RULES_FILE = os.path.join(workdir, "correlation_rules.json")
+    interface.SERIAL_AUTOCONNECT = False
+    interface.METRICS_PORT = None
+    interface.API_PORT = None
+
+    if real_tk:
+        import tkinter as tk
+        master = tk.Tk()
+        master.withdraw()
+    else:
+        interface.tk = headless_tk()
+        interface.scrolledtext = types.SimpleNamespace(ScrolledText=HeadlessWidget)
+        interface.messagebox = _messagebox(messages if messages is not None else [])
+        master = HeadlessMaster(clock.monotonic)
+    app = interface.IntrusionDetectionSystem(master, clock)
+    if not real_tk:
+        # Without a running main loop every gap between run_pending() calls would look like a stall
+        app.lag_monitor.stop()
+    return app, master
@@ -0,0 +1,480 @@
+"""
+Out-of-process ingestion and detection (INGEST_PROCESS = True in interface.py).
+
+A separate process owns the serial port and makes the time-critical decisions:
+mapping bytes to sensors, zone gating, suppression, sounding the alarm, writing
+alerts.log and sending alerts. It never waits on the GUI, so a long redraw, a GC
+pause or a hung Tk loop cannot overflow the serial buffer or delay the alarm,
+and the two processes run on separate cores.
+
+Results go to the GUI through one shared-memory segment:
+
+    header   magic, capacity, table size, sensor-table generation, write sequence,
+             heartbeat, armed zones, alarm flag
+    ring     fixed-size event records (single producer, readers keep their own cursor)
+    status   one entry per sensor: triggered flag, trigger count, last trigger time
+
+The GUI maps it read-only and polls it; commands (armed zones, sensor table,
+zone and sensor suppression, entry delay, stop alarm) go the other way over a
+multiprocessing queue. The GUI's own suppression rules are forwarded, so the
+post-"Stop Alarm" rearm delay (REARM_DELAY_S) and /api/suppress apply here too;
+the entry delay runs out in this process, which then raises the alarm.
+
+The port is split into lines exactly like the in-process serial worker does
+(sources.LineSplitter): whole .ino lines and the ATmega firmware's bare bytes
+map to trigger keys through the GUI's SERIAL_LINES, so boot banners are not
+triggers. A heartbeat key ('H') becomes a HEARTBEAT record for the GUI's
+liveness tracking.
+"""
+import datetime as dt
+import multiprocessing
+import os
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+from sources import KEY_GAP_S, LineSplitter
+from zones import pick_sensor
+
+MAGIC = 0x49445352
+HEADER = struct.Struct("<IIIIQdQI")   # magic, capacity, max_sensors, table_gen, write_seq, heartbeat, armed_zones, alarm
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+RECORD = struct.Struct("<dIHBBQ")     # time, sensor index, table gen, type code, flags, seq (written last)
+RECORD_SEQ = struct.Struct("<Q")
+RECORD_SEQ_OFFSET = 16
+STATUS = struct.Struct("<BxxxId")     # triggered, trigger count, last trigger time
+
+TYPES = ["IR", "Sound"]
+SERIAL_TYPES = {"I": ("IR",), "S": ("Sound",), "B": ("IR", "Sound")}
+
+COUNTED = 1      # sensor in an armed zone and not suppressed
+ALARM = 2        # this event started the alarm (and was logged/alerted by the ingest process)
+SUPPRESSED = 4   # the sensor or all of its armed zones are suppressed
+HEARTBEAT = 8    # the serial device sent a heartbeat (no sensor)
+HEARTBEAT_KEY = "H"
+
+
+def alert_line(timestamp, sensor, trigger_type, message):
+    """One alerts.log line, same format as IntrusionDetectionSystem._log_alert."""
+    stamp = dt.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    return f"[{stamp}] - {sensor} | {trigger_type} | {message}\n"
+
+
+def _attach(name):
+    """Opens an existing segment without making this process responsible for unlinking it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: registers with the resource tracker inherited from the GUI, which already holds it
+        return shared_memory.SharedMemory(name=name)
+
+
+class EventRing:
+    """Shared-memory event ring and sensor status table."""
+
+    def __init__(self, shm, owner, readonly):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf.toreadonly() if readonly else shm.buf
+        magic, self.capacity, self.max_sensors = HEADER.unpack_from(self.buf, 0)[:3]
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {shm.name} is not an event ring.")
+        self._ring_offset = HEADER_SIZE
+        self._status_offset = HEADER_SIZE + self.capacity * RECORD.size
+        self.read_seq = 0
+
+    @classmethod
+    def create(cls, capacity=4096, max_sensors=4096):
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RECORD.size + max_sensors * STATUS.size)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, max_sensors, 0, 0, 0.0, 0, 0)
+        # The creator (GUI) only reads; it keeps the writable mapping for close()/unlink() only
+        return cls(shm, owner=True, readonly=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name), owner=False, readonly=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def header(self):
+        magic, capacity, max_sensors, gen, write_seq, heartbeat, armed, alarm = HEADER.unpack_from(self.buf, 0)
+        return {"table_gen": gen, "write_seq": write_seq, "heartbeat": heartbeat,
+                "armed_zones": armed, "alarm": bool(alarm)}
+
+    # --- Producer side (ingest process) ---
+
+    def publish(self, timestamp, sensor_index, gen, type_code, flags):
+        seq = RECORD_SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0]
+        offset = self._ring_offset + (seq % self.capacity) * RECORD.size
+        # Invalidate the slot first so a reader racing with this write sees a sequence mismatch
+        RECORD_SEQ.pack_into(self.buf, offset + RECORD_SEQ_OFFSET, 2 ** 64 - 1)
+        RECORD.pack_into(self.buf, offset, timestamp, sensor_index, gen, type_code, flags, seq)
+        RECORD_SEQ.pack_into(self.buf, WRITE_SEQ_OFFSET, seq + 1)
+
+    def set_state(self, gen, armed_zones, alarm, heartbeat):
+        magic, capacity, max_sensors, _, write_seq = HEADER.unpack_from(self.buf, 0)[:5]
+        HEADER.pack_into(self.buf, 0, magic, capacity, max_sensors, gen, write_seq, heartbeat, armed_zones, int(alarm))
+
+    def set_status(self, index, triggered, count, last):
+        if index < self.max_sensors:
+            STATUS.pack_into(self.buf, self._status_offset + index * STATUS.size, int(triggered), count, last)
+
+    def clear_status(self):
+        start = self._status_offset
+        self.buf[start:start + self.max_sensors * STATUS.size] = bytes(self.max_sensors * STATUS.size)
+
+    # --- Consumer side (GUI) ---
+
+    def read(self):
+        """Returns (records, lost): records published since the last read, and how many were overwritten."""
+        write_seq = RECORD_SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0]
+        lost = 0
+        if write_seq - self.read_seq > self.capacity:
+            lost = write_seq - self.capacity - self.read_seq
+            self.read_seq = write_seq - self.capacity
+        records = []
+        for seq in range(self.read_seq, write_seq):
+            offset = self._ring_offset + (seq % self.capacity) * RECORD.size
+            record = RECORD.unpack_from(self.buf, offset)
+            if record[5] != seq:
+                lost += 1  # overwritten while we were reading
+                continue
+            records.append(record)
+        self.read_seq = write_seq
+        return records, lost
+
+    def status(self, index):
+        triggered, count, last = STATUS.unpack_from(self.buf, self._status_offset + index * STATUS.size)
+        return bool(triggered), count, last
+
+    def close(self):
+        self.buf.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class IngestCore:
+    """Detection state inside the ingest process; mirrors handle_intrusion's decisions."""
+
+    def __init__(self, ring, log_file):
+        self.ring = ring
+        self.log_file = log_file
+        self.sensors = {}        # name -> {"type", "zones", "status"} (what pick_sensor needs)
+        self.index = {}          # name -> status table index
+        self.counts = []
+        self.gen = 0
+        self.armed_zones = 0
+        self.alarm = False
+        self.zone_suppressed = {}    # zone bit -> time.time() its suppression ends
+        self.sensor_suppressed = {}  # sensor name -> time.time() its suppression ends
+        self.entry_delay_s = 0.0
+        self.entry_zones = 0         # zones whose triggers wait out the entry delay
+        self.entry = None            # (deadline, sensor, type) of the running entry delay
+        self._sound = None
+
+    def command(self, cmd):
+        kind = cmd[0]
+        if kind == "sensors":
+            _, self.gen, table = cmd
+            self.sensors = {name: {"type": t, "zones": zones, "status": "Normal"} for name, t, zones in table}
+            self.index = {name: i for i, (name, _, _) in enumerate(table)}
+            self.counts = [0] * len(table)
+            self.ring.clear_status()
+        elif kind == "arm":
+            self.armed_zones = cmd[1]
+            if not self.armed_zones:
+                # Disarmed within the entry delay: no alarm
+                self.entry = None
+                self.stop_alarm()
+        elif kind == "suppress_zones":
+            _, zone_mask, seconds = cmd
+            until = time.time() + seconds
+            bit = 1
+            while bit <= zone_mask:
+                if zone_mask & bit:
+                    self.zone_suppressed[bit] = until
+                bit <<= 1
+        elif kind == "suppress_sensor":
+            _, name, seconds = cmd
+            self.sensor_suppressed[name] = time.time() + seconds
+        elif kind == "entry_delay":
+            _, self.entry_delay_s, self.entry_zones = cmd
+        elif kind == "stop_alarm":
+            self.stop_alarm()
+        self.publish_state()
+
+    def publish_state(self):
+        self.ring.set_state(self.gen, self.armed_zones, self.alarm, time.time())
+
+    def handle_key(self, key, timestamp):
+        """One trigger key ('I', 'S', 'B' or 'H') read from the port."""
+        if key == HEARTBEAT_KEY:
+            self.ring.publish(timestamp, 0, self.gen, 0, HEARTBEAT)
+            return
+        for sensor_type in SERIAL_TYPES.get(key, ()):
+            name = pick_sensor(self.sensors, sensor_type, self.armed_zones)
+            if name is not None:
+                self.trigger(name, sensor_type, timestamp)
+
+    def trigger(self, name, sensor_type, timestamp):
+        sensor = self.sensors[name]
+        index = self.index[name]
+        armed = sensor["zones"] & self.armed_zones
+        flags = 0
+        if armed and (self.sensor_suppressed.get(name, 0.0) > timestamp
+                      or not armed & ~self._suppressed_zones(timestamp)):
+            flags = SUPPRESSED
+        elif armed:
+            flags = COUNTED
+            sensor["status"] = "Triggered"
+            self.counts[index] += 1
+            self.ring.set_status(index, True, self.counts[index], timestamp)
+            if not self.alarm:
+                if self.entry_delay_s and sensor["zones"] & self.entry_zones:
+                    # Entry delay: tick() raises the alarm if the zone is still armed when it runs out
+                    if self.entry is None:
+                        self.entry = (timestamp + self.entry_delay_s, name, sensor_type)
+                else:
+                    flags |= ALARM
+                    self.start_alarm(name, sensor_type, timestamp)
+        self.ring.publish(timestamp, index, self.gen, TYPES.index(sensor_type), flags)
+
+    def _suppressed_zones(self, now):
+        """Bitmask of the zones suppressed at `now` (forgets suppressions that ended)."""
+        mask = 0
+        for bit, until in list(self.zone_suppressed.items()):
+            if until > now:
+                mask |= bit
+            else:
+                del self.zone_suppressed[bit]
+        return mask
+
+    def tick(self, now):
+        """Ends the entry delay when due; returns seconds until it is, or None if none is running."""
+        if self.entry is None:
+            return None
+        deadline, name, sensor_type = self.entry
+        if now < deadline:
+            return deadline - now
+        self.entry = None
+        sensor = self.sensors.get(name)
+        if sensor and sensor["zones"] & self.armed_zones and not self.alarm:
+            # An ALARM record without COUNTED: the trigger itself was already published
+            self.start_alarm(name, sensor_type, now)
+            self.ring.publish(now, self.index[name], self.gen, TYPES.index(sensor_type), ALARM)
+        return None
+
+    def start_alarm(self, name, sensor_type, timestamp):
+        self.alarm = True
+        self.publish_state()
+        self._play_sound()
+        message = f"Intrusion detected by {name} ({sensor_type})!"
+        try:
+            with open(self.log_file, "a") as f:
+                f.write(alert_line(timestamp, name, sensor_type, message))
+        except OSError as e:
+            print(f"Ingest: failed to write to log file: {e}")
+        print(f"📧 Sending Email Alert (via Gmail SMTP placeholder): {message}")
+        print(f"📱 Sending SMS Alert (via Twilio placeholder): {message}")
+
+    def stop_alarm(self):
+        # The rearm delay arrives as a "suppress_zones" command from the GUI's _stop_alarm
+        self.alarm = False
+        if self._sound is not None:
+            try:
+                self._sound.music.stop()
+            except Exception:
+                pass
+        for index, sensor in enumerate(self.sensors.values()):
+            if sensor["status"] == "Triggered":
+                sensor["status"] = "Normal"
+                self.ring.set_status(index, False, self.counts[index], 0.0)
+
+    def _play_sound(self):
+        try:
+            if self._sound is None:
+                import pygame
+                pygame.mixer.init()
+                self._sound = pygame.mixer
+            self._sound.music.load("alarm.mp3")
+            self._sound.music.play(-1)
+        except Exception as e:
+            print(f"Ingest: alarm sound unavailable: {e}")
+
+
+def run_ingest(ring_name, port, baud, commands, log_file, lines, heartbeat_s=1.0):
+    """
+    Ingest process entry point: reads the serial port and serves GUI commands until told to stop.
+    `lines` maps firmware lines (and bare key bytes) to trigger keys (interface.SERIAL_LINES).
+    """
+    import serial
+
+    ring = EventRing.attach(ring_name)
+    core = IngestCore(ring, log_file)
+    ser = None
+    splitter = LineSplitter(lines)
+    last_beat = 0.0
+    print(f"Ingest process {os.getpid()} started (port {port or 'none'}).")
+    try:
+        while True:
+            entry_due = core.tick(time.time())
+            wait = heartbeat_s if entry_due is None else min(heartbeat_s, entry_due)
+            try:
+                while True:
+                    cmd = commands.get_nowait() if ser is not None else commands.get(timeout=wait)
+                    if cmd[0] == "stop":
+                        return
+                    core.command(cmd)
+            except queue.Empty:
+                pass
+
+            if ser is None and port:
+                try:
+                    # Reads return after KEY_GAP_S of silence, which also ends a lone key byte
+                    ser = serial.Serial(port, baud, timeout=KEY_GAP_S)
+                    splitter = LineSplitter(lines)
+                    print(f"Ingest: connected to {port}")
+                except Exception as e:
+                    print(f"Ingest: cannot open {port}: {e}")
+                    port = None
+            if ser is not None:
+                try:
+                    # Blocks up to the port timeout; takes everything that has arrived
+                    data = ser.read(max(1, ser.in_waiting))
+                except Exception as e:
+                    print(f"Ingest: serial read error: {e}")
+                    ser = None
+                    continue
+                now = time.time()
+                for line in splitter.feed(data) if data else splitter.flush():
+                    # Whole lines only: banners such as "IR Sensor Initialized" are not triggers
+                    key = lines.get(line.decode("utf-8", errors="ignore").strip())
+                    if key:
+                        core.handle_key(key, now)
+
+            now = time.time()
+            if now - last_beat >= heartbeat_s:
+                last_beat = now
+                core.publish_state()
+    finally:
+        core.stop_alarm()
+        if ser is not None:
+            ser.close()
+        ring.close()
+
+
+class IngestClient:
+    """GUI-side handle: owns the shared memory, the ingest process and the command queue."""
+
+    def __init__(self, port, baud, log_file, lines, capacity=4096, max_sensors=4096):
+        self._ctx = multiprocessing.get_context("spawn")  # never fork a process that has Tk loaded
+        self.ring = EventRing.create(capacity, max_sensors)
+        self.commands = self._ctx.Queue()
+        self.port = port
+        self.baud = baud
+        self.lines = dict(lines)
+        self.log_file = os.path.abspath(log_file)
+        self.process = None
+        self.gen = 0
+        self.names_by_gen = {}
+        self._table = None
+        self._armed = None
+        self._entry = None
+        self._suppressed = {}    # ("zones", mask) / ("sensor", name) -> time.time() it ends, for restart()
+
+    def start(self):
+        self.process = self._ctx.Process(target=run_ingest, name="ids-ingest", daemon=True,
+                                         args=(self.ring.name, self.port, self.baud, self.commands, self.log_file, self.lines))
+        self.process.start()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def restart(self):
+        """Starts a fresh ingest process on the same ring and re-sends the configuration."""
+        self.start()
+        table, armed, entry = self._table, self._armed, self._entry
+        self._table = self._armed = self._entry = None
+        if table is not None:
+            self._send_table(table)
+        if armed is not None:
+            self.set_armed(armed)
+        if entry is not None:
+            self.set_entry_delay(*entry)
+        now = time.time()
+        for (kind, target), until in list(self._suppressed.items()):
+            if until > now:
+                self.commands.put(("suppress_" + kind, target, until - now))
+            else:
+                del self._suppressed[(kind, target)]
+
+    def sync(self, sensor_data, armed_zones, entry_delay_s=0.0, entry_zones=0):
+        """Sends the sensor table, armed zones and entry delay if they changed since the last sync."""
+        table = tuple((name, data["type"], data.get("zones", 0)) for name, data in sensor_data.items())
+        if table != self._table:
+            self._send_table(table)
+        self.set_armed(armed_zones)
+        self.set_entry_delay(entry_delay_s, entry_zones)
+
+    def _send_table(self, table):
+        self._table = table
+        self.gen = (self.gen + 1) & 0xFFFF
+        self.names_by_gen[self.gen] = [name for name, _, _ in table]
+        # Events already in the ring may still refer to the previous table
+        self.names_by_gen.pop((self.gen - 4) & 0xFFFF, None)
+        self.commands.put(("sensors", self.gen, table))
+
+    def set_armed(self, armed_zones):
+        if armed_zones != self._armed:
+            self._armed = armed_zones
+            self.commands.put(("arm", armed_zones))
+
+    def set_entry_delay(self, seconds, zone_mask):
+        if (seconds, zone_mask) != self._entry:
+            self._entry = (seconds, zone_mask)
+            self.commands.put(("entry_delay", seconds, zone_mask))
+
+    def suppress_zones(self, zone_mask, seconds):
+        self._suppressed[("zones", zone_mask)] = time.time() + seconds
+        self.commands.put(("suppress_zones", zone_mask, seconds))
+
+    def suppress_sensor(self, name, seconds):
+        self._suppressed[("sensor", name)] = time.time() + seconds
+        self.commands.put(("suppress_sensor", name, seconds))
+
+    def stop_alarm(self):
+        self.commands.put(("stop_alarm",))
+
+    def poll(self):
+        """Returns ([(timestamp, sensor, type, flags)], lost) for events since the last poll; heartbeats have no sensor."""
+        records, lost = self.ring.read()
+        events = []
+        for timestamp, index, gen, type_code, flags, _ in records:
+            if flags & HEARTBEAT:
+                events.append((timestamp, None, None, flags))
+                continue
+            names = self.names_by_gen.get(gen)
+            if names is None or index >= len(names):
+                lost += 1
+                continue
+            events.append((timestamp, names[index], TYPES[type_code], flags))
+        return events, lost
+
+    def statuses(self):
+        """{sensor: triggered} from the status table, for resynchronising after lost events."""
+        names = self.names_by_gen.get(self.ring.header()["table_gen"], [])
+        return {name: self.ring.status(i)[0] for i, name in enumerate(names[:self.ring.max_sensors])}
+
+    def close(self):
+        if self.process is not None:
+            self.commands.put(("stop",))
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.ring.close()
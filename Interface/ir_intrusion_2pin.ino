@@ -1,5 +1,8 @@
 #define IR_PIN 2          // The data pin connected to the IR receiver (second pin to GND)
 #define LED_PIN 13        // Optional onboard LED indicator
+#define HEARTBEAT_MS 5000 // "H" heartbeat period, so the host can tell a dead board from a quiet house
+
+unsigned long last_heartbeat = 0;
 
 void setup() {
   pinMode(IR_PIN, INPUT_PULLUP); // Use Arduino's internal pull-up resistor
@@ -22,5 +25,10 @@ void loop() {
     digitalWrite(LED_PIN, LOW);
   }
 
+  if (millis() - last_heartbeat >= HEARTBEAT_MS) {
+    last_heartbeat = millis();
+    Serial.println("H");
+  }
+
   delay(100);
 }
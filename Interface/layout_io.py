@@ -0,0 +1,220 @@
+"""
+Streaming import/export of sensor layouts (names, types, positions, zones, floors).
+
+Formats are chosen by file extension:
+
+    .csv    header row: name,type,x,y,zones,floor   (zones = comma separated names or "All")
+    .jsonl  one object per line: {"name": ..., "type": ..., "x": ..., "y": ..., "zones": [...], "floor": ...}
+    .json   an array of the same objects (read incrementally, not loaded whole)
+
+Files are read and validated in a single pass; nothing is applied unless every row
+is valid, so an import is all-or-nothing. Missing "zones" means every zone, missing
+"floor" means the first floor.
+
+    python layout_io.py site.csv                 # validate and summarise
+    python layout_io.py site.csv --to site.jsonl # convert
+    python layout_io.py --generate 50000 --to big.csv
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import time
+
+from zones import ZoneTable
+
+SENSOR_TYPES = ("IR", "Sound")
+FIELDS = ("name", "type", "x", "y", "zones", "floor")
+MAX_ERRORS = 20          # stop collecting after this many problems
+READ_CHUNK = 1 << 16
+
+
+class LayoutError(ValueError):
+    """Raised with every problem found (up to MAX_ERRORS), one per line of the message."""
+
+    def __init__(self, errors):
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+def _format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".json", ".jsonl"):
+        raise ValueError(f"Unsupported layout format '{ext}' (use .csv, .json or .jsonl).")
+    return ext
+
+
+def _iter_json_array(f):
+    """Yields the elements of a top-level JSON array without reading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_CHUNK).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("A .json layout must be an array of sensor objects.")
+    pos = 1
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("need more data", buffer, pos)
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                raise ValueError("Truncated or malformed JSON array.")
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+
+def iter_rows(path):
+    """Yields (line number or index, dict) for every sensor record in the file."""
+    ext = _format(path)
+    with open(path, newline="" if ext == ".csv" else None, encoding="utf-8") as f:
+        if ext == ".csv":
+            reader = csv.DictReader(f)
+            missing = {"name", "type", "x", "y"} - set(reader.fieldnames or ())
+            if missing:
+                raise LayoutError([f"CSV header is missing: {', '.join(sorted(missing))}"])
+            for row in reader:
+                yield reader.line_num, row
+        elif ext == ".jsonl":
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield number, e
+        else:
+            for number, item in enumerate(_iter_json_array(f), 1):
+                yield number, item
+
+
+def read_layout(path, zones=None):
+    """
+    Parses and validates a layout file. Returns {name: sensor data} in file order,
+    or raises LayoutError listing the problems. Zone names are resolved against the
+    `zones` ZoneTable; floor names are passed through for the caller to resolve.
+    """
+    zones = zones or ZoneTable()
+    zone_masks = {}
+    sensors = {}
+    errors = []
+    where = "record" if _format(path) == ".json" else "line"
+    try:
+        for number, row in iter_rows(path):
+            try:
+                if isinstance(row, Exception):
+                    raise ValueError(f"invalid JSON ({row.msg})")
+                if not isinstance(row, dict):
+                    raise ValueError("expected an object")
+                name = str(row.get("name") or "").strip()
+                if not name:
+                    raise ValueError("missing name")
+                if name in sensors:
+                    raise ValueError(f"duplicate name '{name}'")
+                sensor_type = row.get("type")
+                if sensor_type not in SENSOR_TYPES:
+                    raise ValueError(f"type must be one of {', '.join(SENSOR_TYPES)}, not '{sensor_type}'")
+                try:
+                    x, y = float(row["x"]), float(row["y"])
+                except (KeyError, TypeError, ValueError, OverflowError):
+                    raise ValueError("x and y must be numbers")
+                if not (math.isfinite(x) and math.isfinite(y)):
+                    raise ValueError("x and y must be finite numbers")
+                x, y = int(x), int(y)
+                zone_key = row.get("zones")
+                if isinstance(zone_key, list):
+                    zone_key = ",".join(zone_key)
+                zone_key = zone_key or "All"
+                mask = zone_masks.get(zone_key)
+                if mask is None:
+                    mask = zone_masks[zone_key] = zones.mask_for(zone_key)
+                data = {"x": x, "y": y, "type": sensor_type, "status": "Normal", "zones": mask}
+                floor = str(row.get("floor") or "").strip()
+                if floor:
+                    data["floor"] = floor
+                sensors[name] = data
+            except ValueError as e:
+                errors.append(f"{where} {number}: {e}")
+                if len(errors) >= MAX_ERRORS:
+                    errors.append("(further errors not shown)")
+                    break
+    except LayoutError:
+        raise
+    except ValueError as e:
+        # Structural problem (e.g. a truncated JSON array): reported alongside any row errors
+        errors.append(str(e))
+    if errors:
+        raise LayoutError(errors)
+    return sensors
+
+
+def write_layout(path, sensor_data, zones=None):
+    """Writes sensor_data in the format given by the file extension; returns the number written."""
+    zones = zones or ZoneTable()
+    ext = _format(path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="" if ext == ".csv" else None, encoding="utf-8") as f:
+        if ext == ".csv":
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for name, data in sensor_data.items():
+                writer.writerow((name, data["type"], data["x"], data["y"],
+                                 zones.text_for(data.get("zones", zones.all_mask)), data.get("floor", "")))
+        else:
+            if ext == ".json":
+                f.write("[\n")
+            separator = ",\n" if ext == ".json" else "\n"
+            first = True
+            for name, data in sensor_data.items():
+                record = {"name": name, "type": data["type"], "x": data["x"], "y": data["y"],
+                          "zones": zones.names_for(data.get("zones", zones.all_mask))}
+                if data.get("floor"):
+                    record["floor"] = data["floor"]
+                f.write(("" if first else separator) + json.dumps(record, separators=(",", ":")))
+                first = False
+            f.write("\n]\n" if ext == ".json" else "\n")
+    os.replace(tmp, path)
+    return len(sensor_data)
+
+
+def generate_layout(count, seed=1, width=20000, height=20000, zones=None):
+    """A synthetic site for load testing: `count` sensors spread over one large floor."""
+    zones = zones or ZoneTable()
+    rng = random.Random(seed)
+    return {f"{'IR' if i % 2 else 'Sound'}_{i}": {
+        "x": rng.randint(0, width), "y": rng.randint(0, height), "type": "IR" if i % 2 else "Sound",
+        "status": "Normal", "zones": 1 << rng.randrange(len(zones.names))} for i in range(count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("layout", nargs="?", help="layout file to validate")
+    parser.add_argument("--to", help="write the layout to this file (format from its extension)")
+    parser.add_argument("--generate", type=int, metavar="N", help="generate N synthetic sensors instead of reading")
+    args = parser.parse_args()
+    if not args.layout and not args.generate:
+        parser.error("give a layout file or --generate N")
+
+    start = time.perf_counter()
+    try:
+        sensors = generate_layout(args.generate) if args.generate else read_layout(args.layout)
+    except (ValueError, OSError) as e:
+        print(f"Invalid layout:\n{e}")
+        raise SystemExit(1)
+    types = {t: sum(1 for d in sensors.values() if d["type"] == t) for t in SENSOR_TYPES}
+    print(f"{len(sensors)} sensors ({', '.join(f'{n} {t}' for t, n in types.items())}) in {time.perf_counter() - start:.2f}s")
+    if args.to:
+        start = time.perf_counter()
+        write_layout(args.to, sensors)
+        print(f"Wrote {args.to} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
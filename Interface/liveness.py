@@ -0,0 +1,135 @@
+"""
+Heartbeat liveness: tells a dead sensor from a quiet one.
+
+Anything that sends heartbeats (a sensor, or a device such as the Arduino) is
+tracked from its first heartbeat on; everything it sends counts as a sign of life.
+Per tracked name the state is three flat array slots:
+
+    seen       last heartbeat (clock.monotonic())
+    due        seen + timeout, the moment it becomes overdue
+    offline    1 while overdue
+
+A heartbeat is one array store, whatever the number of sensors. Overdue names are
+found with a min-heap of (due, index) holding at most one entry per name. The heap
+is lazy: heartbeats do not touch it. When an entry comes up and the name has been
+seen since, it is pushed back with its current deadline, so each name costs one
+pop and push per timeout period rather than per heartbeat, and nothing is ever
+scanned. check() only runs when the earliest entry is due (next_deadline()).
+
+beat() may be called from any thread (the hub and serial workers call it directly,
+without going through the Tk thread); check() runs on one thread. A heartbeat that
+races with the check at the very moment it falls due can still be reported overdue;
+its next heartbeat brings the name straight back.
+"""
+import heapq
+import threading
+from array import array
+
+DEFAULT_TIMEOUT_S = 15.0
+
+
+class LivenessTracker:
+    def __init__(self, timeout_s=DEFAULT_TIMEOUT_S):
+        self.timeout = timeout_s
+        self.names = []
+        self.index = {}
+        self.seen = array("d")
+        self.due = array("d")
+        self.offline = bytearray()
+        self._heap = []
+        self._lock = threading.Lock()   # guards the heap and new names, not plain heartbeats
+        self.offline_count = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def beat(self, name, now):
+        """
+        Records a heartbeat of `name` at `now`. Returns True when this makes it
+        (newly) live: the first heartbeat ever or one after being offline.
+        """
+        i = self.index.get(name)
+        if i is not None and not self.offline[i]:
+            self.seen[i] = now
+            self.due[i] = now + self.timeout
+            return False
+        with self._lock:
+            if i is None:
+                i = self.index.get(name)
+                if i is None:
+                    i = self.index[name] = len(self.names)
+                    self.names.append(name)
+                    self.seen.append(now)
+                    self.due.append(now + self.timeout)
+                    self.offline.append(0)
+                    heapq.heappush(self._heap, (now + self.timeout, i))
+                    return True
+            self.seen[i] = now
+            self.due[i] = now + self.timeout
+            if self.offline[i]:
+                # Its heap entry was consumed when it went offline
+                self.offline[i] = 0
+                self.offline_count -= 1
+                heapq.heappush(self._heap, (now + self.timeout, i))
+                return True
+            return False
+
+    def check(self, now):
+        """Names that have become overdue by `now` (each reported once per outage)."""
+        overdue = []
+        heap, due = self._heap, self.due
+        with self._lock:
+            while heap and heap[0][0] <= now:
+                _, i = heap[0]
+                current = due[i]
+                if current > now:
+                    # Seen since this entry was pushed: move it to the current deadline
+                    heapq.heapreplace(heap, (current, i))
+                    continue
+                heapq.heappop(heap)
+                if self.names[i] is None:
+                    continue  # forgotten
+                self.offline[i] = 1
+                self.offline_count += 1
+                overdue.append(self.names[i])
+        return overdue
+
+    def next_deadline(self):
+        """When check() next has something to do, or None if nothing is tracked online."""
+        heap = self._heap
+        return heap[0][0] if heap else None
+
+    def is_offline(self, name):
+        i = self.index.get(name)
+        return i is not None and bool(self.offline[i])
+
+    def last_seen(self, name):
+        i = self.index.get(name)
+        return None if i is None else self.seen[i]
+
+    # --- Sensor table changes ---
+
+    def rename(self, old, new):
+        with self._lock:
+            i = self.index.pop(old, None)
+            if i is not None:
+                self.names[i] = new
+                self.index[new] = i
+
+    def retain(self, names):
+        """Stops tracking everything not in `names`."""
+        for name in [n for n in self.index if n not in names]:
+            self.forget(name)
+
+    def forget(self, name):
+        """Stops tracking `name` (its slot stays allocated, the heap entry is dropped when it comes up)."""
+        with self._lock:
+            i = self.index.pop(name, None)
+            if i is not None:
+                self.names[i] = None
+                if self.offline[i]:
+                    self.offline[i] = 0
+                    self.offline_count -= 1
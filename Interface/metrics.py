@@ -0,0 +1,229 @@
+"""
+Built-in instrumentation: per-stage latency histograms, counters and a local
+HTTP endpoint.
+
+Histograms are HDR-style (log-linear buckets over integer microseconds, ~3%
+relative precision), so recording is a couple of integer operations and memory
+is fixed. All aggregation and formatting happens only when someone scrapes:
+
+    GET http://127.0.0.1:<port>/metrics       Prometheus text format
+    GET http://127.0.0.1:<port>/metrics.json  JSON snapshot with percentiles
+
+Wakeups are counted per source (wakeup("serial") -> wakeups and wakeups_serial),
+next to the process CPU time, so an idle system can be checked for stray polling.
+"""
+import functools
+import json
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUB_BUCKET_BITS = 5                       # 32 linear sub-buckets per power of two
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_EXPONENT = 32                         # values up to ~2^37 us (~38 hours)
+PROMETHEUS_BUCKETS_S = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "ids"
+
+
+def _bucket_index(us):
+    if us < SUB_BUCKETS:
+        return us
+    shift = us.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (us >> shift) - SUB_BUCKETS
+
+
+def _bucket_upper_us(index):
+    """Largest value (in us) that falls in a bucket."""
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of durations, recorded in seconds."""
+
+    def __init__(self):
+        self._counts = array("Q", bytes(8 * SUB_BUCKETS * (MAX_EXPONENT + 1)))
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        if us < 0:
+            us = 0
+        index = _bucket_index(us)
+        if index >= len(self._counts):
+            index = len(self._counts) - 1
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum_us += us
+            if us > self.max_us:
+                self.max_us = us
+
+    def _snapshot(self):
+        with self._lock:
+            return array("Q", self._counts), self.count, self.sum_us, self.max_us
+
+    def percentiles(self, quantiles=(0.5, 0.9, 0.99, 0.999)):
+        counts, total, _, max_us = self._snapshot()
+        result = {}
+        if not total:
+            return {q: 0.0 for q in quantiles}
+        targets = sorted((max(1, int(q * total + 0.5)), q) for q in quantiles)
+        seen, t = 0, 0
+        for index, c in enumerate(counts):
+            if not c:
+                continue
+            seen += c
+            while t < len(targets) and seen >= targets[t][0]:
+                result[targets[t][1]] = min(_bucket_upper_us(index), max_us) / 1e6
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    def cumulative(self, bounds_s):
+        """Cumulative counts at each bound (seconds), for Prometheus 'le' buckets."""
+        counts, total, _, _ = self._snapshot()
+        result = []
+        index, running = 0, 0
+        for bound in bounds_s:
+            limit = _bucket_index(int(bound * 1e6))
+            while index <= limit and index < len(counts):
+                running += counts[index]
+                index += 1
+            result.append(running)
+        return result, total
+
+
+class Metrics:
+    """Registry of stage histograms and counters."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.stage(stage).record(seconds)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def wakeup(self, source):
+        """Counts one wakeup of a thread or Tk callback, in total and per source."""
+        key = "wakeups_" + source
+        with self._lock:
+            counters = self._counters
+            counters["wakeups"] = counters.get("wakeups", 0) + 1
+            counters[key] = counters.get(key, 0) + 1
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    # --- Exposition ---
+
+    def snapshot(self):
+        """JSON-friendly view: counters plus count/mean/percentiles/max per stage."""
+        stages = {}
+        for name, h in sorted(self._stages.items()):
+            p = h.percentiles()
+            stages[name] = {
+                "count": h.count,
+                "mean_s": h.sum_us / h.count / 1e6 if h.count else 0.0,
+                "p50_s": p[0.5], "p90_s": p[0.9], "p99_s": p[0.99], "p999_s": p[0.999],
+                "max_s": h.max_us / 1e6,
+            }
+        with self._lock:
+            counters = dict(sorted(self._counters.items()))
+        return {"uptime_s": time.time() - self.started, "cpu_s": time.process_time(), "counters": counters, "stages": stages}
+
+    def prometheus(self):
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+        for name, value in counters:
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        metric = f"{PREFIX}_stage_latency_seconds"
+        lines.append(f"# HELP {metric} Per-stage latency of the intrusion pipeline.")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, h in sorted(self._stages.items()):
+            cumulative, total = h.cumulative(PROMETHEUS_BUCKETS_S)
+            for bound, c in zip(PROMETHEUS_BUCKETS_S, cumulative):
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {c}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {total}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {h.sum_us / 1e6}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {total}')
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self.started:.3f}")
+        lines.append(f"# TYPE {PREFIX}_cpu_seconds_total counter")
+        lines.append(f"{PREFIX}_cpu_seconds_total {time.process_time():.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def timed_method(stage):
+    """Decorator: records the duration of a method into self.metrics under `stage`."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.metrics.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+    extra_json = None   # optional callable returning extra JSON sections
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.metrics.prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            snapshot = self.metrics.snapshot()
+            if self.extra_json:
+                snapshot.update(self.extra_json())
+            body = json.dumps(snapshot, indent=2).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the console
+
+
+def start_metrics_server(metrics, port, host="127.0.0.1", extra_json=None):
+    """Serves /metrics and /metrics.json from a daemon thread. Returns the server."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics, "extra_json": staticmethod(extra_json) if extra_json else None})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    # poll_interval=None: block in select() until a request arrives (no idle wakeups)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": None}, daemon=True).start()
+    return server
@@ -0,0 +1,182 @@
+"""
+Incident replay: a time range of alert history turned into a seekable status timeline.
+
+ReplayTimeline precomputes, for fixed-length frames (1 s, coarser for very long
+ranges), only the sensors whose status changes at the end of each frame (a sensor
+stays "Triggered" for `hold` seconds after its last event). Deltas are packed into flat arrays (code * 2 +
+triggered bit, with per-frame offsets), and every `keyframe_every` frames the full
+set of triggered sensors is stored as a keyframe. Seeking anywhere costs one
+keyframe plus at most `keyframe_every` frames of deltas, independent of where in
+the range you jump; playing forward applies the deltas frame by frame. The player
+reports which sensor names changed so the map can restyle just those.
+
+ReplayPlayer has no Tk dependency; interface.py drives it from a master.after() tick.
+"""
+import datetime as dt
+import heapq
+from array import array
+
+FRAME_S = 1.0            # timeline resolution
+HOLD_S = 30.0            # a sensor shows as triggered this long after its last event
+KEYFRAME_EVERY = 300     # frames between keyframes (5 minutes at 1 s frames)
+MAX_FRAMES = 100_000     # long ranges get coarser frames instead of more of them
+SPEEDS = (1, 10, 60, 300, 1000)
+ALERT_ONLY_TYPES = ("Rule", "Baseline", "Liveness")  # logged alerts that are not sensor triggers
+
+
+def parse_log_line(line):
+    """'[YYYY-mm-dd HH:MM:SS] - sensor | type | message' -> (timestamp, sensor, type), or None."""
+    try:
+        stamp, rest = line[1:].split("] - ", 1)
+        sensor, trigger_type, _ = rest.split(" | ", 2)
+        return dt.datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S").timestamp(), sensor, trigger_type
+    except ValueError:
+        return None
+
+
+def read_log_events(path, start, end):
+    """Intrusion events (not rule matches, baseline flags or liveness changes) from an alert log with start <= timestamp < end, in time order."""
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            parsed = parse_log_line(line)
+            if parsed and parsed[2] not in ALERT_ONLY_TYPES and start <= parsed[0] < end:
+                events.append(parsed)
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def load_events(history, log_file, start, end):
+    """
+    Events for [start, end): from the in-memory EventHistory when it reaches back far
+    enough (it also holds triggers that did not start an alarm), else from the log file.
+    """
+    oldest = history.first_time()
+    if oldest is not None and oldest <= start:
+        return [(e.timestamp, e.sensor, e.type) for e in history.window(start, end)], "history"
+    try:
+        return read_log_events(log_file, start, end), "log"
+    except FileNotFoundError:
+        return [], "log"
+
+
+class ReplayTimeline:
+    """Compact per-frame status deltas with periodic keyframes over [start, end)."""
+
+    def __init__(self, events, start, end, frame_s=FRAME_S, hold_s=HOLD_S, keyframe_every=KEYFRAME_EVERY):
+        self.start = start
+        self.end = max(end, start + frame_s)
+        self.frame_s = frame_s = max(frame_s, (self.end - start) / MAX_FRAMES)
+        self.keyframe_every = keyframe_every
+        self.frames = int((self.end - self.start) // frame_s) + 1
+        self.names = []
+        codes = {}
+        self.times = array("d")
+        self.codes = array("i")
+        for timestamp, sensor, _ in events:
+            code = codes.get(sensor)
+            if code is None:
+                code = codes[sensor] = len(self.names)
+                self.names.append(sensor)
+            self.times.append(timestamp)
+            self.codes.append(code)
+        self.offsets = array("I", [0])  # frame f's deltas are deltas[offsets[f]:offsets[f + 1]]
+        self.deltas = array("i")        # code * 2 + 1 = becomes triggered, code * 2 = back to normal
+        self.keyframes = []             # keyframes[k] = triggered codes before frame k * keyframe_every
+        self._build(hold_s)
+
+    def _build(self, hold_s):
+        times, codes = self.times, self.codes
+        lit_until = {}  # code -> expiry of its current triggered period
+        expiries = []   # heap of (expiry, code)
+        state = set()
+        i, n = 0, len(times)
+        for frame in range(self.frames):
+            if frame % self.keyframe_every == 0:
+                self.keyframes.append(array("i", sorted(state)))
+            frame_end = self.start + (frame + 1) * self.frame_s
+            touched = set()
+            while i < n and times[i] < frame_end:
+                code = codes[i]
+                lit_until[code] = times[i] + hold_s
+                heapq.heappush(expiries, (times[i] + hold_s, code))
+                touched.add(code)
+                i += 1
+            while expiries and expiries[0][0] < frame_end:
+                until, code = heapq.heappop(expiries)
+                if lit_until.get(code) == until:
+                    del lit_until[code]
+                    touched.add(code)
+            for code in touched:
+                lit = code in lit_until
+                if lit != (code in state):
+                    self.deltas.append(code * 2 + lit)
+                    (state.add if lit else state.discard)(code)
+            self.offsets.append(len(self.deltas))
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def frame_at(self, t):
+        return max(0, min(self.frames - 1, int((t - self.start) // self.frame_s)))
+
+    def state_at(self, frame):
+        """Set of triggered sensor codes after `frame`: nearest keyframe plus the deltas since."""
+        k = frame // self.keyframe_every
+        state = set(self.keyframes[k])
+        deltas, offsets = self.deltas, self.offsets
+        for value in deltas[offsets[k * self.keyframe_every]:offsets[frame + 1]]:
+            (state.add if value & 1 else state.discard)(value >> 1)
+        return state
+
+    def nbytes(self):
+        """Approximate size of the precomputed deltas and keyframes."""
+        return (self.offsets.itemsize * len(self.offsets) + self.deltas.itemsize * len(self.deltas)
+                + sum(k.itemsize * len(k) for k in self.keyframes))
+
+
+class ReplayPlayer:
+    """Playback position over a timeline; reports changed sensor names to on_change."""
+
+    def __init__(self, timeline, on_change):
+        self.timeline = timeline
+        self.on_change = on_change
+        self.position = timeline.start
+        self.speed = 1
+        self.playing = False
+        self.frame = -1
+        self._codes = set()
+        self.lit = set()    # names currently shown as triggered
+        self.seek(timeline.start)
+
+    def seek(self, t):
+        """Jumps to replay time t."""
+        tl = self.timeline
+        self.position = min(max(t, tl.start), tl.end)
+        frame = tl.frame_at(self.position)
+        if frame == self.frame:
+            return
+        if 0 <= self.frame < frame <= self.frame + tl.keyframe_every:
+            # Short step forward: apply the deltas in between
+            changed = set()
+            for value in tl.deltas[tl.offsets[self.frame + 1]:tl.offsets[frame + 1]]:
+                code = value >> 1
+                (self._codes.add if value & 1 else self._codes.discard)(code)
+                changed.add(code)
+        else:
+            codes = tl.state_at(frame)
+            changed = codes ^ self._codes
+            self._codes = codes
+        self.frame = frame
+        self.lit = {tl.names[c] for c in self._codes}
+        if changed:
+            self.on_change([tl.names[c] for c in changed])
+
+    def advance(self, real_seconds):
+        """Moves forward by real_seconds * speed while playing; stops at the end."""
+        if not self.playing:
+            return
+        self.seek(self.position + real_seconds * self.speed)
+        if self.position >= self.timeline.end:
+            self.playing = False
@@ -0,0 +1,187 @@
+"""
+Sliding-window correlation rules.
+
+Rules are plain dicts (so they can live in a JSON file) and are compiled into small
+incremental state machines:
+
+  {"name": "Perimeter entry", "kind": "sequence", "within": 3,
+   "steps": [{"type": "IR", "zone": "Perimeter"}, {"type": "Sound", "zone": "Perimeter"}]}
+      -> fires when the steps are seen in order within `within` seconds.
+
+  {"name": "Two IR", "kind": "distinct", "within": 10, "count": 2, "match": {"type": "IR"}}
+      -> fires when `count` distinct sensors matching `match` trigger within `within` seconds.
+
+A step/match may constrain "type", "zone" (zone name) and "sensor" (sensor name).
+Each event only touches the rules whose predicates can match its sensor: the list of
+(rule, step) pairs for a sensor is built on first use and cached.
+"""
+from collections import deque
+
+
+class RuleMatch:
+    """A fired rule and the sensors that satisfied it."""
+
+    __slots__ = ("rule", "sensors", "time")
+
+    def __init__(self, rule, sensors, time):
+        self.rule = rule
+        self.sensors = sensors
+        self.time = time
+
+    def __repr__(self):
+        return f"RuleMatch({self.rule.name!r}, {self.sensors!r}, {self.time:.3f})"
+
+
+class _Predicate:
+    """Compiled step/match condition: sensor type, zone bit and/or sensor name."""
+
+    __slots__ = ("sensor_type", "zone_mask", "sensor")
+
+    def __init__(self, spec, zones):
+        self.sensor_type = spec.get("type")
+        self.zone_mask = zones.bit(spec["zone"]) if spec.get("zone") else 0
+        self.sensor = spec.get("sensor")
+
+    def matches(self, name, sensor_type, zone_mask):
+        return ((self.sensor_type is None or self.sensor_type == sensor_type)
+                and (not self.zone_mask or self.zone_mask & zone_mask)
+                and (self.sensor is None or self.sensor == name))
+
+
+class SequenceRule:
+    """Steps seen in order within a window; keeps only the latest partial match per step."""
+
+    kind = "sequence"
+
+    def __init__(self, name, predicates, within):
+        if len(predicates) < 2:
+            raise ValueError(f"Rule '{name}': a sequence needs at least two steps.")
+        self.name = name
+        self.predicates = predicates
+        self.within = float(within)
+        # _starts[k] / _sensors[k]: start time and sensors of the freshest partial match that completed step k
+        self._starts = [None] * len(predicates)
+        self._sensors = [None] * len(predicates)
+
+    def reset(self):
+        self._starts = [None] * len(self.predicates)
+        self._sensors = [None] * len(self.predicates)
+
+    def update(self, steps, sensor_name, t):
+        """Advances the machine for an event that matches `steps` (descending step indices)."""
+        last = len(self.predicates) - 1
+        for k in steps:
+            if k == 0:
+                self._starts[0] = t
+                self._sensors[0] = (sensor_name,)
+                continue
+            start = self._starts[k - 1]
+            if start is None or t - start > self.within:
+                continue
+            sensors = self._sensors[k - 1] + (sensor_name,)
+            if k == last:
+                self.reset()
+                return RuleMatch(self, sensors, t)
+            # Keep the partial match with the latest start: it has the most time left
+            if self._starts[k] is None or start >= self._starts[k]:
+                self._starts[k] = start
+                self._sensors[k] = sensors
+        return None
+
+
+class DistinctRule:
+    """At least `count` distinct matching sensors within a sliding window."""
+
+    kind = "distinct"
+
+    def __init__(self, name, predicate, count, within):
+        if count < 1:
+            raise ValueError(f"Rule '{name}': count must be at least 1.")
+        self.name = name
+        self.predicates = [predicate]
+        self.count = int(count)
+        self.within = float(within)
+        self._window = deque()   # (time, sensor) in arrival order
+        self._last_seen = {}     # sensor -> latest time inside the window
+
+    def reset(self):
+        self._window.clear()
+        self._last_seen.clear()
+
+    def update(self, steps, sensor_name, t):
+        window, last_seen = self._window, self._last_seen
+        cutoff = t - self.within
+        while window and window[0][0] < cutoff:
+            old_t, old_sensor = window.popleft()
+            if last_seen.get(old_sensor) == old_t:
+                del last_seen[old_sensor]
+        window.append((t, sensor_name))
+        last_seen[sensor_name] = t
+        if len(last_seen) >= self.count:
+            sensors = tuple(last_seen)
+            self.reset()
+            return RuleMatch(self, sensors, t)
+        return None
+
+
+def compile_rule(spec, zones):
+    """Builds a state machine from a rule dict."""
+    name = spec.get("name") or "Unnamed rule"
+    kind = spec.get("kind", "sequence")
+    if kind == "sequence":
+        return SequenceRule(name, [_Predicate(step, zones) for step in spec["steps"]], spec["within"])
+    if kind == "distinct":
+        return DistinctRule(name, _Predicate(spec.get("match", {}), zones), spec.get("count", 2), spec["within"])
+    raise ValueError(f"Rule '{name}': unknown kind '{kind}'.")
+
+
+class RuleEngine:
+    """Routes each event to the rules that involve its sensor and collects matches."""
+
+    def __init__(self, zones, rule_specs=()):
+        self.zones = zones
+        self.rules = []
+        self._by_type = {}    # sensor type (or None = any) -> [rule index]
+        self._routes = {}     # (sensor name, type, zone mask) -> [(rule, descending step indices)]
+        for spec in rule_specs:
+            self.add_rule(spec)
+
+    def add_rule(self, spec):
+        rule = compile_rule(spec, self.zones)
+        index = len(self.rules)
+        self.rules.append(rule)
+        for sensor_type in {p.sensor_type for p in rule.predicates}:
+            self._by_type.setdefault(sensor_type, []).append(index)
+        self._routes.clear()
+        return rule
+
+    def _route(self, key):
+        """Builds the (rule, steps) list for a sensor: only rules with a predicate it can satisfy."""
+        name, sensor_type, zone_mask = key
+        candidates = sorted(set(self._by_type.get(sensor_type, ())) | set(self._by_type.get(None, ())))
+        route = []
+        for index in candidates:
+            rule = self.rules[index]
+            steps = [k for k, p in enumerate(rule.predicates) if p.matches(name, sensor_type, zone_mask)]
+            if steps:
+                route.append((rule, tuple(reversed(steps))))
+        self._routes[key] = route
+        return route
+
+    def process(self, sensor_name, sensor_type, zone_mask, t):
+        """Feeds one event (t in monotonic seconds, non-decreasing) and returns a list of RuleMatch."""
+        key = (sensor_name, sensor_type, zone_mask)
+        route = self._routes.get(key)
+        if route is None:
+            route = self._route(key)
+        matches = []
+        for rule, steps in route:
+            match = rule.update(steps, sensor_name, t)
+            if match is not None:
+                matches.append(match)
+        return matches
+
+    def reset(self):
+        """Clears all partial matches (e.g. on disarm)."""
+        for rule in self.rules:
+            rule.reset()
@@ -0,0 +1,249 @@
+"""
+Weekly schedule engine for automatic activation/deactivation.
+
+A schedule is made of arming windows:
+  - a default daily window (the classic Activation/Deactivation times),
+  - optional weekday-specific windows that replace the default for that weekday,
+  - holidays, which use the "Hol" windows (or Sunday's windows if none are given),
+  - per-date exceptions, which replace everything for that date ("off" = no windows).
+
+Windows are [start, stop) in seconds since midnight. A window whose stop is not
+after its start runs overnight into the next day.
+
+The engine answers "is the system armed at time t?" and "when is the next
+transition after t?", so the scheduler can sleep exactly until the next change
+instead of polling.
+"""
+import datetime as dt
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+HOLIDAY_KEY = "Hol"
+DAY_SECONDS = 24 * 3600
+
+# How far ahead next_transition() looks before giving up (covers yearly exceptions)
+SEARCH_HORIZON_DAYS = 400
+
+
+def parse_time_of_day(text):
+    """Parses 'HH:MM' or 'HH:MM:SS' (24:00 allowed) into seconds since midnight."""
+    parts = [int(p) for p in text.strip().split(":")]
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid time '{text}'. Use HH:MM.")
+    h, m = parts[0], parts[1]
+    s = parts[2] if len(parts) == 3 else 0
+    if not (0 <= m < 60 and 0 <= s < 60) or not (0 <= h < 24 or (h == 24 and m == 0 and s == 0)):
+        raise ValueError(f"Invalid time '{text}'. Use HH:MM.")
+    return h * 3600 + m * 60 + s
+
+
+def format_time_of_day(seconds):
+    """Formats seconds since midnight as 'HH:MM' (or 'HH:MM:SS' when needed)."""
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}" if s else f"{h:02d}:{m:02d}"
+
+
+def time_to_seconds(t):
+    """Converts a datetime.time to seconds since midnight."""
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _parse_windows(text):
+    """Parses '22:00-07:00, 12:00-13:00' (or 'off') into a list of (start, stop) tuples."""
+    text = text.strip()
+    if text.lower() == "off":
+        return []
+    windows = []
+    for chunk in text.split(","):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        try:
+            start_str, stop_str = chunk.split("-")
+        except ValueError:
+            raise ValueError(f"Invalid window '{chunk}'. Use HH:MM-HH:MM.")
+        start = parse_time_of_day(start_str)
+        stop = parse_time_of_day(stop_str)
+        if start == DAY_SECONDS:
+            raise ValueError(f"Invalid window '{chunk}': start cannot be 24:00.")
+        windows.append((start, stop))
+    return windows
+
+
+def _parse_day_keys(text):
+    """Parses 'Mon-Fri', 'Sat,Sun', 'Daily', 'Hol' or '2026-12-24' into schedule keys."""
+    keys = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part.lower() == "daily":
+            keys.extend(range(7))
+        elif part.lower() == HOLIDAY_KEY.lower():
+            keys.append(HOLIDAY_KEY)
+        elif part[:1].isdigit():
+            keys.append(dt.date.fromisoformat(part))
+        elif "-" in part:
+            first, last = (WEEKDAYS.index(p.strip().title()[:3]) for p in part.split("-"))
+            i = first
+            while True:
+                keys.append(i)
+                if i == last:
+                    break
+                i = (i + 1) % 7
+        else:
+            keys.append(WEEKDAYS.index(part.title()[:3]))
+    return keys
+
+
+def parse_holidays(text):
+    """Parses a comma/space separated list of ISO dates into a set of dates."""
+    return {dt.date.fromisoformat(p) for p in text.replace(",", " ").split()}
+
+
+class WeeklySchedule:
+    """Arming windows per weekday, with holidays and per-date exceptions."""
+
+    def __init__(self, default_windows=None, weekly=None, holidays=None, holiday_windows=None, exceptions=None):
+        self.default_windows = list(default_windows or [])
+        self.weekly = {int(k): list(v) for k, v in (weekly or {}).items()}      # weekday -> windows
+        self.holidays = set(holidays or ())
+        self.holiday_windows = None if holiday_windows is None else list(holiday_windows)
+        self.exceptions = {k: list(v) for k, v in (exceptions or {}).items()}  # date -> windows
+
+    @classmethod
+    def daily(cls, start, stop):
+        """Builds the classic single daily window from two datetime.time values."""
+        return cls(default_windows=[(time_to_seconds(start), time_to_seconds(stop))])
+
+    # --- Window resolution ---
+
+    def windows_for(self, date):
+        """Returns the windows that start on the given date (exception > holiday > weekday > default)."""
+        if date in self.exceptions:
+            return self.exceptions[date]
+        if date in self.holidays:
+            if self.holiday_windows is not None:
+                return self.holiday_windows
+            return self.weekly.get(6, self.default_windows)
+        return self.weekly.get(date.weekday(), self.default_windows)
+
+    def _intervals(self, first_day, last_day):
+        """Returns merged [start, stop) datetime intervals for windows starting in the day range."""
+        intervals = []
+        day = first_day
+        while day <= last_day:
+            midnight = dt.datetime.combine(day, dt.time())
+            for start, stop in self.windows_for(day):
+                if stop == start:
+                    continue
+                end = stop if stop > start else stop + DAY_SECONDS
+                intervals.append((midnight + dt.timedelta(seconds=start), midnight + dt.timedelta(seconds=end)))
+            day += dt.timedelta(days=1)
+        intervals.sort()
+
+        merged = []
+        for start, stop in intervals:
+            if merged and start <= merged[-1][1]:
+                if stop > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], stop)
+            else:
+                merged.append((start, stop))
+        return merged
+
+    def is_active_at(self, when):
+        """True if the system should be armed at the given (naive, local) datetime."""
+        day = when.date()
+        for start, stop in self._intervals(day - dt.timedelta(days=1), day):
+            if start <= when < stop:
+                return True
+        return False
+
+    def next_transition(self, when):
+        """
+        Returns (transition_datetime, active_after) for the first state change strictly
+        after `when`, or None if the schedule never changes state within the horizon.
+        """
+        day = when.date()
+        span = 7
+        while True:
+            last_day = day + dt.timedelta(days=span)
+            # Windows starting after last_day could extend an interval that ends past its midnight,
+            # so only boundaries before that point are final.
+            horizon = dt.datetime.combine(last_day + dt.timedelta(days=1), dt.time())
+            for start, stop in self._intervals(day - dt.timedelta(days=1), last_day):
+                if start > when:
+                    boundary = (start, True)
+                elif when < stop:
+                    boundary = (stop, False)
+                else:
+                    continue
+                if boundary[0] < horizon:
+                    return boundary
+                break
+            if span >= SEARCH_HORIZON_DAYS:
+                return None
+            span = min(span * 4, SEARCH_HORIZON_DAYS)
+
+    # --- Persistence and text form ---
+
+    def to_dict(self):
+        """Plain-data form for the state file."""
+        return {
+            "default_windows": list(self.default_windows),
+            "weekly": dict(self.weekly),
+            "holidays": sorted(self.holidays),
+            "holiday_windows": self.holiday_windows,
+            "exceptions": dict(self.exceptions),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            default_windows=data.get("default_windows"),
+            weekly=data.get("weekly"),
+            holidays=data.get("holidays"),
+            holiday_windows=data.get("holiday_windows"),
+            exceptions=data.get("exceptions"),
+        )
+
+    def set_rules_from_text(self, text):
+        """
+        Replaces weekday windows, holiday windows and exceptions from a spec such as
+        'Mon-Fri 22:00-07:00; Sat,Sun 23:00-08:00; Hol off; 2026-12-24 18:00-24:00'.
+        The default daily window is left untouched.
+        """
+        weekly, holiday_windows, exceptions = {}, None, {}
+        for entry in text.replace("\n", ";").split(";"):
+            entry = entry.strip()
+            if not entry:
+                continue
+            try:
+                days_str, windows_str = entry.split(None, 1)
+            except ValueError:
+                raise ValueError(f"Invalid schedule entry '{entry}'. Use e.g. 'Mon-Fri 22:00-07:00'.")
+            windows = _parse_windows(windows_str)
+            for key in _parse_day_keys(days_str):
+                if key == HOLIDAY_KEY:
+                    holiday_windows = windows
+                elif isinstance(key, dt.date):
+                    exceptions[key] = windows
+                else:
+                    weekly[key] = windows
+        self.weekly, self.holiday_windows, self.exceptions = weekly, holiday_windows, exceptions
+
+    def rules_text(self):
+        """Inverse of set_rules_from_text()."""
+        def fmt(windows):
+            if not windows:
+                return "off"
+            return ", ".join(f"{format_time_of_day(s)}-{format_time_of_day(e)}" for s, e in windows)
+
+        entries = [f"{WEEKDAYS[d]} {fmt(w)}" for d, w in sorted(self.weekly.items())]
+        if self.holiday_windows is not None:
+            entries.append(f"{HOLIDAY_KEY} {fmt(self.holiday_windows)}")
+        entries.extend(f"{d.isoformat()} {fmt(w)}" for d, w in sorted(self.exceptions.items()))
+        return "; ".join(entries)
+
+    def holidays_text(self):
+        return ", ".join(d.isoformat() for d in sorted(self.holidays))
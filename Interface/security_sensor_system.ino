@@ -1,6 +1,9 @@
 #define IR_PIN 2        // IR sensor signal (2-pin type: 1→D2, 1→GND)
 #define SOUND_PIN 3     // Sound sensor output pin (3-pin type OUT→D3, VCC→5V, GND→GND)
 #define LED_PIN 13      // Onboard indicator LED
+#define HEARTBEAT_MS 5000  // "H" heartbeat period, so the host can tell a dead board from a quiet house
+
+unsigned long last_heartbeat = 0;
 
 void setup() {
   pinMode(IR_PIN, INPUT_PULLUP);   // 2-pin IR uses internal pull-up
@@ -31,5 +34,10 @@ void loop() {
     digitalWrite(LED_PIN, LOW);
   }
 
+  if (millis() - last_heartbeat >= HEARTBEAT_MS) {
+    last_heartbeat = millis();
+    Serial.println("H");
+  }
+
   delay(200);  // sample rate
 }
@@ -0,0 +1,410 @@
+"""
+Deterministic, faster-than-real-time discrete-event simulator.
+
+Drives the real IntrusionDetectionSystem (detection, zones, schedule, suppression,
+correlation rules, logging) headless on a SimulatedClock. Nothing sleeps: the
+simulator keeps its own event heap (sensor arrivals, faults, operator actions,
+schedule transitions) and merges it with the app's master.after() queue, jumping
+the clock straight to whichever is due next. The same seed gives the same run,
+byte for byte, so alerts.log digests can be compared between versions.
+
+    python simulator.py --days 7 --sensors 2000 --seed 42
+    python simulator.py --days 28 --sensors 5000 --chatter 3 --outage 30:120 --json run.json
+
+Sensor populations come from populate(); traffic from arrival processes
+(PoissonArrivals, SerialArrivals, IntruderWalk, LegacyRandomTrigger); faults from
+ChatteringSensor, LinkOutage and SerialNoise. Each has a start(sim) method that
+schedules its first event, so custom processes can be added the same way.
+"""
+import argparse
+import collections
+import datetime as dt
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import headless
+from clock import SimulatedClock
+from interface import EV_INTRUSION  # after headless: it prepares pygame for a display-less import
+
+
+class Simulator:
+    """Event loop over simulated time, wrapped around a headless app."""
+
+    def __init__(self, seed=0, start=None, workdir=None, render=False, ack_after=60.0):
+        self.rng = random.Random(seed)
+        self.clock = SimulatedClock(start)
+        self._own_workdir = workdir is None
+        self.workdir = workdir or tempfile.mkdtemp(prefix="ids-sim-")
+        self.app, self.master = headless.build_app(self.workdir, clock=self.clock)
+        self.app.sim_rng.seed(self.rng.random())
+        if not render:
+            # Redraw cost is covered by the benchmarks; here only the count matters
+            self.app._draw_sensor_map = lambda: self.app.metrics.incr("redraws")
+            # Nothing to see either: the 300 ms alarm flicker would be most of the timer wakeups
+            self.app._start_flicker = lambda: None
+        # Nobody listens to a simulation, and opening and closing the audio device per alarm
+        # (about 30 ms) would dominate the run
+        self.app._play_alarm_sound = self.app._stop_alarm_sound = lambda: None
+        self.sensor_names = list(self.app.sensor_data)
+        self.ack_after = ack_after
+        self.link_up = True
+        self.generated = collections.Counter()  # arrivals per process
+        self.lost = 0                           # arrivals swallowed by a link outage
+        self._queue = []                        # heap of (time, seq, func, args)
+        self._seq = itertools.count()
+        self._ack_pending = False
+        self._scheduled = False
+
+    # --- Population ---
+
+    def populate(self, count, ir_fraction=0.5, night_fraction=0.3):
+        """Replaces the sensor map with `count` sensors spread over the zones."""
+        zones = self.app.zones
+        base = [zones.bit(name) for name in zones.names if name != "Night"] or [zones.all_mask]
+        night = zones.bit("Night") if "Night" in zones.names else 0
+        sensors = {}
+        for i in range(count):
+            sensor_type = "IR" if self.rng.random() < ir_fraction else "Sound"
+            mask = self.rng.choice(base)
+            if night and self.rng.random() < night_fraction:
+                mask |= night
+            sensors[f"{sensor_type}_{i:05d}"] = {
+                "x": self.rng.randint(20, 380), "y": self.rng.randint(30, 230),
+                "type": sensor_type, "status": "Normal", "zones": mask,
+            }
+        self.app.sensor_data = sensors
+        self.app.rule_engine.reset()
+        self.sensor_names = list(sensors)
+        return sensors
+
+    def sensors_in_zone(self, zone_name):
+        bit = self.app.zones.bit(zone_name)
+        return [name for name, data in self.app.sensor_data.items() if data["zones"] & bit]
+
+    # --- Event scheduling ---
+
+    def at(self, when, func, *args):
+        """Schedules func(*args) at epoch time `when` (simulated)."""
+        heapq.heappush(self._queue, (when, next(self._seq), func, args))
+
+    def after(self, delay, func, *args):
+        self.at(self.clock.time() + delay, func, *args)
+
+    def add(self, *processes):
+        for process in processes:
+            process.start(self)
+        return self
+
+    # --- Inputs into the app (same paths the serial threads use) ---
+
+    def trigger(self, sensor_name, source="sim"):
+        """A sensor fires: handled on the 'Tk thread' like a decoded serial event."""
+        self.generated[source] += 1
+        if not self.link_up:
+            self.lost += 1
+            return
+        sensor_type = self.app.sensor_data[sensor_name]["type"]
+        self.app.events.put((EV_INTRUSION, sensor_type, sensor_name, source, self.clock.monotonic()))
+
+    def serial_byte(self, char, source="serial"):
+        """A raw byte from the Arduino, dispatched by _handle_serial_trigger."""
+        self.generated[source] += 1
+        if not self.link_up:
+            self.lost += 1
+            return
+        self.app._handle_serial_trigger(char, source, self.clock.monotonic())
+
+    def _schedule_step(self):
+        transition = self.app._apply_schedule()
+        if transition is not None:
+            self.at(transition[0].timestamp(), self._schedule_step)
+
+    def _acknowledge(self):
+        self._ack_pending = False
+        self.app._stop_alarm()
+
+    def _operator(self):
+        """The person at the dashboard presses 'Stop Alarm' ack_after seconds into an alarm."""
+        if self.ack_after is not None and self.app.is_alarm_sounding and not self._ack_pending:
+            self._ack_pending = True
+            self.after(self.ack_after, self._acknowledge)
+
+    # --- Running ---
+
+    def run(self, duration):
+        """Runs `duration` simulated seconds and returns the report dict."""
+        if not self._scheduled:
+            self._scheduled = True
+            self._schedule_step()
+        end = self.clock.time() + duration
+        started = time.perf_counter()
+        steps = 0
+        while True:
+            next_event = self._queue[0][0] if self._queue else float("inf")
+            next_callback = self.master.next_due()
+            if next_callback is None:
+                next_callback = float("inf")
+            when = min(next_event, next_callback)
+            if when > end:
+                break
+            self.clock.advance_to(when)
+            if next_callback <= next_event:
+                self.master.run_pending()
+            else:
+                _, _, func, args = heapq.heappop(self._queue)
+                func(*args)
+            self._operator()
+            steps += 1
+        self.clock.advance_to(end)
+        self.master.run_pending()
+        return self.report(duration, time.perf_counter() - started, steps)
+
+    def report(self, duration, wall, steps):
+        import interface
+
+        digest = hashlib.sha256()
+        log_lines = 0
+        if os.path.exists(interface.LOG_FILE):
+            with open(interface.LOG_FILE, "rb") as f:
+                for line in f:
+                    digest.update(line)
+                    log_lines += 1
+        counters = self.app.metrics.snapshot()["counters"]
+        return {
+            "simulated_s": duration,
+            "wall_s": round(wall, 3),
+            "speedup": round(duration / wall) if wall else None,
+            "steps": steps,
+            "sensors": len(self.app.sensor_data),
+            "generated": dict(sorted(self.generated.items())),
+            "lost": self.lost,
+            "counters": counters,
+            "history_events": self.app.event_history.count,
+            "log_lines": log_lines,
+            "log_sha256": digest.hexdigest(),
+            "clock_end": self.clock.now().isoformat(timespec="seconds"),
+        }
+
+    def close(self):
+        self.app.lag_monitor.stop()
+        if self._own_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# --- Arrival processes ---
+
+class PoissonArrivals:
+    """
+    Independent per-sensor triggers (false alarms, pets, drafts): each sensor fires at
+    `rate_per_day`, optionally shaped by a 24-entry hourly profile (by thinning).
+    """
+
+    def __init__(self, rate_per_day, sensor_type=None, hourly_profile=None, source="poisson"):
+        self.rate_per_day = rate_per_day
+        self.sensor_type = sensor_type
+        self.profile = hourly_profile
+        self.source = source
+
+    def start(self, sim):
+        self.sim = sim
+        self.names = [n for n in sim.sensor_names if self.sensor_type in (None, sim.app.sensor_data[n]["type"])]
+        peak = max(self.profile) if self.profile else 1.0
+        self.rate = len(self.names) * self.rate_per_day * peak / 86400.0
+        if self.rate > 0:
+            sim.after(sim.rng.expovariate(self.rate), self._fire)
+
+    def _fire(self):
+        sim = self.sim
+        if not self.profile or sim.rng.random() * max(self.profile) < self.profile[sim.clock.now().hour]:
+            sim.trigger(sim.rng.choice(self.names), self.source)
+        sim.after(sim.rng.expovariate(self.rate), self._fire)
+
+
+class SerialArrivals:
+    """Raw 'I'/'S'/'B' bytes from a single Arduino at `rate_per_hour`, mixed by weight."""
+
+    def __init__(self, rate_per_hour, mix=None, source="serial"):
+        self.rate = rate_per_hour / 3600.0
+        self.mix = mix or {"I": 0.45, "S": 0.45, "B": 0.10}
+        self.source = source
+
+    def start(self, sim):
+        self.sim = sim
+        self.keys = list(self.mix)
+        self.weights = [self.mix[k] for k in self.keys]
+        sim.after(sim.rng.expovariate(self.rate), self._fire)
+
+    def _fire(self):
+        sim = self.sim
+        sim.serial_byte(sim.rng.choices(self.keys, self.weights)[0], self.source)
+        sim.after(sim.rng.expovariate(self.rate), self._fire)
+
+
+class IntruderWalk:
+    """
+    An intruder moving through a zone: `steps` sensors of that zone fire in turn,
+    `gap` seconds apart (uniform range). Walks start at `per_day` on average.
+    """
+
+    def __init__(self, per_day, zone="Perimeter", steps=3, gap=(1.0, 5.0), source="intruder"):
+        self.rate = per_day / 86400.0
+        self.zone = zone
+        self.steps = steps
+        self.gap = gap
+        self.source = source
+
+    def start(self, sim):
+        self.sim = sim
+        self.names = sim.sensors_in_zone(self.zone)
+        if self.names and self.rate > 0:
+            sim.after(sim.rng.expovariate(self.rate), self._walk)
+
+    def _walk(self):
+        sim = self.sim
+        delay = 0.0
+        for name in sim.rng.sample(self.names, min(self.steps, len(self.names))):
+            sim.after(delay, sim.trigger, name, self.source)
+            delay += sim.rng.uniform(*self.gap)
+        sim.after(sim.rng.expovariate(self.rate), self._walk)
+
+
+class LegacyRandomTrigger:
+    """The app's own built-in simulation (_simulate_sensor_tick), stepped on simulated time."""
+
+    def start(self, sim):
+        self.sim = sim
+        sim.after(0, self._tick)
+
+    def _tick(self):
+        self.sim.generated["legacy"] += 1
+        self.sim.after(self.sim.app._simulate_sensor_tick(), self._tick)
+
+
+# --- Fault injection ---
+
+class ChatteringSensor:
+    """A faulty sensor that fires `rate_hz` times a second for `duration` seconds from `at`."""
+
+    def __init__(self, at, duration, rate_hz=2.0, sensor=None):
+        self.at = at
+        self.duration = duration
+        self.interval = 1.0 / rate_hz
+        self.sensor = sensor
+
+    def start(self, sim):
+        self.sim = sim
+        self.sensor = self.sensor or sim.rng.choice(sim.sensor_names)
+        self.until = sim.clock.time() + self.at + self.duration
+        sim.after(self.at, self._fire)
+
+    def _fire(self):
+        self.sim.trigger(self.sensor, "chatter")
+        if self.sim.clock.time() + self.interval < self.until:
+            self.sim.after(self.interval, self._fire)
+
+
+class LinkOutage:
+    """The serial link is down from `at` for `duration` seconds: arrivals are lost."""
+
+    def __init__(self, at, duration):
+        self.at = at
+        self.duration = duration
+
+    def start(self, sim):
+        self.sim = sim
+        sim.after(self.at, self._set, False)
+        sim.after(self.at + self.duration, self._set, True)
+
+    def _set(self, up):
+        self.sim.link_up = up
+
+
+class SerialNoise:
+    """Line noise: random non-protocol bytes at `rate_per_hour`."""
+
+    def __init__(self, rate_per_hour, alphabet="\x00\xffx?#~"):
+        self.rate = rate_per_hour / 3600.0
+        self.alphabet = alphabet
+
+    def start(self, sim):
+        self.sim = sim
+        sim.after(sim.rng.expovariate(self.rate), self._fire)
+
+    def _fire(self):
+        sim = self.sim
+        sim.serial_byte(sim.rng.choice(self.alphabet), "noise")
+        sim.after(sim.rng.expovariate(self.rate), self._fire)
+
+
+def _outage(text):
+    """'START_MIN:DURATION_MIN' -> LinkOutage (seconds)."""
+    start, duration = text.split(":")
+    return LinkOutage(float(start) * 60, float(duration) * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7.0, help="simulated duration in days")
+    parser.add_argument("--sensors", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2026-01-05T00:00:00", help="simulated start time (ISO, local)")
+    parser.add_argument("--false-alarms", type=float, default=1.0, help="per sensor per day")
+    parser.add_argument("--serial-rate", type=float, default=0.0, help="raw 'I'/'S'/'B' bytes per hour")
+    parser.add_argument("--intruders", type=float, default=0.5, help="intruder walks per day")
+    parser.add_argument("--chatter", type=int, default=0, help="number of chattering sensors (1 h each, random start)")
+    parser.add_argument("--outage", type=_outage, action="append", default=[], help="link outage START_MIN:DURATION_MIN")
+    parser.add_argument("--noise", type=float, default=0.0, help="garbage serial bytes per hour")
+    parser.add_argument("--legacy", action="store_true", help="also run the app's built-in random trigger simulation")
+    parser.add_argument("--ack-after", type=float, default=60.0, help="operator stops an alarm after this many seconds")
+    parser.add_argument("--render", action="store_true", help="actually redraw the (headless) map")
+    parser.add_argument("--workdir", help="keep alerts.log/state here instead of a temp dir")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--expect-digest", help="exit 1 if the alerts.log sha256 differs (regression runs)")
+    parser.add_argument("--verbose", action="store_true", help="show the app's console output")
+    args = parser.parse_args()
+
+    duration = args.days * 86400
+    real_stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        sim = Simulator(args.seed, dt.datetime.fromisoformat(args.start), args.workdir, args.render, args.ack_after)
+        sim.populate(args.sensors)
+        sim.add(PoissonArrivals(args.false_alarms), IntruderWalk(args.intruders))
+        if args.serial_rate:
+            sim.add(SerialArrivals(args.serial_rate))
+        if args.noise:
+            sim.add(SerialNoise(args.noise))
+        if args.legacy:
+            sim.add(LegacyRandomTrigger())
+        for _ in range(args.chatter):
+            sim.add(ChatteringSensor(sim.rng.uniform(0, max(0.0, duration - 3600)), 3600))
+        sim.add(*args.outage)
+        report = sim.run(duration)
+        report["seed"] = args.seed
+        sim.close()
+    finally:
+        if sys.stdout is not real_stdout:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text + "\n")
+    if args.expect_digest and args.expect_digest != report["log_sha256"]:
+        print(f"DIGEST MISMATCH: expected {args.expect_digest}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Raw ADC sound detection (optional RAW_ADC_STREAM mode).
+
+The firmware built with RAW_ADC_STREAM=1 streams 8-bit sound samples in framed
+blocks instead of a thresholded 'S'. This module parses those frames and runs a
+vectorized detector over a sliding window: RMS, peak and band energy are computed
+with NumPy for every hop, and each metric has a threshold that can be changed at
+runtime (None disables a metric).
+
+It can also be run on recorded or synthetic sample files:
+
+    python sound_detector.py recording.wav --rms 0.15
+    python sound_detector.py --synthetic 60 --band 0.002
+"""
+import argparse
+import threading
+import time
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FRAME_SYNC = b"\xA5\x5A"
+FRAME_ADC = ord("A")
+FRAME_EVENT = ord("E")
+ADC_MIDPOINT = 128.0  # 8-bit samples are biased at VCC/2
+
+
+class FrameParser:
+    """Incremental parser for firmware frames: 0xA5 0x5A type seq len payload checksum."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._last_seq = None
+        self.frames = 0
+        self.bad_checksums = 0
+        self.lost_frames = 0
+
+    def feed(self, data):
+        """Adds raw serial bytes and returns the list of complete (type, seq, payload) frames."""
+        buf = self._buf
+        buf += data
+        frames = []
+        while True:
+            start = buf.find(FRAME_SYNC)
+            if start < 0:
+                # Keep a trailing 0xA5 in case the sync word is split across reads
+                del buf[:-1 if buf[-1:] == FRAME_SYNC[:1] else len(buf)]
+                break
+            if start:
+                del buf[:start]
+            if len(buf) < 5:
+                break
+            frame_type, seq, length = buf[2], buf[3], buf[4]
+            end = 5 + length + 1
+            if len(buf) < end:
+                break
+            payload = bytes(buf[5:end - 1])
+            if (frame_type + seq + length + sum(payload)) & 0xFF != buf[end - 1]:
+                # Corrupt or false sync: skip the sync word and resynchronise
+                self.bad_checksums += 1
+                del buf[:2]
+                continue
+            del buf[:end]
+            if self._last_seq is not None:
+                self.lost_frames += (seq - self._last_seq - 1) & 0xFF
+            self._last_seq = seq
+            self.frames += 1
+            frames.append((frame_type, seq, payload))
+        return frames
+
+
+class SoundDetector:
+    """Windowed RMS / peak / band-energy detector over a preallocated sample buffer."""
+
+    def __init__(self, sample_rate=8000, window=512, hop=256, band=(300.0, 3000.0),
+                 rms_threshold=0.12, peak_threshold=None, band_threshold=None, hold_s=1.0):
+        self.sample_rate = sample_rate
+        self.window = window
+        self.hop = hop
+        self.hold_s = hold_s
+        self._lock = threading.Lock()
+        self.set_band(*band)
+        self.set_thresholds(rms=rms_threshold, peak=peak_threshold, band=band_threshold)
+
+        self._hann = np.hanning(window).astype(np.float32)
+        # Linear buffer with compaction: holds at most one window of history plus the newest block
+        self._buf = np.zeros(window * 8, dtype=np.float32)
+        self._fill = 0
+        self._samples_seen = 0      # samples consumed before _buf[0]
+        self._last_detection = None
+
+    # --- Runtime tuning ---
+
+    def set_thresholds(self, rms=None, peak=None, band=None):
+        """Sets the RMS, peak and band-energy thresholds (normalized units, None disables)."""
+        with self._lock:
+            self.thresholds = {"rms": rms, "peak": peak, "band": band}
+
+    def set_band(self, low_hz, high_hz):
+        """Sets the frequency band used for the band-energy metric."""
+        freqs = np.fft.rfftfreq(self.window, 1.0 / self.sample_rate)
+        with self._lock:
+            self.band = (low_hz, high_hz)
+            self._band_bins = np.flatnonzero((freqs >= low_hz) & (freqs <= high_hz))
+
+    # --- Vectorized analysis ---
+
+    def analyze(self, samples):
+        """
+        Computes metrics for every hop of `samples` (raw ADC codes or normalized floats).
+        Returns a dict of equally long arrays: 'start' (sample index), 'rms', 'peak', 'band'.
+        """
+        x = self._normalize(samples)
+        if len(x) < self.window:
+            empty = np.empty(0, dtype=np.float32)
+            return {"start": np.empty(0, dtype=np.int64), "rms": empty, "peak": empty, "band": empty}
+        frames = sliding_window_view(x, self.window)[::self.hop]
+        frames = frames - frames.mean(axis=1, keepdims=True)   # remove DC bias per window
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        peak = np.max(np.abs(frames), axis=1)
+        spectrum = np.abs(np.fft.rfft(frames * self._hann, axis=1)) ** 2
+        band = spectrum[:, self._band_bins].sum(axis=1) / (self.window * self.window)
+        return {"start": np.arange(len(frames)) * self.hop, "rms": rms, "peak": peak, "band": band}
+
+    def detect(self, metrics):
+        """Boolean array: True where any enabled metric exceeds its threshold."""
+        with self._lock:
+            thresholds = dict(self.thresholds)
+        hits = np.zeros(len(metrics["rms"]), dtype=bool)
+        for name, threshold in thresholds.items():
+            if threshold is not None:
+                hits |= metrics[name] > threshold
+        return hits
+
+    def push(self, samples):
+        """
+        Appends a block of samples and evaluates every newly complete window.
+        Returns a list of detection times (seconds since the first sample), rate-limited by hold_s.
+        """
+        x = self._normalize(samples)
+        if self._fill + len(x) > len(self._buf):
+            self._compact(len(x))
+        self._buf[self._fill:self._fill + len(x)] = x
+        self._fill += len(x)
+
+        usable = self._fill - (self._fill - self.window) % self.hop if self._fill >= self.window else 0
+        if not usable:
+            return []
+        metrics = self.analyze(self._buf[:usable])
+        hits = self.detect(metrics)
+        detections = []
+        for start in metrics["start"][hits]:
+            t = (self._samples_seen + start + self.window) / self.sample_rate
+            if self._last_detection is None or t - self._last_detection >= self.hold_s:
+                self._last_detection = t
+                detections.append(float(t))
+
+        # Drop evaluated hops, keeping the overlap the next window needs
+        consumed = usable - self.window + self.hop
+        self._discard(consumed)
+        return detections
+
+    def _compact(self, incoming):
+        if incoming + self.window > len(self._buf):
+            grown = np.zeros(2 * (incoming + self.window), dtype=np.float32)
+            grown[:self._fill] = self._buf[:self._fill]
+            self._buf = grown
+        keep = min(self._fill, self.window)
+        self._discard(self._fill - keep)
+
+    def _discard(self, count):
+        if count <= 0:
+            return
+        remaining = self._fill - count
+        self._buf[:remaining] = self._buf[count:self._fill]
+        self._fill = remaining
+        self._samples_seen += count
+
+    @staticmethod
+    def _normalize(samples):
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.uint8)
+        samples = np.asarray(samples)
+        if samples.dtype == np.uint8:
+            return (samples.astype(np.float32) - ADC_MIDPOINT) / ADC_MIDPOINT
+        return samples.astype(np.float32, copy=False)
+
+
+# --- Sample files ---
+
+def load_samples(path):
+    """Loads samples as 8-bit ADC codes from .wav (8/16-bit mono), .npy or raw .bin/.raw files."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            width, rate = f.getsampwidth(), f.getframerate()
+            data = f.readframes(f.getnframes())
+            channels = f.getnchannels()
+        if width == 1:
+            samples = np.frombuffer(data, dtype=np.uint8)
+        elif width == 2:
+            samples = ((np.frombuffer(data, dtype="<i2").astype(np.int32) >> 8) + 128).astype(np.uint8)
+        else:
+            raise ValueError(f"Unsupported WAV sample width: {width}")
+        return samples[::channels], rate
+    if path.endswith(".npy"):
+        return np.load(path).astype(np.uint8), None
+    return np.fromfile(path, dtype=np.uint8), None
+
+
+def synthetic_samples(seconds, sample_rate=8000, bursts=((10.0, 1.0, 1000.0),), noise=0.02, seed=0):
+    """Background noise plus sine bursts given as (start_s, duration_s, frequency_hz), as ADC codes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    x = rng.normal(0.0, noise, len(t))
+    for start, duration, freq in bursts:
+        mask = (t >= start) & (t < start + duration)
+        x[mask] += 0.5 * np.sin(2 * np.pi * freq * t[mask])
+    return np.clip(x * ADC_MIDPOINT + ADC_MIDPOINT, 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="recorded samples (.wav, .npy, .bin)")
+    parser.add_argument("--synthetic", type=float, metavar="SECONDS", help="generate a synthetic recording instead")
+    parser.add_argument("--rate", type=int, default=8000, help="sample rate for .npy/.bin files")
+    parser.add_argument("--block", type=int, default=64, help="block size fed to the streaming detector")
+    parser.add_argument("--rms", type=float, default=0.12)
+    parser.add_argument("--peak", type=float)
+    parser.add_argument("--band", type=float)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        samples, rate = synthetic_samples(args.synthetic, args.rate), args.rate
+    elif args.path:
+        samples, rate = load_samples(args.path)
+        rate = rate or args.rate
+    else:
+        parser.error("give a sample file or --synthetic SECONDS")
+
+    detector = SoundDetector(sample_rate=rate, rms_threshold=args.rms, peak_threshold=args.peak, band_threshold=args.band)
+    start = time.perf_counter()
+    detections = []
+    for i in range(0, len(samples), args.block):
+        detections.extend(detector.push(samples[i:i + args.block]))
+    elapsed = time.perf_counter() - start
+
+    for t in detections:
+        print(f"Sound detected at {t:8.3f} s")
+    duration = len(samples) / rate
+    print(f"{len(samples)} samples ({duration:.1f} s) in {elapsed:.3f} s: {duration / elapsed:.0f}x real time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+Pluggable sensor sources: serial ports, TCP/UDP listeners, Unix sockets and file
+replay, all feeding one normalized event stream.
+
+Sources are configured as URLs (interface.py SENSOR_SOURCES):
+
+    serial:///dev/ttyUSB1?baud=9600     another Arduino (or any serial line device)
+    tcp://127.0.0.1:9300                line-oriented TCP listener, any number of clients
+    udp://127.0.0.1:9301                one or more lines per datagram
+    unix:///run/ids/sensors.sock        line-oriented Unix stream socket
+    file://capture.txt?speed=10         replays a capture, then finishes
+
+TCP and UDP listeners are unauthenticated and bind 127.0.0.1 when no host is given;
+use 0.0.0.0 (or a LAN address) only on a network where every sender is trusted.
+
+Every source is split into lines, and each line is one event. Serial ports also
+accept the ATmega firmware's bare trigger bytes (I, S, B, H without a newline; see
+LineSplitter):
+
+    I / S / B / IR_TRIGGER              an Arduino trigger key (mapped to sensors by type)
+    H                                   a heartbeat of the source itself (see liveness.py)
+    IR_Hallway [IR]                     a specific sensor, optionally with its trigger type
+    IR_Hallway H                        a heartbeat of that sensor
+    {"sensor": "IR_Hallway", "type": "IR"}      {"sensor": "IR_Hallway", "heartbeat": true}
+
+File captures may start each line with a timestamp in seconds ("12.5 IR_Hallway");
+the gaps are replayed divided by `speed` (speed=0: as fast as the app takes them).
+
+All sources run as tasks on one asyncio loop (SourceHub.run, a supervised worker).
+Events go through a bounded queue to a single forwarding task, which only hands an
+event to the app's sink while ready() says the app can take it. When the app falls
+behind, the queue fills and stream sources stop reading (TCP and Unix clients are
+then flow-controlled by the kernel); datagrams that arrive meanwhile are dropped and
+counted. A source that fails is restarted with exponential backoff without
+disturbing the others. Each source keeps its own counters (SourceStats).
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlsplit, parse_qs
+
+QUEUE_SIZE = 1024          # events between the sources and the forwarding task
+MAX_LINE = 4096            # longer lines are invalid (a stream client sending one is disconnected)
+READY_POLL_S = 0.01        # while the app is saturated, how often the forwarder looks again
+HEARTBEAT = "H"            # trigger type token of a sensor heartbeat line
+KEY_GAP_S = 0.05           # a key byte followed by this much silence is a bare trigger (serial)
+
+
+def parse_line(line, keys):
+    """
+    One input line -> ("key", key), ("sensor", name, trigger_type or None) or
+    ("heartbeat", name), or None if it is blank or malformed. `keys` maps trigger-key lines to keys (SERIAL_LINES).
+    """
+    text = line.decode("utf-8", errors="ignore").strip() if isinstance(line, bytes) else line.strip()
+    if not text:
+        return None
+    key = keys.get(text)
+    if key:
+        return ("key", key)
+    if text[0] == "{":
+        try:
+            record = json.loads(text)
+            name = record["sensor"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if record.get("heartbeat"):
+            return ("heartbeat", str(name))
+        return ("sensor", str(name), record.get("type"))
+    parts = text.split()
+    if len(parts) > 2:
+        return None
+    if len(parts) == 2 and parts[1] == HEARTBEAT:
+        return ("heartbeat", parts[0])
+    return ("sensor", parts[0], parts[1] if len(parts) == 2 else None)
+
+
+class LineSplitter:
+    """
+    Splits a serial byte stream into lines, where a bare trigger byte is a line of its own.
+
+    The .ino sketches print newline-terminated lines ("IR_TRIGGER", "H", banners); the
+    ATmega firmware (C_program_Atmega328p/main.c) sends single bytes such as 'I' or 'S'
+    with no newline at all. A lone key byte followed by another key byte or a line end
+    is a complete line; followed by anything else it starts a text line ("IR_TRIGGER",
+    "Security system ready"). A key byte that is the last one received is ambiguous
+    until more data arrives: `pending` is then True, and the reader calls flush() once
+    the line has stayed quiet for a moment (bytes of one line follow each other within
+    about a millisecond at 9600 baud).
+    """
+
+    def __init__(self, keys, max_line=MAX_LINE):
+        self.bare = frozenset(ord(k) for k in keys if len(k) == 1)  # single-character key lines (SERIAL_LINES)
+        self.max_line = max_line
+        self.overflows = 0
+        self._line = bytearray()
+
+    @property
+    def pending(self):
+        """True while the buffer holds nothing but one key byte."""
+        return len(self._line) == 1 and self._line[0] in self.bare
+
+    def feed(self, data):
+        """Returns the lines completed by `data` (bytes, without line ends)."""
+        lines = []
+        line, bare = self._line, self.bare
+        for byte in data:
+            if byte in (10, 13):
+                if line:
+                    lines.append(bytes(line))
+                    line.clear()
+            elif len(line) == 1 and line[0] in bare and byte in bare:
+                lines.append(bytes(line))
+                line[0] = byte
+            elif len(line) < self.max_line:
+                line.append(byte)
+            else:
+                self.overflows += 1
+                line.clear()
+        return lines
+
+    def flush(self):
+        """Ends the current line (no more data came); returns it as a list of zero or one line."""
+        if not self.pending:
+            return []
+        line = bytes(self._line)
+        self._line.clear()
+        return [line]
+
+
+class SourceStats:
+    """Throughput and error counters of one source (updated on the hub's loop only)."""
+
+    __slots__ = ("events", "bytes", "invalid", "dropped", "errors", "restarts", "connections",
+                 "last_error", "started", "last_event")
+
+    def __init__(self):
+        self.events = 0         # events passed on to the stream
+        self.bytes = 0
+        self.invalid = 0        # lines that are not events
+        self.dropped = 0        # datagrams lost while the stream was full
+        self.errors = 0         # failures of the source itself (it is then restarted)
+        self.restarts = 0
+        self.connections = 0    # clients accepted (tcp/unix)
+        self.last_error = None
+        self.started = time.monotonic()
+        self.last_event = None
+
+    def as_dict(self):
+        now = time.monotonic()
+        return {
+            "events": self.events, "bytes": self.bytes, "invalid": self.invalid, "dropped": self.dropped,
+            "errors": self.errors, "restarts": self.restarts, "connections": self.connections,
+            "last_error": self.last_error,
+            "events_per_s": round(self.events / max(now - self.started, 1e-9), 2),
+            "last_event_age_s": round(now - self.last_event, 1) if self.last_event is not None else None,
+        }
+
+
+class Source:
+    """Base class: run(hub) feeds lines to hub.emit() until the source ends or fails."""
+
+    kind = None
+
+    def __init__(self, name):
+        self.name = name
+        self.stats = SourceStats()
+
+    async def run(self, hub):
+        raise NotImplementedError
+
+
+class StreamListener(Source):
+    """Shared client handling of the TCP and Unix socket listeners."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._clients = {}      # handler task -> its writer
+
+    async def _client(self, reader, writer, hub):
+        self.stats.connections += 1
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    if e.partial:
+                        await hub.emit(self, e.partial)
+                    return
+                except asyncio.LimitOverrunError:
+                    # Not a line-oriented sensor client; hang up instead of buffering
+                    self.stats.invalid += 1
+                    return
+                await hub.emit(self, line)
+        except ConnectionError:
+            pass  # the client went away; the listener keeps running
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    async def _serve(self, server):
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Stopping or restarting the listener also ends its connections. Closing them (rather
+            # than cancelling the handlers) lets each handler finish normally.
+            clients = list(self._clients.items())
+            for task, writer in clients:
+                writer.close()
+            await asyncio.gather(*(task for task, _ in clients), return_exceptions=True)
+
+
+class TcpSource(StreamListener):
+    kind = "tcp"
+
+    def __init__(self, name, host, port):
+        super().__init__(name)
+        self.host = host
+        self.port = port
+
+    async def run(self, hub):
+        server = await asyncio.start_server(lambda r, w: self._client(r, w, hub), self.host, self.port, limit=MAX_LINE)
+        self.port = server.sockets[0].getsockname()[1]
+        await self._serve(server)
+
+
+class UnixSource(StreamListener):
+    kind = "unix"
+
+    def __init__(self, name, path):
+        super().__init__(name)
+        self.path = path
+
+    async def run(self, hub):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        server = await asyncio.start_unix_server(lambda r, w: self._client(r, w, hub), self.path, limit=MAX_LINE)
+        try:
+            await self._serve(server)
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+class _Datagrams(asyncio.DatagramProtocol):
+    def __init__(self, source, hub):
+        self.source = source
+        self.hub = hub
+        self.lost = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        for line in data.splitlines():
+            self.hub.emit_nowait(self.source, line)
+
+    def error_received(self, exc):
+        self.source.stats.errors += 1
+        self.source.stats.last_error = f"{type(exc).__name__}: {exc}"
+
+    def connection_lost(self, exc):
+        if not self.lost.done():
+            self.lost.set_exception(exc or ConnectionError("socket closed"))
+
+
+class UdpSource(Source):
+    kind = "udp"
+
+    def __init__(self, name, host, port):
+        super().__init__(name)
+        self.host = host
+        self.port = port
+
+    async def run(self, hub):
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(lambda: _Datagrams(self, hub),
+                                                                  local_addr=(self.host, self.port))
+        self.port = transport.get_extra_info("sockname")[1]
+        try:
+            await protocol.lost
+        finally:
+            transport.close()
+
+
+class SerialSource(Source):
+    """
+    A serial port read through the loop's selector (add_reader), so it needs no thread
+    and no polling. Ports without a file descriptor (Windows, pyserial URL handlers)
+    fall back to blocking reads in the loop's executor.
+    """
+
+    kind = "serial"
+
+    def __init__(self, name, device, baud=9600):
+        super().__init__(name)
+        self.device = device
+        self.baud = baud
+
+    async def run(self, hub):
+        import serial
+
+        loop = asyncio.get_running_loop()
+        port = serial.serial_for_url(self.device, baudrate=self.baud, timeout=0)
+        splitter = LineSplitter(hub.keys)
+        try:
+            try:
+                fd = port.fileno()
+            except (AttributeError, NotImplementedError, OSError):
+                fd = None
+            readable = asyncio.Event()
+            if fd is not None:
+                loop.add_reader(fd, readable.set)
+            else:
+                port.timeout = 1.0
+            while True:
+                if fd is not None:
+                    try:
+                        # A lone key byte is a bare trigger if nothing follows it shortly
+                        await asyncio.wait_for(readable.wait(), KEY_GAP_S if splitter.pending else None)
+                    except asyncio.TimeoutError:
+                        data = None
+                    else:
+                        readable.clear()
+                        data = port.read(port.in_waiting or 1)
+                else:
+                    data = await loop.run_in_executor(None, port.read, 256)
+                overflows = splitter.overflows
+                lines = splitter.feed(data) if data else splitter.flush()
+                self.stats.invalid += splitter.overflows - overflows
+                for line in lines:
+                    await hub.emit(self, line)
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+            port.close()
+
+
+class FileSource(Source):
+    """Replays a capture file once; lines may carry a leading timestamp in seconds."""
+
+    kind = "file"
+
+    def __init__(self, name, path, speed=1.0):
+        super().__init__(name)
+        self.path = path
+        self.speed = speed
+
+    async def run(self, hub):
+        loop = asyncio.get_running_loop()
+        first = start = None
+        with open(self.path, "rb") as f:
+            for line in f:
+                stamp, _, rest = line.partition(b" ")
+                try:
+                    offset = float(stamp)
+                except ValueError:
+                    offset = None
+                else:
+                    line = rest
+                if offset is not None and self.speed > 0:
+                    if first is None:
+                        first, start = offset, loop.time()
+                    delay = start + (offset - first) / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await hub.emit(self, line)
+
+
+def make_source(url):
+    """Builds a Source from a URL (see the module docstring); raises ValueError if it is not one."""
+    parts = urlsplit(url)
+    query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+    name = query.get("name", url)
+    if parts.scheme in ("tcp", "udp"):
+        if parts.port is None:
+            raise ValueError(f"{url}: a port is required")
+        # Listeners are unauthenticated: anyone who can reach them can trigger the alarm,
+        # so they stay local unless another address (e.g. 0.0.0.0) is given explicitly
+        host = parts.hostname or "127.0.0.1"
+        return (TcpSource if parts.scheme == "tcp" else UdpSource)(name, host, parts.port)
+    if parts.scheme == "unix":
+        return UnixSource(name, parts.netloc + parts.path)
+    if parts.scheme == "serial":
+        return SerialSource(name, parts.netloc + parts.path, int(query.get("baud", 9600)))
+    if parts.scheme == "file":
+        return FileSource(name, parts.netloc + parts.path, float(query.get("speed", 1.0)))
+    raise ValueError(f"Unknown sensor source: {url}")
+
+
+class SourceHub:
+    """
+    Runs every source on one asyncio loop and forwards their events, in arrival
+    order, to sink(source_name, event, arrived) where event is a parse_line() result.
+    """
+
+    def __init__(self, sink, keys, ready=None, clock=time.monotonic, queue_size=QUEUE_SIZE,
+                 retry_s=1.0, max_retry_s=30.0):
+        self.sink = sink
+        self.keys = keys
+        self.ready = ready              # callable: False while the app cannot take more events
+        self.clock = clock
+        self.queue_size = queue_size
+        self.retry_s = retry_s
+        self.max_retry_s = max_retry_s
+        self.sources = {}
+        self.loop = None
+        self._queue = None
+        self._stopped = None
+
+    def add(self, source):
+        if source.name in self.sources:
+            raise ValueError(f"Duplicate sensor source: {source.name}")
+        self.sources[source.name] = source
+        return source
+
+    # --- Lifecycle (run() is a supervisor worker; stop() is its interrupt) ---
+
+    def run(self, worker=None):
+        """Runs all sources until stop(). Blocks the calling thread."""
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._main(worker))
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """Thread-safe: ends run()."""
+        loop, stopped = self.loop, self._stopped
+        if loop is not None and stopped is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(stopped.set)
+
+    async def _main(self, worker):
+        self._queue = asyncio.Queue(self.queue_size)
+        self._stopped = asyncio.Event()
+        if worker is not None and worker.stopping.is_set():
+            return
+        tasks = [asyncio.ensure_future(self._keep_running(source)) for source in self.sources.values()]
+        tasks.append(asyncio.ensure_future(self._forward(worker)))
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _keep_running(self, source):
+        """Runs one source, restarting it with backoff when it fails. A source that finishes stays finished."""
+        delay = self.retry_s
+        while True:
+            started = time.monotonic()
+            try:
+                await source.run(self)
+                print(f"Sensor source {source.name} finished.")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                source.stats.errors += 1
+                source.stats.last_error = f"{type(e).__name__}: {e}"
+                print(f"Sensor source {source.name} failed ({source.stats.last_error}); retrying in {delay:.0f}s.")
+            if time.monotonic() - started > self.max_retry_s:
+                delay = self.retry_s
+            await asyncio.sleep(delay)
+            source.stats.restarts += 1
+            delay = min(delay * 2, self.max_retry_s)
+
+    # --- The event stream ---
+
+    def _parse(self, source, line):
+        stats = source.stats
+        stats.bytes += len(line)
+        if len(line) > MAX_LINE:
+            stats.invalid += 1
+            return None
+        event = parse_line(line, self.keys)
+        if event is None:
+            if line.strip():
+                stats.invalid += 1
+            return None
+        stats.events += 1
+        stats.last_event = time.monotonic()
+        return event
+
+    async def emit(self, source, line):
+        """Queues one line of `source`; waits while the stream is full (backpressure)."""
+        event = self._parse(source, line)
+        if event is not None:
+            await self._queue.put((source.name, event, self.clock()))
+
+    def emit_nowait(self, source, line):
+        """emit() for sources that cannot wait (datagrams): drops and counts when the stream is full."""
+        event = self._parse(source, line)
+        if event is not None:
+            try:
+                self._queue.put_nowait((source.name, event, self.clock()))
+            except asyncio.QueueFull:
+                source.stats.events -= 1
+                source.stats.dropped += 1
+
+    async def _forward(self, worker):
+        queue = self._queue
+        while True:
+            name, event, arrived = await queue.get()
+            if worker is not None:
+                worker.beat()
+            if self.ready is not None:
+                while not self.ready():
+                    await asyncio.sleep(READY_POLL_S)
+            try:
+                self.sink(name, event, arrived)
+            except Exception as e:
+                print(f"Sensor source {name}: event {event} not handled: {e}")
+
+    def stats(self):
+        return {name: dict(source.stats.as_dict(), kind=source.kind) for name, source in self.sources.items()}
@@ -0,0 +1,122 @@
+"""
+Supervised long-lived worker threads (serial ingestion and similar).
+
+Each worker is a function run(worker) that loops until worker.stopping is set.
+The supervisor starts every worker's thread once, at startup, and keeps it for
+the life of the app: if run() raises (or returns while the app is still
+running), the same thread waits out a backoff and calls run() again, so a
+pulled USB cable becomes a reconnect loop instead of a dead reader. Arming and
+disarming never start or stop workers; they only change state the workers'
+events are judged against.
+
+Workers call worker.beat() whenever they make progress. Readers block without
+a timeout (no idle wakeups), so for them last_beat_age_s is the time since the
+last input; a worker that blocks that way registers an `interrupt` callable,
+which stop() uses to unblock it (e.g. Serial.cancel_read):
+
+    {"serial": {"state": "running", "restarts": 0, "last_error": None,
+                "uptime_s": 812.4, "last_beat_age_s": 0.6}}
+"""
+import threading
+import time
+import traceback
+
+RUNNING = "running"
+BACKOFF = "backoff"     # crashed or exited; waiting to restart
+STOPPED = "stopped"
+
+
+class Worker:
+    """Lifecycle and health of one supervised thread."""
+
+    def __init__(self, name, run, clock=time.monotonic, interrupt=None):
+        self.name = name
+        self.run = run
+        self.interrupt = interrupt  # unblocks run() at shutdown, if it blocks indefinitely
+        self.clock = clock
+        self.stopping = None      # the supervisor's stop Event, shared by all workers
+        self.thread = None
+        self.state = STOPPED
+        self.restarts = 0
+        self.last_error = None
+        self.started_at = None    # start of the current run() call
+        self.last_beat = None
+
+    def beat(self):
+        """Called by the worker to show it is alive (cheap: one attribute store)."""
+        self.last_beat = self.clock()
+
+    def health(self):
+        now = self.clock()
+        return {
+            "state": self.state,
+            "alive": self.thread is not None and self.thread.is_alive(),
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "uptime_s": round(now - self.started_at, 1) if self.state == RUNNING else None,
+            "last_beat_age_s": round(now - self.last_beat, 1) if self.last_beat is not None else None,
+        }
+
+
+class Supervisor:
+    def __init__(self, metrics=None, backoff=0.5, max_backoff=30.0, clock=time.monotonic):
+        self.metrics = metrics
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.workers = {}
+        self.stopping = threading.Event()
+
+    def add(self, name, run, interrupt=None):
+        """Registers run(worker) under `name` and starts it (once; later calls with the same name are ignored)."""
+        if name in self.workers:
+            return self.workers[name]
+        worker = self.workers[name] = Worker(name, run, self.clock, interrupt)
+        worker.stopping = self.stopping
+        worker.thread = threading.Thread(target=self._supervise, args=(worker,), name=f"worker-{name}", daemon=True)
+        worker.thread.start()
+        return worker
+
+    def _supervise(self, worker):
+        delay = self.backoff
+        while not self.stopping.is_set():
+            worker.state = RUNNING
+            worker.started_at = worker.last_beat = self.clock()
+            try:
+                worker.run(worker)
+                if self.stopping.is_set():
+                    break
+                worker.last_error = "exited"
+            except Exception as e:
+                if self.stopping.is_set():
+                    break  # interrupted at shutdown
+                worker.last_error = f"{type(e).__name__}: {e}"
+                print(f"Worker '{worker.name}' crashed: {worker.last_error}")
+                traceback.print_exc()
+            # A run that lasted a while was healthy: restart quickly again next time
+            if self.clock() - worker.started_at > self.max_backoff:
+                delay = self.backoff
+            worker.state = BACKOFF
+            worker.restarts += 1
+            if self.metrics:
+                self.metrics.incr("worker_restarts")
+                self.metrics.wakeup("supervisor")
+            self.stopping.wait(delay)
+            delay = min(delay * 2, self.max_backoff)
+        worker.state = STOPPED
+
+    def health(self):
+        return {name: worker.health() for name, worker in self.workers.items()}
+
+    def stop(self, timeout=1.0):
+        """Asks every worker to finish and waits up to `timeout` in total for their threads."""
+        self.stopping.set()
+        for worker in self.workers.values():
+            if worker.interrupt is not None:
+                try:
+                    worker.interrupt()
+                except Exception as e:
+                    print(f"Could not interrupt worker '{worker.name}': {e}")
+        deadline = time.monotonic() + timeout
+        for worker in self.workers.values():
+            worker.thread.join(max(0.0, deadline - time.monotonic()))
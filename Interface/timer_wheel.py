@@ -0,0 +1,205 @@
+"""
+Hierarchical timer wheel for the Tk thread's timeouts.
+
+Suppression windows, entry/exit delays, alarm auto-silence, flag expiry and the
+flicker all go through one TimerService instead of their own master.after()
+calls and datetime comparisons. Time is the monotonic clock, quantised to `tick`
+seconds. Level 0 has one slot per tick; each higher level's slot covers a whole
+lower wheel (Linux-style). Timers are cascaded down a level when their slot
+comes up:
+
+    schedule / cancel   O(1) (a dict insert/delete in one slot)
+    advance             O(1) per timer fired or cascaded; empty ticks and empty
+                        slots of every level are skipped, not stepped through
+
+Each level keeps an occupancy bitmap of its slots, so the next thing to do is
+found directly: the next occupied slot of the lowest level holding any timers
+(lower levels always expire first). A timer far out therefore costs one wakeup
+per level it cascades through, not one per boundary of its level.
+
+With 4 levels of 256 slots and 10 ms ticks the wheel spans about 490 days;
+longer delays are clamped to that. Hundreds of thousands of pending timers
+cost one small object each.
+
+TimerService drives the wheel with a single master.after() armed for the next
+deadline, so an idle wheel does not wake the GUI at all. Everything runs on the
+Tk thread; other threads hand work over through the event queue.
+"""
+import math
+
+BITS = 8
+SLOTS = 1 << BITS
+MASK = SLOTS - 1
+LEVELS = 4
+
+
+class Timer:
+    """Handle returned by schedule(); pass it to cancel()."""
+
+    __slots__ = ("expires", "callback", "args", "slot", "level")
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires      # absolute tick
+        self.callback = callback
+        self.args = args
+        self.slot = None            # dict it currently sits in (None once fired or cancelled)
+        self.level = 0
+
+    @property
+    def active(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    def __init__(self, now, tick=0.01):
+        self.tick = tick
+        self.origin = now
+        self.current = 0                                           # last tick processed
+        self._wheels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._counts = [0] * LEVELS
+        self._occupied = [0] * LEVELS                              # per level, bit i set: slot i has timers
+        self._span = (1 << (BITS * LEVELS)) - 1
+
+    def __len__(self):
+        return sum(self._counts)
+
+    def _place(self, timer):
+        expires = timer.expires
+        # Lowest level whose current block also holds the expiry tick: the highest differing digit
+        level = min(((expires ^ self.current).bit_length() - 1) // BITS, LEVELS - 1) if expires != self.current else 0
+        index = (expires >> (BITS * level)) & MASK
+        slot = self._wheels[level][index]
+        self._occupied[level] |= 1 << index
+        slot[timer] = None
+        timer.slot = slot
+        timer.level = level
+        self._counts[level] += 1
+
+    def schedule(self, now, delay, callback, *args):
+        """Runs callback(*args) once `delay` seconds after `now`; returns the Timer."""
+        ticks = min(max(1, math.ceil((now + delay - self.origin) / self.tick) - self.current), self._span)
+        timer = Timer(self.current + ticks, callback, args)
+        self._place(timer)
+        return timer
+
+    def cancel(self, timer):
+        """Stops a pending timer; harmless if it already fired or was cancelled."""
+        if timer is not None and timer.slot is not None:
+            slot = timer.slot
+            del slot[timer]
+            timer.slot = None
+            self._counts[timer.level] -= 1
+            if not slot:
+                self._occupied[timer.level] &= ~(1 << ((timer.expires >> (BITS * timer.level)) & MASK))
+
+    def _cascade(self):
+        """At a level boundary, re-places the timers of the higher-level slots that just came up."""
+        for level in range(LEVELS - 1, 0, -1):
+            if self.current & ((1 << (BITS * level)) - 1) == 0:
+                index = (self.current >> (BITS * level)) & MASK
+                slot = self._wheels[level][index]
+                self._occupied[level] &= ~(1 << index)
+                if slot:
+                    timers = list(slot)
+                    slot.clear()
+                    self._counts[level] -= len(timers)
+                    for timer in timers:
+                        self._place(timer)
+
+    def advance(self, now):
+        """Fires every timer due by `now` in expiry order; returns how many fired."""
+        target = int((now - self.origin) / self.tick + 1e-3)  # a wakeup right on a deadline counts as due
+        fired = 0
+        while self.current < target:
+            tick = self._next_tick()
+            if tick is None or tick > target:
+                # Nothing can come due before target: no boundary in between has timers to cascade
+                self.current = target
+                break
+            self.current = tick
+            self._cascade()
+            slot = self._wheels[0][self.current & MASK]
+            self._occupied[0] &= ~(1 << (self.current & MASK))
+            while slot:
+                timer = next(iter(slot))
+                del slot[timer]
+                timer.slot = None
+                self._counts[0] -= 1
+                fired += 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    # One failing callback must not stall every other timer
+                    print(f"Timer callback {getattr(timer.callback, '__name__', timer.callback)} failed: {e}")
+        return fired
+
+    def _next_tick(self):
+        """Next tick with level-0 timers, else when the next occupied slot of the lowest level holding any comes up; None if idle."""
+        for level in range(LEVELS):
+            occupied = self._occupied[level]
+            if not occupied:
+                continue
+            shift = BITS * level
+            digit = (self.current >> shift) & MASK
+            block = (self.current >> (shift + BITS)) << (shift + BITS)   # start of this level's current block
+            later = occupied >> (digit + 1)
+            if later:
+                # A level's timers all come up later in its current block ...
+                return block + ((digit + (later & -later).bit_length()) << shift)
+            # ... except on the top level, whose slots wrap into the next one
+            return block + (1 << (shift + BITS)) + (((occupied & -occupied).bit_length() - 1) << shift)
+        return None
+
+    def next_deadline(self):
+        """Time (on the wheel's clock) by which advance() should next run, or None if idle."""
+        tick = self._next_tick()
+        return None if tick is None else self.origin + tick * self.tick
+
+
+class TimerService:
+    """A TimerWheel on the app's monotonic clock, driven by one master.after() at a time."""
+
+    def __init__(self, master, monotonic, tick=0.01, metrics=None):
+        self.master = master
+        self.monotonic = monotonic
+        self.metrics = metrics
+        self.wheel = TimerWheel(monotonic(), tick)
+        self._after_id = None
+        self._armed_for = None
+
+    def __len__(self):
+        return len(self.wheel)
+
+    def call_later(self, delay, callback, *args):
+        """Runs callback(*args) on the Tk thread after `delay` seconds; returns a Timer for cancel()."""
+        timer = self.wheel.schedule(self.monotonic(), delay, callback, *args)
+        self._arm()
+        return timer
+
+    def cancel(self, timer):
+        # The armed wakeup may now be early; it then just re-arms for the real deadline
+        self.wheel.cancel(timer)
+
+    def remaining(self, timer):
+        """Seconds until a pending timer fires (0 if it is not pending)."""
+        if timer is None or not timer.active:
+            return 0.0
+        return max(0.0, self.wheel.origin + timer.expires * self.wheel.tick - self.monotonic())
+
+    def _arm(self):
+        deadline = self.wheel.next_deadline()
+        if deadline is None or (self._armed_for is not None and self._armed_for <= deadline):
+            return
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+        self._armed_for = deadline
+        self._after_id = self.master.after(max(0, int((deadline - self.monotonic()) * 1000 + 0.999)), self._run)
+
+    def _run(self):
+        # after() may fire a hair early (ms rounding); the deadline it was armed for has been reached
+        due = self._armed_for
+        self._after_id = self._armed_for = None
+        if self.metrics:
+            self.metrics.wakeup("timers")
+        self.wheel.advance(max(self.monotonic(), due))
+        self._arm()
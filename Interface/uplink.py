@@ -0,0 +1,289 @@
+"""
+Unit-side uplink to the fleet aggregator (aggregator.py).
+
+Events are batched in memory and shipped over one long-lived TCP connection as
+compressed frames:
+
+    frame   b"IU" | version u8 | kind u8 | length u32 | body
+    HELLO   body = site id (utf-8)
+    BATCH   body = batch seq u64 | zlib(JSON lines: [time, kind, data])
+    ACK     body = batch seq u64  (aggregator -> unit, after the batch is processed)
+
+A batch is written to the spool directory before it is sent and deleted only
+when its ACK arrives, so delivery is at-least-once across disconnects, offline
+periods and restarts (the aggregator drops duplicates by sequence number). The
+next sequence number is kept in the spool directory too (NEXT_SEQ_FILE), so a
+unit that restarts with an empty spool carries on where it left off instead of
+reusing numbers the aggregator would discard as duplicates. The sender thread
+sleeps until there is something to send: no idle wakeups.
+
+    python uplink.py --fake-sites 200 --events 50 --port 9200   # load generator
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"IU"
+VERSION = 1
+HEADER = struct.Struct("<2sBBI")
+SEQ = struct.Struct("<Q")
+HELLO, BATCH, ACK = 1, 2, 3
+MAX_FRAME = 16 * 1024 * 1024
+NEXT_SEQ_FILE = "next_seq"  # in the spool directory: sequence number of the next batch
+
+
+def encode_frame(kind, body):
+    return HEADER.pack(MAGIC, VERSION, kind, len(body)) + body
+
+
+def read_frame(sock_file):
+    """Reads one frame from a binary file-like object; returns (kind, body) or None at EOF."""
+    header = sock_file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    magic, version, kind, length = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or length > MAX_FRAME:
+        raise ValueError("Malformed uplink frame.")
+    body = sock_file.read(length)
+    if len(body) < length:
+        return None
+    return kind, body
+
+
+def encode_batch(seq, records):
+    lines = "\n".join(json.dumps(record, separators=(",", ":")) for record in records)
+    return SEQ.pack(seq) + zlib.compress(lines.encode(), 6)
+
+
+def decode_batch(body):
+    """BATCH body -> (seq, [[time, kind, data], ...])."""
+    seq = SEQ.unpack_from(body)[0]
+    text = zlib.decompress(body[SEQ.size:]).decode()
+    return seq, [json.loads(line) for line in text.splitlines() if line]
+
+
+class Uplink:
+    """Batches records, spools them to disk and streams them to the aggregator."""
+
+    def __init__(self, site_id, host, port, spool_dir="uplink_spool", batch_max=500, flush_s=2.0, retry_s=(1.0, 60.0)):
+        self.site_id = site_id
+        self.address = (host, port)
+        self.spool_dir = spool_dir
+        self.batch_max = batch_max
+        self.flush_s = flush_s
+        self.retry_min, self.retry_max = retry_s
+        os.makedirs(spool_dir, exist_ok=True)
+        spooled = self._spooled()
+        self._next_seq = max(self._saved_next_seq(), spooled[-1] + 1 if spooled else 1)
+        self._pending = []
+        self._first_pending = None
+        self._cond = threading.Condition()
+        self._stop = False
+        self._sock = None
+        self._link_down = True
+        self._unsent = list(spooled)  # spooled seqs not yet written to the current connection
+        self.sent = 0
+        self.acked = 0
+
+    # --- Producer side (any thread) ---
+
+    def record(self, kind, data, timestamp=None):
+        with self._cond:
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._pending.append([timestamp if timestamp is not None else time.time(), kind, data])
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_max:
+                self._cond.notify()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="uplink").start()
+        return self
+
+    def close(self):
+        """Spools whatever is still pending and stops the sender."""
+        with self._cond:
+            self._stop = True
+            self._spool_pending()
+            self._cond.notify()
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    # --- Spool ---
+
+    def _path(self, seq):
+        return os.path.join(self.spool_dir, f"{seq:016d}.batch")
+
+    def _spooled(self):
+        return sorted(int(name.split(".")[0]) for name in os.listdir(self.spool_dir) if name.endswith(".batch"))
+
+    def _saved_next_seq(self):
+        try:
+            with open(os.path.join(self.spool_dir, NEXT_SEQ_FILE)) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 1
+
+    def _save_next_seq(self):
+        # Written before the batch that uses the number: a crash in between only leaves a gap
+        path = os.path.join(self.spool_dir, NEXT_SEQ_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(str(self._next_seq))
+        os.replace(path + ".tmp", path)
+
+    def _spool_pending(self):
+        """Moves pending records into a spooled batch (caller holds the lock)."""
+        if not self._pending:
+            return
+        seq = self._next_seq
+        self._next_seq += 1
+        self._save_next_seq()
+        tmp = self._path(seq) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(encode_frame(BATCH, encode_batch(seq, self._pending)))
+        os.replace(tmp, self._path(seq))
+        self._pending = []
+        self._unsent.append(seq)
+
+    @property
+    def backlog(self):
+        """Spooled batches not yet acknowledged."""
+        return len(self._spooled())
+
+    # --- Sender thread ---
+
+    def _run(self):
+        delay = self.retry_min
+        while not self._stop:
+            try:
+                self._connect()
+                delay = self.retry_min
+                self._send_loop()
+            except OSError as e:
+                if self._stop:
+                    break
+                print(f"Uplink to {self.address[0]}:{self.address[1]} unavailable ({e}); retrying in {delay:.0f}s.")
+            finally:
+                self._disconnect()
+            with self._cond:
+                # Keep batching to the spool while offline; wake early on close()
+                self._cond.wait_for(lambda: self._stop, timeout=delay)
+                self._spool_pending()
+            delay = min(delay * 2, self.retry_max)
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=10)
+        sock.settimeout(None)
+        sock.sendall(encode_frame(HELLO, self.site_id.encode()))
+        self._sock = sock
+        with self._cond:
+            self._link_down = False
+            self._unsent = self._spooled()  # resend everything not acknowledged
+        threading.Thread(target=self._read_acks, args=(sock,), daemon=True, name="uplink-acks").start()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                while not self._stop and not self._unsent:
+                    if self._link_down:
+                        raise ConnectionError("connection lost")
+                    if self._pending:
+                        remaining = self._first_pending + self.flush_s - time.monotonic()
+                        if remaining <= 0 or len(self._pending) >= self.batch_max:
+                            self._spool_pending()
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._stop:
+                    return
+                batch = list(self._unsent)
+                self._unsent = []
+            for seq in batch:
+                try:
+                    with open(self._path(seq), "rb") as f:
+                        frame = f.read()
+                except FileNotFoundError:
+                    continue  # acknowledged meanwhile
+                self._sock.sendall(frame)
+                self.sent += 1
+
+    def _read_acks(self, sock):
+        try:
+            reader = sock.makefile("rb")
+            while True:
+                frame = read_frame(reader)
+                if frame is None:
+                    break
+                kind, body = frame
+                if kind == ACK:
+                    seq = SEQ.unpack(body)[0]
+                    try:
+                        os.remove(self._path(seq))
+                        self.acked += 1
+                    except FileNotFoundError:
+                        pass
+        except (OSError, ValueError):
+            pass
+        # Wake the sender so it notices the dead connection and reconnects
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        with self._cond:
+            if sock is self._sock:  # an old connection's reader must not take down a newer one
+                self._link_down = True
+            self._cond.notify()
+
+
+def _fake_site(site_id, host, port, events, spool_root):
+    uplink = Uplink(site_id, host, port, os.path.join(spool_root, site_id), batch_max=100, flush_s=0.5).start()
+    for i in range(events):
+        uplink.record("intrusion", {"sensor": f"IR_{i % 7}", "type": "IR", "source": "loadgen"})
+        if i % 25 == 0:
+            uplink.record("status", {"active": True, "alarm": i % 50 == 0, "armed_zones": ["Perimeter"]})
+    return uplink
+
+
+def main():
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--fake-sites", type=int, default=100)
+    parser.add_argument("--events", type=int, default=100, help="events per site")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    spool_root = tempfile.mkdtemp(prefix="uplink-loadgen-")
+    started = time.perf_counter()
+    uplinks = [_fake_site(f"site-{i:05d}", args.host, args.port, args.events, spool_root) for i in range(args.fake_sites)]
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline and any(u.backlog or u._pending for u in uplinks):
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    total = args.fake_sites * args.events
+    print(json.dumps({"sites": args.fake_sites, "events": total, "batches_acked": sum(u.acked for u in uplinks),
+                      "unacked": sum(u.backlog for u in uplinks), "seconds": round(elapsed, 3)}))
+    for u in uplinks:
+        u.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Zone model for independent arming.
+
+Zones are kept in an ordered table; zone i is bit (1 << i) of a zone mask.
+Each sensor stores the mask of the zones it belongs to, and the system stores
+the mask of armed zones, so "does this trigger count?" is a single bitwise AND
+regardless of how many sensors or zones exist.
+"""
+
+DEFAULT_ZONES = ["Perimeter", "Interior", "Night"]
+ALL_ZONES_KEYWORD = "All"
+
+
+class ZoneTable:
+    """Ordered zone names and their bit assignments."""
+
+    def __init__(self, names=None):
+        self.names = []
+        self._bits = {}
+        for name in names or DEFAULT_ZONES:
+            self.add(name)
+
+    @property
+    def all_mask(self):
+        return (1 << len(self.names)) - 1
+
+    def add(self, name):
+        """Adds a zone (if new) and returns its bit."""
+        name = name.strip()
+        if not name:
+            raise ValueError("Zone name cannot be empty.")
+        if name not in self._bits:
+            self._bits[name] = 1 << len(self.names)
+            self.names.append(name)
+        return self._bits[name]
+
+    def bit(self, name):
+        try:
+            return self._bits[name]
+        except KeyError:
+            raise ValueError(f"Unknown zone '{name}'.")
+
+    def mask_for(self, names):
+        """Returns the mask for an iterable of zone names or a comma separated string ('All' = every zone)."""
+        if isinstance(names, str):
+            names = [n for n in (p.strip() for p in names.split(",")) if n]
+        mask = 0
+        for name in names:
+            if name == ALL_ZONES_KEYWORD:
+                return self.all_mask
+            mask |= self.bit(name)
+        return mask
+
+    def names_for(self, mask):
+        """Returns the zone names set in a mask, in table order."""
+        return [name for name in self.names if mask & self._bits[name]]
+
+    def text_for(self, mask):
+        """Comma separated zone names for a mask ('All' when every zone is set)."""
+        if mask and mask & self.all_mask == self.all_mask:
+            return ALL_ZONES_KEYWORD
+        return ", ".join(self.names_for(mask))
+
+
+def pick_sensor(sensors, sensor_type, armed_mask):
+    """
+    Chooses which sensor of a type an anonymous trigger ('I', 'S') belongs to:
+    a non-triggered sensor in an armed zone, then a triggered one in an armed zone,
+    then any sensor of that type. Returns None if there is none.
+    """
+    fallback = None
+    armed_triggered = None
+    for name, data in sensors.items():
+        if data.get("type") != sensor_type:
+            continue
+        if data.get("zones", 0) & armed_mask:
+            if data.get("status") != "Triggered":
+                return name
+            if armed_triggered is None:
+                armed_triggered = name
+        elif fallback is None:
+            fallback = name
+    return armed_triggered if armed_triggered is not None else fallback